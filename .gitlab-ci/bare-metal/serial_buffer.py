@@ -25,6 +25,7 @@ import argparse
 from datetime import datetime, timezone
 import queue
 import serial
+import sys
 import threading
 import time
 
@@ -77,13 +78,15 @@ class SerialBuffer:
 
     # Thread that just reads the bytes from the serial device to try to keep from
     # buffer overflowing it. If nothing is received in 1 minute, it finalizes.
+    # Everything already received is read at once, so a board dumping a lot of
+    # output doesn't cost a read and a queue item per byte.
     def serial_read_thread_loop(self):
         greet = "Serial thread reading from %s\n" % self.dev
         self.byte_queue.put(greet.encode())
 
         while not self.closing:
             try:
-                b = self.serial.read()
+                b = self.serial.read(self.serial.in_waiting or 1)
                 if len(b) == 0:
                     break
                 self.byte_queue.put(b)
@@ -99,43 +102,59 @@ class SerialBuffer:
         self.byte_queue.put(greet.encode())
 
         while not self.closing:
-            line = self.f.readline()
-            if line:
-                self.byte_queue.put(line)
+            data = self.f.read(65536)
+            if data:
+                self.byte_queue.put(data)
             else:
                 time.sleep(0.1)
         self.byte_queue.put(self.sentinel)
 
     # Thread that processes the stream of bytes to 1) log to stdout, 2) log to
     # file, 3) add to the queue of lines to be read by program logic
+    #
+    # All the chunks queued by the read thread are handled together, with a
+    # single write to the file and to stdout.
 
     def serial_lines_thread_loop(self):
-        line = bytearray()
-        while True:
-            bytes = self.byte_queue.get(block=True)
+        partial = b''
+        done = False
+        while not done:
+            chunks = [self.byte_queue.get(block=True)]
+            while True:
+                try:
+                    chunks.append(self.byte_queue.get_nowait())
+                except queue.Empty:
+                    break
 
-            if bytes == self.sentinel:
-                self.read_thread.join()
-                self.line_queue.put(self.sentinel)
-                break
+            if self.sentinel in chunks:
+                chunks = chunks[:chunks.index(self.sentinel)]
+                done = True
+
+            data = b''.join(chunks)
 
             # Write our data to the output file if we're the ones reading from
             # the serial device
-            if self.dev:
-                self.f.write(bytes)
+            if self.dev and data:
+                self.f.write(data)
                 self.f.flush()
 
-            for b in bytes:
-                line.append(b)
-                if b == b'\n'[0]:
-                    line = line.decode(errors="replace")
+            lines = (partial + data).split(b'\n')
+            partial = lines.pop()
 
-                    time = datetime.now().strftime('%y-%m-%d %H:%M:%S')
-                    print("{endc}{time} {prefix}{line}".format(
-                        time=time, prefix=self.prefix, line=line, endc='\033[0m'), flush=True, end='')
+            if lines:
+                time = datetime.now().strftime('%y-%m-%d %H:%M:%S')
+                lines = [line.decode(errors="replace") + '\n' for line in lines]
+                sys.stdout.write(''.join(
+                    "{endc}{time} {prefix}{line}".format(
+                        time=time, prefix=self.prefix, line=line, endc='\033[0m')
+                    for line in lines))
+                sys.stdout.flush()
 
+                for line in lines:
                     self.line_queue.put(line)
-                    line = bytearray()
+
+        self.read_thread.join()
+        self.line_queue.put(self.sentinel)
 
     def lines(self, timeout=None, phase=None):
         start_time = time.monotonic()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# Copyright © 2026 Mesa contributors
+# SPDX-License-Identifier: MIT
+
+# Replays a recorded serial log through SerialBuffer as fast as it can take it,
+# to check that the capture keeps up with boards dumping a lot of output:
+#
+#   serial_buffer_bench.py serial-output.txt
+#
+# The log is read through a stand-in for the serial device, which reports
+# --chunk-size bytes as waiting on each read, like a full UART buffer would.
+
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+from unittest import mock
+import serial_buffer
+
+
+class ReplaySerial:
+    chunk_size = 4096
+
+    def __init__(self, dev, baudrate, timeout=None):
+        self.f = open(dev, "rb")
+        self.size = os.path.getsize(dev)
+
+    @property
+    def in_waiting(self):
+        return min(self.chunk_size, self.size - self.f.tell())
+
+    def read(self, size=1):
+        return self.f.read(size)
+
+    def cancel_read(self):
+        pass
+
+    def close(self):
+        self.f.close()
+
+
+def replay(log, output):
+    with open(os.devnull, "w") as null, contextlib.redirect_stdout(null), \
+            mock.patch.object(serial_buffer.serial, "Serial", ReplaySerial):
+        start = time.perf_counter()
+        ser = serial_buffer.SerialBuffer(log, output, "R SERIAL> ")
+        lines = sum(1 for line in ser.lines())
+        elapsed = time.perf_counter() - start
+        ser.close()
+    return lines, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('log', type=str, help='Recorded serial output')
+    parser.add_argument('--chunk-size', type=int, default=ReplaySerial.chunk_size,
+                        help='Bytes waiting on the device for each read')
+    parser.add_argument('-n', '--iterations', type=int, default=3,
+                        help='Number of runs, the fastest one is reported')
+    args = parser.parse_args()
+
+    ReplaySerial.chunk_size = args.chunk_size
+    size = os.path.getsize(args.log)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "serial-output.txt")
+        best = None
+        for i in range(args.iterations):
+            lines, elapsed = replay(args.log, output)
+            print("run {}: {} lines in {:.3f}s".format(i, lines, elapsed))
+            if best is None or elapsed < best:
+                best = elapsed
+
+        # The capture starts with a line saying where it reads from
+        with open(output, "rb") as f:
+            f.readline()
+            captured = f.read()
+        with open(args.log, "rb") as f:
+            if captured != f.read():
+                print("The captured output doesn't match the log")
+                exit(1)
+
+    print("{:.1f} MB/s, {:.0f} lines/s".format(
+        size / best / 1e6, lines / best))
+
+
+if __name__ == '__main__':
+    main()
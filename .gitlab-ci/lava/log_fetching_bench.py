@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# Copyright © 2026 Mesa contributors
+# SPDX-License-Identifier: MIT
+
+"""
+Replays a LAVA job log through fetch_logs(), as fast as it can take it, to
+measure the cost of following the logs of a job. Run it from .gitlab-ci:
+
+    python3 -m lava.log_fetching_bench [log.yaml]
+
+The log is the raw YAML returned by the scheduler.jobs.logs RPC, or a
+generated one, see generate_lava_log() in tests/lava/helpers.py.
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import yaml
+
+from lava.lava_job_submitter import LAVAJob, LogPollingScheduler, fetch_logs
+from lava.utils import GitlabSection, LogFollower, LogSectionType
+from tests.lava.helpers import generate_lava_log, lava_log_dump
+
+
+def replay(lines, chunk_size):
+    """Feeds the lines to fetch_logs() in chunks, returns the time it took"""
+    chunks = [
+        (False, lava_log_dump(lines[i : i + chunk_size]))
+        for i in range(0, len(lines), chunk_size)
+    ]
+
+    proxy = MagicMock()
+    proxy.scheduler.jobs.logs.side_effect = chunks
+    job = LAVAJob(proxy, "")
+    job.heartbeat()
+    polling = LogPollingScheduler(min_time=0, max_time=0)
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+        section = GitlabSection(
+            id="lava_boot",
+            header="LAVA boot",
+            type=LogSectionType.LAVA_BOOT,
+            start_collapsed=True,
+        )
+        print(section.start())
+        follower = LogFollower(current_section=section)
+        for _ in chunks:
+            fetch_logs(job, timedelta(days=1), follower, polling)
+    elapsed = time.perf_counter() - start
+
+    assert job.last_log_line == len(lines)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("log", nargs="?", help="raw YAML log of a LAVA job")
+    parser.add_argument(
+        "-n",
+        "--lines",
+        type=int,
+        default=100000,
+        help="number of lines of the generated log",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=2000,
+        help="number of lines returned by each logs RPC",
+    )
+    args = parser.parse_args()
+
+    if args.log:
+        with open(args.log, "r") as f:
+            lines = yaml.load(f, Loader=yaml.CSafeLoader)
+    else:
+        lines = generate_lava_log(args.lines)
+
+    elapsed = replay(lines, args.chunk_size)
+    rate = len(lines) / elapsed if elapsed > 0 else float("inf")
+    print(f"{len(lines)} log lines in {elapsed:.3f}s, {rate:.0f} lines/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,6 +11,11 @@ from lava.exceptions import MesaCIKnownIssueException
 from lava.utils.console_format import CONSOLE_LOG
 from lava.utils.log_section import LogSectionType
 
+R8152_TX_ERROR_REGEX = re.compile(r"r8152 \S+ eth0: Tx status -71")
+NFS_NOT_RESPONDING_REGEX = re.compile(
+    r"nfs: server \d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3} not responding, still trying"
+)
+
 
 @dataclass
 class LAVALogHints:
@@ -26,13 +31,12 @@ class LAVALogHints:
             self.log_follower.phase == LogSectionType.TEST_CASE
             and line["lvl"] == "target"
         ):
-            if re.search(r"r8152 \S+ eth0: Tx status -71", line["msg"]):
+            if "r8152" in line["msg"] and R8152_TX_ERROR_REGEX.search(line["msg"]):
                 self.has_r8152_issue_history = True
                 return
 
-            if self.has_r8152_issue_history and re.search(
-                r"nfs: server \d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3} not responding, still trying",
-                line["msg"],
+            if self.has_r8152_issue_history and NFS_NOT_RESPONDING_REGEX.search(
+                line["msg"]
             ):
                 raise MesaCIKnownIssueException(
                     f"{CONSOLE_LOG['FG_MAGENTA']}"
@@ -28,6 +28,10 @@ from lava.utils.log_section import (
     LogSectionType,
 )
 
+KERNEL_MESSAGE_REGEX = re.compile(r"\[[\d\s]{5}\.[\d\s]{6}\] +\S{2,}")
+COLOR_CODE_REGEX = re.compile(r"(\[(\d+;){0,2}\d{1,3}m)")
+GITLAB_SECTION_REGEX = re.compile(r"\[0K(section_\w+):(\d+):(\S+)\[0K([\S ]+)?")
+
 
 @dataclass
 class LogFollower:
@@ -114,7 +118,7 @@ class LogFollower:
             return False
 
         # we have a line, check if it is a kernel message
-        if re.search(r"\[[\d\s]{5}\.[\d\s]{6}\] +\S{2,}", line["msg"]):
+        if "[" in line["msg"] and KERNEL_MESSAGE_REGEX.search(line["msg"]):
             print_log(f"{CONSOLE_LOG['BOLD']}{line['msg']}{CONSOLE_LOG['RESET']}")
             return True
 
@@ -160,7 +164,8 @@ def fix_lava_color_log(line):
     foreground colors.
     When this problem is fixed on the LAVA side, one should remove this function.
     """
-    line["msg"] = re.sub(r"(\[(\d+;){0,2}\d{1,3}m)", "\x1b" + r"\1", line["msg"])
+    if "[" in line["msg"]:
+        line["msg"] = COLOR_CODE_REGEX.sub("\x1b" + r"\1", line["msg"])
 
 
 def fix_lava_gitlab_section_log(line):
@@ -174,7 +179,9 @@ def fix_lava_gitlab_section_log(line):
     incorrectly. When this problem is fixed on the LAVA side, one should remove
     this function.
     """
-    if match := re.match(r"\[0K(section_\w+):(\d+):(\S+)\[0K([\S ]+)?", line["msg"]):
+    if not line["msg"].startswith("[0Ksection_"):
+        return
+    if match := GITLAB_SECTION_REGEX.match(line["msg"]):
         marker, timestamp, id_collapsible, header = match.groups()
         # The above regex serves for both section start and end lines.
         # When the header is None, it means we are dealing with `section_end` line
@@ -186,9 +193,9 @@ def parse_lava_line(line) -> Optional[str]:
     prefix = ""
     suffix = ""
 
-    if line["lvl"] in ["results", "feedback", "debug"]:
+    if line["lvl"] in ("results", "feedback", "debug"):
         return
-    elif line["lvl"] in ["warning", "error"]:
+    elif line["lvl"] in ("warning", "error"):
         prefix = CONSOLE_LOG["FG_RED"]
         suffix = CONSOLE_LOG["RESET"]
     elif line["lvl"] == "input":
@@ -1,4 +1,4 @@
-from contextlib import nullcontext as does_not_raise
+from contextlib import closing, nullcontext as does_not_raise
 from datetime import datetime
 from itertools import cycle
 from typing import Callable, Generator, Iterable, Optional, Tuple, Union
@@ -105,6 +105,46 @@ def generate_n_logs(
             yield jobs_logs_response(finished=True, result=result)
 
 
+def lava_log_dump(lines) -> str:
+    """Dump the log lines the way LAVA does, one flow mapping per line"""
+    return "".join(
+        "- "
+        + yaml.dump(
+            line,
+            Dumper=yaml.CSafeDumper,
+            default_flow_style=True,
+            default_style='"',
+            width=10**6,
+            allow_unicode=True,
+        )
+        for line in lines
+    )
+
+
+def generate_lava_log(num_lines, result="pass") -> list[dict[str, str]]:
+    """Simulate the lines of a whole job log, mixing section signals, kernel
+    messages and test results, and ending with the job result"""
+    level_gen = level_generator()
+    signal_gen = cycle(LogSectionType)
+
+    lines = []
+    for i in range(num_lines - 1):
+        if i % 1000 == 0:
+            lines.append(mock_lava_signal(next(signal_gen)))
+        elif i % 10 == 0:
+            lines.append(create_lava_yaml_msg(msg=f"[ {i:4}.{i:06}] kernel message"))
+        else:
+            lines.append(
+                create_lava_yaml_msg(
+                    msg=f"\x1b[1;32mdEQP-VK.test_{i}: Pass", lvl=next(level_gen)
+                )
+            )
+
+    with closing(generate_n_logs(result=result)) as logs:
+        _, data = next(logs)
+    return lines + yaml.safe_load(data)
+
+
 def to_iterable(tick_fn):
     if isinstance(tick_fn, Generator):
         return tick_fn
@@ -11,20 +11,26 @@ from datetime import datetime
 from itertools import chain, repeat
 
 import pytest
+import yaml
 from lava.exceptions import MesaCIException, MesaCIRetryError
 from lava.lava_job_submitter import (
     DEVICE_HANGING_TIMEOUT_SEC,
     NUMBER_OF_RETRIES_TIMEOUT_DETECTION,
     LAVAJob,
+    LogPollingScheduler,
     follow_job_execution,
+    load_lava_log,
     retriable_follow_job,
 )
 from lava.utils import LogSectionType
 
 from .lava.helpers import (
+    create_lava_yaml_msg,
+    generate_lava_log,
     generate_n_logs,
     generate_testsuite_result,
     jobs_logs_response,
+    lava_log_dump,
     mock_lava_signal,
     mock_logs,
     section_timeout,
@@ -294,6 +300,59 @@ def test_parse_job_result_from_log(message, expectation, mock_proxy):
     assert job.status == expectation
 
 
+LAVA_LOG_MESSAGES = [
+    "New message",
+    "[0Ksection_start:1652893420:test_section[collapsed=true]\r[0Ktest header",
+    "\x1b[1;31m colored \\ backslash \"quoted\"",
+    "control \x00\x07\t\x0b\x85\xa0 characters",
+    "unicode é \u2028 \U0001f600",
+    ["kernel", "dump"],
+    {"case": "validate", "result": "pass"},
+]
+
+LAVA_LOG_DECODING_SCENARIOS = {
+    "LAVA dump": lava_log_dump,
+    "block style": yaml.safe_dump,
+    "flow style without quotes": lambda lines: yaml.dump(
+        lines, default_flow_style=None, width=10**6
+    ),
+}
+
+
+@pytest.mark.parametrize(
+    "dump",
+    LAVA_LOG_DECODING_SCENARIOS.values(),
+    ids=LAVA_LOG_DECODING_SCENARIOS.keys(),
+)
+def test_load_lava_log(dump):
+    lines = [create_lava_yaml_msg(msg=msg) for msg in LAVA_LOG_MESSAGES]
+    data = dump(lines)
+
+    assert load_lava_log(data) == yaml.safe_load(data) == lines
+
+
+def test_load_lava_log_generated():
+    lines = generate_lava_log(2000)
+
+    assert load_lava_log(lava_log_dump(lines)) == lines
+
+
+def test_load_lava_log_empty():
+    assert not load_lava_log("")
+
+
+def test_log_polling_scheduler(mock_sleep):
+    polling = LogPollingScheduler(min_time=5, max_time=30)
+    assert polling.polling_time == 5
+
+    for expected in (10, 20, 30, 30):
+        polling.update(has_new_lines=False)
+        assert polling.polling_time == expected
+
+    polling.update(has_new_lines=True)
+    assert polling.polling_time == 5
+
+
 @pytest.mark.slow(
     reason="Slow and sketchy test. Needs a LAVA log raw file at /tmp/log.yaml"
 )
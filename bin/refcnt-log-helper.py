@@ -21,11 +21,111 @@
 # IN THE SOFTWARE.
 
 import argparse
+import array
+import sys
 
 # Take a log file produced by GALLIUM_REFCNT_LOG, filter it to the objects that
 # weren't destroyed by the end of the log, and write the results out sorted.
-# Strips stacks by default to prevent OOM. Could probably be rewritten to walk
-# the file twice to preserve stacks without OOM, but this was the easy way.
+#
+# The log is walked twice so that the stacks can be kept on logs of any size:
+# the first pass only records where the events of each live object are in the
+# file, the second one copies them to the output. The leaked objects are also
+# counted by type and by creation stack.
+
+
+class LiveObject:
+    def __init__(self, obj_type, create_offset):
+        self.type = obj_type
+        self.create_offset = create_offset
+        # (offset, length) of each of the events of the object in the log
+        self.spans = array.array('Q')
+
+
+def scan_log(in_file, obj_filter, keep_stacks):
+    """First pass: return the objects which are still alive at the end of the
+    log, in creation order, keyed by address."""
+    objects = {}
+    cur_object = None
+    record_start = 0
+    record_end = 0
+    offset = 0
+
+    def end_record():
+        # The stack of an event ends at the next event.
+        if cur_object is not None:
+            length = (offset if keep_stacks else record_end) - record_start
+            cur_object.spans.extend((record_start, length))
+
+    for line in in_file:
+        if line[:1] == b'<':
+            end_record()
+            cur_object = None
+
+            parts = line.split(b' ')
+            address = parts[1]
+            event = parts[3].strip()
+            if event == b'Destroy':
+                objects.pop(address, None)
+            else:
+                if event == b'Create':
+                    objects.pop(address, None)
+                    if (not obj_filter) or (obj_filter in parts[0]):
+                        objects[address] = LiveObject(parts[0], offset)
+                cur_object = objects.get(address)
+
+            record_start = offset
+            record_end = offset + len(line)
+        offset += len(line)
+
+    end_record()
+    return objects
+
+
+def read_span(in_file, offset, length):
+    in_file.seek(offset)
+    return in_file.read(length)
+
+
+def creation_stack(in_file, obj):
+    """Return the stack of the Create event of obj."""
+    in_file.seek(obj.create_offset)
+    in_file.readline()
+    stack = []
+    for line in in_file:
+        if line[:1] == b'<':
+            break
+        stack.append(line)
+    return b''.join(stack)
+
+
+def write_summary(out, in_file, objects, max_stacks):
+    types = {}
+    stacks = {}
+    for obj in objects.values():
+        types[obj.type] = types.get(obj.type, 0) + 1
+        stack = creation_stack(in_file, obj)
+        counts = stacks.setdefault(stack, {})
+        counts[obj.type] = counts.get(obj.type, 0) + 1
+
+    out.write('{} leaked objects\n\n'.format(len(objects)))
+
+    out.write('Leaked objects by type:\n')
+    for obj_type, count in sorted(types.items(), key=lambda t: (-t[1], t[0])):
+        out.write('{:10} {}\n'.format(count, obj_type.decode(errors='replace')))
+    out.write('\n')
+
+    out.write('Leaked objects by creation stack ({} unique):\n'.format(len(stacks)))
+    stacks = sorted(stacks.items(), key=lambda s: -sum(s[1].values()))
+    if max_stacks is not None:
+        stacks = stacks[:max_stacks]
+    for stack, counts in stacks:
+        out.write('{:10} {}\n'.format(sum(counts.values()), ', '.join(
+            '{} {}'.format(count, obj_type.decode(errors='replace'))
+            for obj_type, count in sorted(counts.items(), key=lambda t: (-t[1], t[0])))))
+        out.write(stack.decode(errors='replace'))
+        out.write('\n')
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--input',
@@ -34,44 +134,39 @@ def main():
                         help='path to file containing refcount log')
     parser.add_argument('--output',
                         action='store',
-                        required=True,
                         help='path to trimmed log')
     parser.add_argument('--filter',
                         help='object type filter')
     parser.add_argument('--keep-stacks',
+                        nargs='?',
+                        const=True,
                         help='keep stacks, otherwise only headers')
+    parser.add_argument('--summary',
+                        action='store',
+                        help='path to the counts of leaked objects by type and '
+                             'creation stack, - for stdout')
+    parser.add_argument('--max-stacks',
+                        type=int,
+                        help='only list the most common creation stacks in the summary')
     args = parser.parse_args()
 
-    objects = {}
+    obj_filter = args.filter.encode() if args.filter else None
+
+    with open(args.input, 'rb') as in_file:
+        objects = scan_log(in_file, obj_filter, bool(args.keep_stacks))
+
+        if args.output:
+            with open(args.output, 'wb') as out_file:
+                for obj in objects.values():
+                    spans = obj.spans
+                    for i in range(0, len(spans), 2):
+                        out_file.write(read_span(in_file, spans[i], spans[i + 1]))
 
-    with open(args.input) as in_file:
-        stack = []
-        cur_object = ''
-
-        for line in in_file:
-            if line[0] == '<':
-
-                parts = line.split(' ')
-                prev_object = cur_object
-                cur_object = parts[1]
-                if parts[3].strip() == 'Destroy':
-                    if cur_object in objects:
-                        del objects[cur_object]
-                else:
-                    if parts[3].strip() == 'Create':
-                        if (not args.filter) or (args.filter in parts[0]):
-                            objects[cur_object] = []
-                    if prev_object in objects:
-                        objects[prev_object] += stack
-
-                stack = [line]
-            elif args.keep_stacks:
-                stack += line
-
-    with open(args.output, 'wt') as out_file:
-        for stack in objects.values():
-            for stack_line in stack:
-                out_file.write(stack_line)
+        if args.summary == '-':
+            write_summary(sys.stdout, in_file, objects, args.max_stacks)
+        elif args.summary:
+            with open(args.summary, 'wt') as out:
+                write_summary(out, in_file, objects, args.max_stacks)
 
 
 if __name__ == '__main__':
@@ -136,6 +136,24 @@ class StringStream:
         self.offset = 0
         self.pos = StringStream.Pos()
 
+    def pos_at(self, offset):
+        base, pos = self.offset, self.pos
+        if offset < base:
+            base, pos = 0, StringStream.Pos()
+        res = StringStream.Pos()
+        newlines = self.data.count('\n', base, offset)
+        if newlines:
+            res.line = pos.line + newlines
+            res.column = offset - self.data.rfind('\n', base, offset)
+        else:
+            res.line = pos.line
+            res.column = pos.column + offset - base
+        return res
+
+    def seek(self, offset):
+        self.pos = self.pos_at(offset)
+        self.offset = offset
+
     def peek(self, num=1):
         return self.data[self.offset:self.offset+num]
 
@@ -145,23 +163,18 @@ class StringStream:
 
     def read(self, num=4294967296):
         res = self.peek(num)
-        self.offset += len(res)
-        for c in res:
-            if c == '\n':
-                self.pos.line += 1
-                self.pos.column = 1
-            else:
-                self.pos.column += 1
+        self.seek(self.offset + len(res))
         return res
 
     def get_line(self, num):
         return self.data.split('\n')[num - 1].rstrip()
 
     def read_line(self):
-        line = ''
-        while self.peek(1) not in ['\n', '']:
-            line += self.read(1)
-        self.read(1)
+        end = self.data.find('\n', self.offset)
+        if end == -1:
+            end = len(self.data)
+        line = self.data[self.offset:end]
+        self.seek(min(end + 1, len(self.data)))
         return line
 
     def skip_whitespace(self, inc_line):
@@ -197,6 +210,7 @@ class MatchResult:
         self.pattern = pattern
         self.pattern_pos = StringStream.Pos()
         self.output_pos = StringStream.Pos()
+        self.output_offset = None
         self.fail_message = ''
 
     def set_pos(self, pattern, output):
@@ -221,22 +235,305 @@ class MatchResult:
             func_res = func_res.func_res
         return '\n'.join(res)
 
+# Patterns are compiled once into a list of tokens, each with the position of
+# its first character in the pattern:
+#
+#   ('literal', line, column, text)   characters expected verbatim
+#   ('escape', line, column)          a '\\', only expects more output
+#   ('newline', line, column)         a line break, skipping whitespace
+#   ('space', line, column)           a sequence of spaces
+#   ('number', line, column, name)    '#', name is None without identifier
+#   ('value', line, column, name)     '$'
+#   ('temp', line, column, name)      '%' followed by an identifier
+#   ('func', line, column, name, args, closed)
+#                                     '@', closed is False if the argument
+#                                     list is missing its ')'
+class CompiledPattern:
+    space_re = re.compile(r'[ \t]*')
+    newline_re = re.compile(r'[ \t\n]*')
+    number_re = re.compile(r'[0-9]*')
+    value_re = re.compile(r'[^ \t\n\r\x0b\x0c]*')
+
+    ident = r'[A-Za-z_][A-Za-z0-9_]*'
+    token_re = re.compile(r'(\\)|(\n)|#(' + ident + r')?|\$(' + ident + ')?|%(' + ident + ')|'
+                          r'@(' + ident + r')(\([^)]*\)?)?|( +)|([^\\\n#$%@ ]+|.)', re.DOTALL)
+
+    def __init__(self, data):
+        self.tokens = []
+        self.has_funcs = False
+
+        i = CompiledPattern.space_re.match(data).end()
+        line = 1
+        column = i + 1
+        escape = False
+        while i < len(data):
+            m = CompiledPattern.token_re.match(data, i)
+            end = m.end()
+            if escape and not (m.group(1) or m.group(2)):
+                # An escaped character is a literal, even if it starts a
+                # variable or a function.
+                end = i + 1
+                self.add_literal(line, column, data[i])
+            elif m.group(1):
+                self.tokens.append(('escape', line, column))
+            elif m.group(2):
+                self.tokens.append(('newline', line, column))
+            elif m.group(0)[0] == '#':
+                self.tokens.append(('number', line, column, m.group(3)))
+            elif m.group(0)[0] == '$':
+                self.tokens.append(('value', line, column, m.group(4) or ''))
+            elif m.group(5):
+                self.tokens.append(('temp', line, column, m.group(5)))
+            elif m.group(6):
+                args = m.group(7) or ''
+                closed = args == '' or args.endswith(')')
+                args = args[1:-1] if args and closed else args[1:]
+                self.tokens.append(('func', line, column, m.group(6), args, closed))
+                self.has_funcs = True
+            elif m.group(8):
+                self.tokens.append(('space', line, column))
+            else:
+                self.add_literal(line, column, m.group(9))
+
+            escape = m.group(1) is not None
+            read = data[i:end]
+            if '\n' in read:
+                line += read.count('\n')
+                column = len(read) - read.rfind('\n')
+            else:
+                column += len(read)
+            i = end
+        self.end_line = line
+        self.end_column = column
+
+        self.filter_re = None
+
+    def add_literal(self, line, column, text):
+        prev = self.tokens[-1] if self.tokens else None
+        if prev and prev[0] == 'literal' and prev[2] + len(prev[3]) == column:
+            self.tokens[-1] = ('literal', prev[1], prev[2], prev[3] + text)
+        else:
+            self.tokens.append(('literal', line, column, text))
+
+    def get_filter_re(self):
+        # A regular expression matching every line where the pattern could
+        # match, used to skip the other lines when searching. It only covers
+        # the tokens up to the first line break or function and ignores the
+        # variables, so it accepts more than the pattern does, but the
+        # pattern can't fail past the end of a line it rejects. A '%' reading
+        # the line break is the exception, which is accepted too.
+        if self.filter_re is None:
+            regex = ''
+            for token in self.tokens:
+                if token[0] in ['newline', 'func']:
+                    break
+                elif token[0] == 'literal':
+                    regex += re.escape(token[3])
+                elif token[0] == 'space':
+                    regex += r'[ \t]+'
+                elif token[0] == 'number':
+                    regex += r'[0-9]+'
+                elif token[0] == 'value':
+                    regex += r'[^ \t\n\r\x0b\x0c]*'
+                elif token[0] == 'temp':
+                    regex += r'(?:\n|%[0-9]+'
+            regex += ')' * regex.count(r'(?:\n|%[0-9]+')
+            self.filter_re = re.compile(r'^[ \t]*' + regex, re.MULTILINE)
+        return self.filter_re
+
+    def next_attempt(self, data, line_start):
+        """Returns the offset of the next attempt of a search after the line
+        ending before line_start, skipping the lines rejected by the
+        filter."""
+        m = self.get_filter_re().search(data, line_start)
+        if m:
+            offset = m.start()
+        else:
+            # Only the last line can end the output without a line break, it
+            # has to be tried to report the failure.
+            offset = max(data.rfind('\n') + 1, line_start)
+        return CompiledPattern.space_re.match(data, offset).end()
+
+    def match(self, g, res, output, offset, in_func, undo):
+        """Matches the pattern at offset, returns (success, offset, retry).
+        On failure, the offset is where the output was read up to and retry
+        tells whether a search may go on with the next line."""
+        data = output.data
+
+        def fail(token, column, msg, report_offset):
+            res.pattern_pos.line = token[1]
+            res.pattern_pos.column = column
+            res.output_offset = report_offset
+            res.fail(msg)
+
+        def bind(name, val):
+            if undo is not None:
+                undo.append((name, name in g, g.get(name)))
+            g[name] = val
+
+        for token in self.tokens:
+            kind = token[0]
+            if offset >= len(data):
+                fail(token, token[2], 'unexpected end of output', offset)
+                return False, offset, True
+            elif kind == 'literal':
+                text = token[3]
+                if data.startswith(text, offset):
+                    offset += len(text)
+                    continue
+                for i in range(len(text)):
+                    if offset + i >= len(data):
+                        fail(token, token[2] + i, 'unexpected end of output', offset + i)
+                        return False, offset + i, True
+                    elif data[offset + i] != text[i]:
+                        fail(token, token[2] + i, 'expected %r in output, got %r' % (text[i], data[offset + i]), offset + i)
+                        return False, offset + i, True
+            elif kind == 'escape':
+                pass
+            elif kind == 'newline':
+                end = CompiledPattern.newline_re.match(data, offset).end()
+                if '\n' not in data[offset:end]:
+                    fail(token, token[2], 'expected newline in output', offset)
+                    return False, end, True
+                offset = end
+            elif kind == 'number':
+                end = CompiledPattern.number_re.match(data, offset).end()
+                num = data[offset:end]
+                name = token[3]
+                if num == '':
+                    fail(token, token[2], 'expected number in output', offset)
+                    return False, end, True
+                elif name is not None:
+                    if name in g and int(num) != g[name]:
+                        fail(token, token[2], 'unexpected number for \'%s\': %d (expected %d)' % (name, int(num), g[name]), offset)
+                        return False, end, True
+                    elif name != '_':
+                        bind(name, int(num))
+                offset = end
+            elif kind == 'value':
+                end = CompiledPattern.value_re.match(data, offset).end()
+                val = data[offset:end]
+                name = token[3]
+                if name in g and val != g[name]:
+                    fail(token, token[2], 'unexpected value for \'%s\': \'%s\' (expected \'%s\')' % (name, val, g[name]), offset)
+                    return False, end, True
+                elif name != '_':
+                    bind(name, val)
+                offset = end
+            elif kind == 'temp':
+                if data[offset] != '%':
+                    fail(token, token[2], 'expected \'%\' in output', offset)
+                    return False, offset + 1, True
+                end = CompiledPattern.number_re.match(data, offset + 1).end()
+                num = data[offset + 1:end]
+                name = token[3]
+                if num == '':
+                    fail(token, token[2], 'expected number in output', offset)
+                    return False, end, True
+                elif name in g and int(num) != g[name]:
+                    fail(token, token[2], 'unexpected number for \'%s\': %d (expected %d)' % (name, int(num), g[name]), offset)
+                    return False, end, True
+                elif name != '_':
+                    bind(name, int(num))
+                offset = end
+            elif kind == 'func':
+                name, args, closed = token[3:]
+                assert(closed)
+                func_res = g['funcs'][name](args)
+                output.seek(offset)
+                match_res = do_match(g, StringStream(func_res, 'expansion of "%s(%s)"' % (name, args)), output, False, True)
+                offset = output.offset
+                if not match_res.success:
+                    res.pattern_pos.line = token[1]
+                    res.pattern_pos.column = token[2]
+                    res.func_res = match_res
+                    res.output_pos = match_res.output_pos
+                    res.output_offset = None
+                    res.fail(match_res.fail_message)
+                    return False, offset, True
+            elif kind == 'space':
+                end = CompiledPattern.space_re.match(data, offset).end()
+                if end == offset:
+                    fail(token, token[2], 'expected whitespace in output, got %r' % (data[offset:offset + 1]), offset)
+                    return False, offset, True
+                offset = end
+
+        if not in_func:
+            end = CompiledPattern.space_re.match(data, offset).end()
+            if data[end:end + 1] not in ['', '\n']:
+                fail(('end', self.end_line), self.end_column, 'expected end of output', offset)
+                return False, end + 1, False
+            offset = min(end + 1, len(data))
+
+        return True, offset, False
+
+compiled_patterns = {}
+
+def compile_pattern(data):
+    if data not in compiled_patterns:
+        compiled_patterns[data] = CompiledPattern(data)
+    return compiled_patterns[data]
+
 def do_match(g, pattern, output, skip_lines, in_func=False):
     assert(not in_func or not skip_lines)
 
+    if not in_func:
+        output.skip_whitespace(False)
+
+    program = compile_pattern(pattern.data)
+    res = MatchResult(pattern)
+    data = output.data
+
+    # Variables bound by a failed attempt are forgotten before the next one.
+    # Functions could change anything, so patterns calling them restore a
+    # copy of the variables instead.
+    old_g = copy.copy(g) if skip_lines and program.has_funcs else None
+    undo = [] if skip_lines and old_g is None else None
+
+    offset = output.offset
+    while True:
+        success, end, retry = program.match(g, res, output, offset, in_func, undo)
+        if not retry or not skip_lines or end >= len(data):
+            break
+
+        if old_g is not None:
+            g.clear()
+            g.update(old_g)
+        else:
+            for name, existed, val in undo[::-1]:
+                if existed:
+                    g[name] = val
+                else:
+                    del g[name]
+            undo.clear()
+        res.success = True
+
+        line_end = data.find('\n', end)
+        offset = program.next_attempt(data, len(data) if line_end == -1 else line_end + 1)
+
+    # The position is only computed for the last failure, counting the lines
+    # of every failed attempt would make searches quadratic.
+    if not res.success and res.output_offset is not None:
+        res.output_pos = output.pos_at(res.output_offset)
+    output.seek(end)
+    return res
+
+# The original matcher, which interprets the pattern one character at a time.
+# check_output_bench.py checks that do_match() gives the same results.
+def legacy_do_match(g, pattern, output, skip_lines, in_func=False):
+    assert(not in_func or not skip_lines)
+
     if not in_func:
         output.skip_whitespace(False)
     pattern.skip_whitespace(False)
 
     old_g = copy.copy(g)
-    old_g_keys = list(g.keys())
     res = MatchResult(pattern)
     escape = False
     while True:
         res.set_pos(pattern, output)
 
         c = pattern.read(1)
-        fail = False
         if c == '':
             break
         elif output.peek() == '':
@@ -292,7 +589,7 @@ def do_match(g, pattern, output, skip_lines, in_func=False):
                     args += pattern.read(1)
                 assert(pattern.read(1) == ')')
             func_res = g['funcs'][name](args)
-            match_res = do_match(g, StringStream(func_res, 'expansion of "%s(%s)"' % (name, args)), output, False, True)
+            match_res = legacy_do_match(g, StringStream(func_res, 'expansion of "%s(%s)"' % (name, args)), output, False, True)
             if not match_res.success:
                 res.func_res = match_res
                 res.output_pos = match_res.output_pos
@@ -485,29 +782,34 @@ def get_cstr(fp):
         else:
             res += c
 
+def read_tests(fp):
+    """Yields (full_name, test_name, variant, source_file, current_result,
+    output) for each test written by aco_tests."""
+    while True:
+        packet_type = fp.read(4)
+        if packet_type == b'':
+            break;
+
+        test_name = get_cstr(fp)
+        test_variant = get_cstr(fp)
+        if test_variant != '':
+            full_name = test_name + '/' + test_variant
+        else:
+            full_name = test_name
+
+        test_source_file = get_cstr(fp)
+        current_result = None
+        if ord(fp.read(1)):
+            current_result = (get_cstr(fp), get_cstr(fp))
+        code_size = struct.unpack("=L", fp.read(4))[0]
+        code = fp.read(code_size).decode('utf-8')
+
+        yield full_name, test_name, test_variant, test_source_file, current_result, code
+
 if __name__ == "__main__":
    results = {}
 
-   stdin = sys.stdin.buffer
-   while True:
-       packet_type = stdin.read(4)
-       if packet_type == b'':
-           break;
-
-       test_name = get_cstr(stdin)
-       test_variant = get_cstr(stdin)
-       if test_variant != '':
-           full_name = test_name + '/' + test_variant
-       else:
-           full_name = test_name
-
-       test_source_file = get_cstr(stdin)
-       current_result = None
-       if ord(stdin.read(1)):
-           current_result = (get_cstr(stdin), get_cstr(stdin))
-       code_size = struct.unpack("=L", stdin.read(4))[0]
-       code = stdin.read(code_size).decode('utf-8')
-
+   for full_name, test_name, test_variant, test_source_file, current_result, code in read_tests(sys.stdin.buffer):
        results[full_name] = parse_and_check_test(test_name, test_variant, test_source_file, code, current_result)
 
    result_types = ['passed', 'failed', 'todo', 'empty']
@@ -0,0 +1,113 @@
+# Copyright © 2026 Mesa contributors
+# SPDX-License-Identifier: MIT
+
+# Benchmarks the compiled patterns of check_output.py against the original
+# matcher, which interprets the patterns one character at a time, on the
+# output of the ACO tests:
+#
+#   aco_tests --save-output aco_tests.out
+#   python3 check_output_bench.py aco_tests.out
+#
+# Both matchers must give the same result and log for every test.
+
+import argparse
+import os.path
+import sys
+import time
+
+import check_output
+
+def find_source(source_file):
+    # The test binary records the path of the sources in its build tree.
+    if os.path.exists(source_file):
+        return source_file
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.basename(source_file))
+
+def run_tests(tests, do_match):
+    """Checks all the tests with the given matcher, returns the results and
+    the time spent matching the patterns of each source file. The code
+    checks take the same time with both matchers and aren't counted."""
+    depth = [0]
+    elapsed = [0.0]
+    def timed_do_match(*args):
+        # Functions in patterns call the matcher recursively.
+        depth[0] += 1
+        start = time.perf_counter()
+        try:
+            return do_match(*args)
+        finally:
+            depth[0] -= 1
+            if depth[0] == 0:
+                elapsed[0] += time.perf_counter() - start
+
+    check_output.do_match = timed_do_match
+    check_output.compiled_patterns.clear()
+
+    results = {}
+    times = {}
+    for full_name, variant, source_file, checks, output in tests:
+        result = check_output.TestResult('passed')
+        elapsed[0] = 0.0
+        check_output.check_output(result, variant, list(checks), output)
+
+        results[full_name] = (result.result, result.log)
+        times[source_file] = times.get(source_file, 0.0) + elapsed[0]
+    return results, times
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('outputs', nargs='+',
+                        help='files written by aco_tests --save-output')
+    parser.add_argument('-n', '--iterations', type=int, default=3,
+                        help='number of runs, the fastest one is reported')
+    args = parser.parse_args()
+
+    tests = []
+    for fname in args.outputs:
+        with open(fname, 'rb') as fp:
+            for full_name, test_name, variant, source_file, current_result, output in check_output.read_tests(fp):
+                # Tests which failed or were skipped in aco_tests aren't checked.
+                if current_result != None:
+                    continue
+                source_file = find_source(source_file)
+                checks, expected = check_output.parse_test_source(test_name, variant, source_file)
+                if checks:
+                    tests.append((full_name, variant, os.path.basename(source_file), checks, output))
+
+    timings = {}
+    compiled_do_match = check_output.do_match
+    for name, do_match in [('reference', check_output.legacy_do_match), ('compiled', compiled_do_match)]:
+        best = None
+        for i in range(args.iterations):
+            results, times = run_tests(tests, do_match)
+            if best is None or sum(times.values()) < sum(best.values()):
+                best = times
+        timings[name] = (results, best)
+
+    reference_results, reference_times = timings['reference']
+    compiled_results, compiled_times = timings['compiled']
+
+    mismatches = [name for name in reference_results if reference_results[name] != compiled_results[name]]
+    for name in mismatches:
+        print('%s%s: the results differ%s' % (check_output.set_red, name, check_output.set_normal))
+        for matcher, results in [('reference', reference_results), ('compiled', compiled_results)]:
+            print('   %s: %s' % (matcher, results[name][0]))
+            for line in results[name][1].rstrip().split('\n'):
+                print('      ' + line.rstrip())
+
+    print('%-24s %6s %12s %12s %8s' % ('source file', 'tests', 'reference', 'compiled', 'speedup'))
+    num_tests = {}
+    for full_name, variant, source_file, checks, output in tests:
+        num_tests[source_file] = num_tests.get(source_file, 0) + 1
+    rows = [(source_file, num_tests[source_file], reference_times[source_file], compiled_times[source_file])
+            for source_file in sorted(num_tests)]
+    rows.append(('total', len(tests), sum(reference_times.values()), sum(compiled_times.values())))
+    for source_file, count, reference, compiled in rows:
+        print('%-24s %6d %11.3fs %11.3fs %7.1fx' % (source_file, count, reference, compiled,
+                                                    reference / compiled if compiled else 0.0))
+
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,7 @@
 #include <set>
 #include <string>
 #include <vector>
+#include <errno.h>
 #include <stdio.h>
 #include <string.h>
 #include <getopt.h>
@@ -35,7 +36,7 @@
 #include "framework.h"
 
 static const char *help_message =
-   "Usage: %s [-h] [-l --list] [--no-check] [TEST [TEST ...]]\n"
+   "Usage: %s [-h] [-l --list] [--no-check] [--save-output FILE] [TEST [TEST ...]]\n"
    "\n"
    "Run ACO unit test(s). If TEST is not provided, all tests are run.\n"
    "\n"
@@ -47,7 +48,10 @@ static const char *help_message =
    "optional arguments:\n"
    "  -h, --help  Show this help message and exit.\n"
    "  -l --list   List unit tests.\n"
-   "  --no-check  Print test output instead of checking it.\n";
+   "  --no-check  Print test output instead of checking it.\n"
+   "  --save-output FILE\n"
+   "              Also write the test output given to check_output.py to\n"
+   "              FILE, e.g. for check_output_bench.py.\n";
 
 std::map<std::string, TestDef> tests;
 FILE *output = NULL;
@@ -57,6 +61,7 @@ static unsigned tests_written = 0;
 static FILE *checker_stdin = NULL;
 static char *checker_stdin_data = NULL;
 static size_t checker_stdin_size = 0;
+static const char *save_output_path = NULL;
 
 static char *output_data = NULL;
 static size_t output_size = 0;
@@ -170,6 +175,17 @@ int check_output(char **argv)
 
    fclose(checker_stdin);
 
+   if (save_output_path) {
+      FILE *f = fopen(save_output_path, "wb");
+      if (!f || fwrite(checker_stdin_data, 1, checker_stdin_size, f) != checker_stdin_size) {
+         fprintf(stderr, "%s: failed to write %s: %s\n", argv[0], save_output_path, strerror(errno));
+         if (f)
+            fclose(f);
+         return 99;
+      }
+      fclose(f);
+   }
+
    int stdin_pipe[2];
    pipe(stdin_pipe);
 
@@ -215,6 +231,7 @@ int main(int argc, char **argv)
       { "help",     no_argument, &print_help, 1 },
       { "list",     no_argument, &do_list,    1 },
       { "no-check", no_argument, &do_check,   0 },
+      { "save-output", required_argument, NULL, 's' },
       { NULL,       0,           NULL,        0 }
    };
 
@@ -227,6 +244,9 @@ int main(int argc, char **argv)
       case 'l':
          do_list = 1;
          break;
+      case 's':
+         save_output_path = optarg;
+         break;
       case 0:
          break;
       case '?':
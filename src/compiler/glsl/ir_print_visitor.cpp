@@ -107,6 +107,19 @@ void ir_print_visitor::indent(void)
       fprintf(f, "  ");
 }
 
+/* Numbers of the names made up by unique_name(), they are shared by the
+ * printers of a process.
+ */
+static unsigned unique_name_arg = 1;
+static unsigned unique_name_index = 1;
+
+void
+ir_print_visitor::reset_unique_names(void)
+{
+   unique_name_arg = 1;
+   unique_name_index = 1;
+}
+
 const char *
 ir_print_visitor::unique_name(ir_variable *var)
 {
@@ -116,8 +129,7 @@ ir_print_visitor::unique_name(ir_variable *var)
     * names hash because this is the only scope where it can ever appear.
     */
    if (var->name == NULL) {
-      static unsigned arg = 1;
-      return ralloc_asprintf(this->mem_ctx, "parameter@%u", arg++);
+      return ralloc_asprintf(this->mem_ctx, "parameter@%u", unique_name_arg++);
    }
 
    /* Do we already have a name for this variable? */
@@ -133,8 +145,7 @@ ir_print_visitor::unique_name(ir_variable *var)
    if (_mesa_symbol_table_find_symbol(this->symbols, var->name) == NULL) {
       name = var->name;
    } else {
-      static unsigned i = 1;
-      name = ralloc_asprintf(this->mem_ctx, "%s@%u", var->name, ++i);
+      name = ralloc_asprintf(this->mem_ctx, "%s@%u", var->name, ++unique_name_index);
    }
    _mesa_hash_table_insert(this->printable_names, var, (void *) name);
    _mesa_symbol_table_add_symbol(this->symbols, name, var);
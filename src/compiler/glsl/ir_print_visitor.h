@@ -40,6 +40,12 @@ public:
 
    void indent(void);
 
+   /**
+    * Number the names made up for the variables from the start again, as
+    * in a new process.
+    */
+   static void reset_unique_names(void);
+
    /**
     * \name Visit methods
     *
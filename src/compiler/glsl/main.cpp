@@ -36,8 +36,10 @@
 
 #include "main/mtypes.h"
 #include "standalone.h"
+#include "util/ralloc.h"
 
 static struct standalone_options options;
+static int batch;
 
 const struct option compiler_opts[] = {
    { "dump-ast", no_argument, &options.dump_ast, 1 },
@@ -47,6 +49,7 @@ const struct option compiler_opts[] = {
    { "link",     no_argument, &options.do_link,  1 },
    { "just-log", no_argument, &options.just_log, 1 },
    { "lower-precision", no_argument, &options.lower_precision, 1 },
+   { "batch",    no_argument, &batch, 1 },
    { "version",  required_argument, NULL, 'v' },
    { NULL, 0, NULL, 0 }
 };
@@ -60,9 +63,13 @@ usage_fail(const char *name)
 
    const char *header =
       "usage: %s [options] <file.vert | file.tesc | file.tese | file.geom | file.frag | file.comp>\n"
+      "       %s [options] --batch\n"
+      "\n"
+      "With --batch, the shaders are read from stdin, see\n"
+      "standalone_read_batch_request().\n"
       "\n"
       "Possible options are:\n";
-   printf(header, name);
+   printf(header, name, name);
    for (const struct option *o = compiler_opts; o->name != 0; ++o) {
       printf("    --%s", o->name);
       if (o->has_arg == required_argument)
@@ -89,12 +96,43 @@ main(int argc, char * const* argv)
       }
    }
 
-   if (argc <= optind)
-      usage_fail(argv[0]);
-
    struct gl_shader_program *whole_program;
    static struct gl_context local_ctx;
 
+   if (batch) {
+      standalone_begin_batch();
+
+      void *mem_ctx = ralloc_context(NULL);
+      unsigned num_args;
+      char **args;
+      char *source;
+      while (standalone_read_batch_request(mem_ctx, &num_args, &args, &source)) {
+         whole_program = NULL;
+         if (num_args == 1) {
+            whole_program = standalone_compile_shader_sources(&options, 1, args,
+                                                              &source, &local_ctx);
+         } else {
+            printf("Expected the name of one shader, got %u arguments.\n",
+                   num_args);
+         }
+
+         if (whole_program)
+            standalone_compiler_cleanup(whole_program);
+
+         standalone_finish_batch_request(whole_program ? EXIT_SUCCESS : EXIT_FAILURE);
+
+         ralloc_free(mem_ctx);
+         mem_ctx = ralloc_context(NULL);
+      }
+      ralloc_free(mem_ctx);
+
+      standalone_end_batch();
+      return status;
+   }
+
+   if (argc <= optind)
+      usage_fail(argv[0]);
+
    whole_program = standalone_compile_shader(&options, argc - optind,
                                              &argv[optind], &local_ctx);
 
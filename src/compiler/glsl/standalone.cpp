@@ -40,6 +40,7 @@
 #include "linker.h"
 #include "glsl_parser_extras.h"
 #include "ir_builder_print_visitor.h"
+#include "ir_print_visitor.h"
 #include "builtin_functions.h"
 #include "opt_add_neg_to_sub.h"
 #include "main/mtypes.h"
@@ -393,6 +394,18 @@ compile_shader(struct gl_context *ctx, struct gl_shader *shader)
 extern "C" struct gl_shader_program *
 standalone_compile_shader(const struct standalone_options *_options,
       unsigned num_files, char* const* files, struct gl_context *ctx)
+{
+   return standalone_compile_shader_sources(_options, num_files, files, NULL,
+                                            ctx);
+}
+
+/* Compiles the given sources if not NULL, or loads them from the files,
+ * the names are only used to get the stages and in the logs.
+ */
+extern "C" struct gl_shader_program *
+standalone_compile_shader_sources(const struct standalone_options *_options,
+      unsigned num_files, char* const* files, const char* const* sources,
+      struct gl_context *ctx)
 {
    int status = EXIT_SUCCESS;
    bool glsl_es = false;
@@ -488,10 +501,14 @@ standalone_compile_shader(const struct standalone_options *_options,
          goto fail;
       shader->Stage = _mesa_shader_enum_to_shader_stage(shader->Type);
 
-      shader->Source = load_text_file(whole_program, files[i]);
-      if (shader->Source == NULL) {
-         printf("File \"%s\" does not exist.\n", files[i]);
-         exit(EXIT_FAILURE);
+      if (sources) {
+         shader->Source = ralloc_strdup(whole_program, sources[i]);
+      } else {
+         shader->Source = load_text_file(whole_program, files[i]);
+         if (shader->Source == NULL) {
+            printf("File \"%s\" does not exist.\n", files[i]);
+            exit(EXIT_FAILURE);
+         }
       }
 
       compile_shader(ctx, shader);
@@ -618,3 +635,65 @@ standalone_compiler_cleanup(struct gl_shader_program *whole_program)
    ralloc_free(whole_program);
    _mesa_glsl_builtin_functions_decref();
 }
+
+extern "C" void
+standalone_begin_batch(void)
+{
+   /* Keep the built-in functions around between the requests instead of
+    * compiling them for every shader.
+    */
+   _mesa_glsl_builtin_functions_init_or_ref();
+}
+
+extern "C" void
+standalone_end_batch(void)
+{
+   _mesa_glsl_builtin_functions_decref();
+}
+
+extern "C" bool
+standalone_read_batch_request(void *mem_ctx, unsigned *num_args,
+                              char ***args, char **source)
+{
+   unsigned size;
+
+   if (scanf("%u %u", num_args, &size) != 2 || getchar() != '\n')
+      return false;
+
+   *args = ralloc_array(mem_ctx, char *, *num_args + 1);
+   for (unsigned i = 0; i < *num_args; i++) {
+      char *arg = ralloc_strdup(mem_ctx, "");
+      int c;
+
+      while ((c = getchar()) != '\n') {
+         if (c == EOF)
+            return false;
+
+         char ch = c;
+         ralloc_strncat(&arg, &ch, 1);
+      }
+      (*args)[i] = arg;
+   }
+   (*args)[*num_args] = NULL;
+
+   *source = (char *) ralloc_size(mem_ctx, size + 1);
+   if (fread(*source, 1, size, stdin) != size)
+      return false;
+   (*source)[size] = '\0';
+
+   return true;
+}
+
+extern "C" void
+standalone_finish_batch_request(int status)
+{
+   fputc('\0', stdout);
+   printf("%d\n", status);
+   fflush(stdout);
+
+   fputc('\0', stderr);
+   fflush(stderr);
+
+   /* The output of the next request mustn't depend on this one. */
+   ir_print_visitor::reset_unique_names();
+}
@@ -24,6 +24,8 @@
 #ifndef GLSL_STANDALONE_H
 #define GLSL_STANDALONE_H
 
+#include <stdbool.h>
+
 #ifdef __cplusplus
 extern "C" {
 #endif
@@ -46,8 +48,33 @@ struct gl_shader_program * standalone_compile_shader(
       unsigned num_files, char* const* files,
       struct gl_context *ctx);
 
+struct gl_shader_program * standalone_compile_shader_sources(
+      const struct standalone_options *options,
+      unsigned num_shaders, char* const* names,
+      const char* const* sources, struct gl_context *ctx);
+
 void standalone_compiler_cleanup(struct gl_shader_program *prog);
 
+/* Batch mode, used by the tests to run many shaders through a single
+ * process. Each request on stdin is a line with the number of arguments and
+ * the size of the source, then one argument per line and the source. The
+ * output of a request is followed by a NUL character and its exit status on
+ * a line, and by a NUL character on stderr.
+ *
+ * The requests are read between standalone_begin_batch() and
+ * standalone_end_batch(), which keep the state shared by the requests (the
+ * built-in functions) alive. Each request starts from the state of a new
+ * process otherwise.
+ */
+void standalone_begin_batch(void);
+
+void standalone_end_batch(void);
+
+bool standalone_read_batch_request(void *mem_ctx, unsigned *num_args,
+                                   char ***args, char **source);
+
+void standalone_finish_batch_request(int status);
+
 #ifdef __cplusplus
 }
 #endif
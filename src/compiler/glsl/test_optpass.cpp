@@ -42,6 +42,7 @@
 #include "program.h"
 #include "ir_reader.h"
 #include "standalone_scaffolding.h"
+#include "standalone.h"
 #include "main/mtypes.h"
 
 using namespace std;
@@ -139,40 +140,12 @@ do_optimization_passes(struct exec_list *ir, char **optimizations,
    return overall_progress;
 }
 
-int test_optpass(int argc, char **argv)
+static int
+run_optpass(const char *input, char **optimizations, int num_optimizations,
+            int input_format_ir, int loop, int shader_type, int quiet)
 {
-   int input_format_ir = 0; /* 0=glsl, 1=ir */
-   int loop = 0;
-   int shader_type = GL_VERTEX_SHADER;
-   int quiet = 0;
    int error;
 
-   const struct option optpass_opts[] = {
-      { "input-ir", no_argument, &input_format_ir, 1 },
-      { "input-glsl", no_argument, &input_format_ir, 0 },
-      { "loop", no_argument, &loop, 1 },
-      { "vertex-shader", no_argument, &shader_type, GL_VERTEX_SHADER },
-      { "fragment-shader", no_argument, &shader_type, GL_FRAGMENT_SHADER },
-      { "quiet", no_argument, &quiet, 1 },
-      { NULL, 0, NULL, 0 }
-   };
-
-   int idx = 0;
-   int c;
-   while ((c = getopt_long(argc, argv, "", optpass_opts, &idx)) != -1) {
-      if (c != 0) {
-         printf("*** usage: %s optpass <optimizations> <options>\n", argv[0]);
-         printf("\n");
-         printf("Possible options are:\n");
-         printf("  --input-ir: input format is IR\n");
-         printf("  --input-glsl: input format is GLSL (the default)\n");
-         printf("  --loop: run optimizations repeatedly until no progress\n");
-         printf("  --vertex-shader: test with a vertex shader (the default)\n");
-         printf("  --fragment-shader: test with a fragment shader\n");
-         exit(EXIT_FAILURE);
-      }
-   }
-
    struct gl_context local_ctx;
    struct gl_context *ctx = &local_ctx;
    initialize_context_to_defaults(ctx, API_OPENGL_COMPAT);
@@ -183,17 +156,15 @@ int test_optpass(int argc, char **argv)
    shader->Type = shader_type;
    shader->Stage = _mesa_shader_enum_to_shader_stage(shader_type);
 
-   string input = read_stdin_to_eof();
-
    struct _mesa_glsl_parse_state *state
       = new(shader) _mesa_glsl_parse_state(ctx, shader->Stage, shader);
 
    if (input_format_ir) {
       shader->ir = new(shader) exec_list;
       _mesa_glsl_initialize_types(state);
-      _mesa_glsl_read_ir(state, shader->ir, input.c_str(), true);
+      _mesa_glsl_read_ir(state, shader->ir, input, true);
    } else {
-      shader->Source = input.c_str();
+      shader->Source = input;
       const char *source = shader->Source;
       state->error = glcpp_preprocess(state, &source, &state->info_log,
                                       NULL, NULL, ctx) != 0;
@@ -222,8 +193,8 @@ int test_optpass(int argc, char **argv)
       const struct gl_shader_compiler_options *options =
          &ctx->Const.ShaderCompilerOptions[_mesa_shader_enum_to_shader_stage(shader_type)];
       do {
-         progress = do_optimization_passes(shader->ir, &argv[optind],
-                                           argc - optind, quiet != 0, options);
+         progress = do_optimization_passes(shader->ir, optimizations,
+                                           num_optimizations, quiet != 0, options);
       } while (loop && progress);
    }
 
@@ -252,3 +223,66 @@ int test_optpass(int argc, char **argv)
    return error;
 }
 
+int test_optpass(int argc, char **argv)
+{
+   int input_format_ir = 0; /* 0=glsl, 1=ir */
+   int loop = 0;
+   int shader_type = GL_VERTEX_SHADER;
+   int quiet = 0;
+   int batch = 0;
+
+   const struct option optpass_opts[] = {
+      { "input-ir", no_argument, &input_format_ir, 1 },
+      { "input-glsl", no_argument, &input_format_ir, 0 },
+      { "loop", no_argument, &loop, 1 },
+      { "vertex-shader", no_argument, &shader_type, GL_VERTEX_SHADER },
+      { "fragment-shader", no_argument, &shader_type, GL_FRAGMENT_SHADER },
+      { "quiet", no_argument, &quiet, 1 },
+      { "batch", no_argument, &batch, 1 },
+      { NULL, 0, NULL, 0 }
+   };
+
+   int idx = 0;
+   int c;
+   while ((c = getopt_long(argc, argv, "", optpass_opts, &idx)) != -1) {
+      if (c != 0) {
+         printf("*** usage: %s optpass <optimizations> <options>\n", argv[0]);
+         printf("\n");
+         printf("Possible options are:\n");
+         printf("  --input-ir: input format is IR\n");
+         printf("  --input-glsl: input format is GLSL (the default)\n");
+         printf("  --loop: run optimizations repeatedly until no progress\n");
+         printf("  --vertex-shader: test with a vertex shader (the default)\n");
+         printf("  --fragment-shader: test with a fragment shader\n");
+         printf("  --batch: read the inputs and the optimizations from stdin,\n");
+         printf("           see standalone_read_batch_request()\n");
+         exit(EXIT_FAILURE);
+      }
+   }
+
+   if (batch) {
+      standalone_begin_batch();
+
+      void *mem_ctx = ralloc_context(NULL);
+      unsigned num_args;
+      char **args;
+      char *input;
+      while (standalone_read_batch_request(mem_ctx, &num_args, &args, &input)) {
+         int error = run_optpass(input, args, num_args, input_format_ir, loop,
+                                 shader_type, quiet);
+         standalone_finish_batch_request(error);
+
+         ralloc_free(mem_ctx);
+         mem_ctx = ralloc_context(NULL);
+      }
+      ralloc_free(mem_ctx);
+
+      standalone_end_batch();
+      return 0;
+   }
+
+   string input = read_stdin_to_eof();
+
+   return run_optpass(input.c_str(), &argv[optind], argc - optind,
+                      input_format_ir, loop, shader_type, quiet);
+}
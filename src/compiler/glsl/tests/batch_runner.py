@@ -0,0 +1,157 @@
+# encoding=utf-8
+# Copyright © 2026 Mesa contributors
+# SPDX-License-Identifier: MIT
+
+"""Run many shaders through a few processes of the standalone compilers.
+
+With --batch, glsl_compiler and glsl_test optpass read their inputs from stdin
+instead of handling a single one (see standalone_read_batch_request()), which
+saves starting a process and compiling the built-in functions for each test.
+"""
+
+import concurrent.futures
+import os
+import subprocess
+import threading
+
+
+class BatchProcess:
+    """A standalone compiler running in batch mode."""
+
+    def __init__(self, command):
+        self.proc = subprocess.Popen(command,
+                                     stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE,
+                                     stderr=subprocess.PIPE)
+        self.stdout = bytearray()
+
+        # stderr is drained by a thread, so that the process can't block on
+        # it while we wait for its stdout.
+        self.stderr = bytearray()
+        self.stderr_closed = False
+        self.stderr_cond = threading.Condition()
+        self.stderr_thread = threading.Thread(target=self._read_stderr,
+                                              daemon=True)
+        self.stderr_thread.start()
+
+    def _read_stderr(self):
+        while True:
+            data = self.proc.stderr.read1(65536)
+            with self.stderr_cond:
+                if data:
+                    self.stderr += data
+                else:
+                    self.stderr_closed = True
+                self.stderr_cond.notify()
+            if not data:
+                return
+
+    def _read_stdout(self):
+        data = self.proc.stdout.read1(65536)
+        self.stdout += data
+        return len(data) != 0
+
+    def run(self, args, source):
+        """Run a request, returns its (status, stdout, stderr).
+
+        If the process died instead, the status is its return code and it
+        mustn't be used anymore."""
+        data = source.encode('utf-8')
+        request = '{} {}\n'.format(len(args), len(data)).encode('utf-8')
+        request += ''.join(arg + '\n' for arg in args).encode('utf-8')
+        try:
+            self.proc.stdin.write(request + data)
+            self.proc.stdin.flush()
+        except BrokenPipeError:
+            return self._died()
+
+        # The output is followed by a NUL character and the status.
+        while True:
+            end = self.stdout.find(b'\0')
+            if end != -1:
+                status_end = self.stdout.find(b'\n', end)
+                if status_end != -1:
+                    break
+            if not self._read_stdout():
+                return self._died()
+
+        out = bytes(self.stdout[:end])
+        status = int(self.stdout[end + 1:status_end])
+        del self.stdout[:status_end + 1]
+
+        with self.stderr_cond:
+            while b'\0' not in self.stderr and not self.stderr_closed:
+                self.stderr_cond.wait()
+            end = self.stderr.find(b'\0')
+            if end == -1:
+                end = len(self.stderr)
+            err = bytes(self.stderr[:end])
+            del self.stderr[:end + 1]
+
+        return status, out.decode('utf-8'), err.decode('utf-8')
+
+    def _close_stdin(self):
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+
+    def _died(self):
+        self._close_stdin()
+        while self._read_stdout():
+            pass
+        self.proc.wait()
+        self.stderr_thread.join()
+        return (self.proc.returncode, self.stdout.decode('utf-8'),
+                self.stderr.decode('utf-8'))
+
+    def close(self):
+        if self.proc.returncode is None:
+            self._close_stdin()
+            self.proc.wait()
+        self.stderr_thread.join()
+        self.proc.stdout.close()
+        self.proc.stderr.close()
+
+
+def run_batch(command, requests, jobs=None):
+    """Run the (args, source) requests through processes of command, which
+    must be in batch mode, jobs of them at most.
+
+    Returns the (status, stdout, stderr) of each request, in order. A process
+    dying on a request is replaced for the next ones, and the status of that
+    request is the return code of the process."""
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(requests)))
+
+    results = [None] * len(requests)
+    pending = iter(enumerate(requests))
+    lock = threading.Lock()
+
+    def worker():
+        proc = None
+        try:
+            while True:
+                with lock:
+                    item = next(pending, None)
+                if item is None:
+                    return
+
+                i, (args, source) = item
+                if proc is None:
+                    proc = BatchProcess(command)
+                results[i] = proc.run(args, source)
+                if proc.proc.returncode is not None:
+                    proc.close()
+                    proc = None
+        finally:
+            if proc is not None:
+                proc.close()
+
+    with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+        workers = [pool.submit(worker) for _ in range(jobs)]
+        for future in workers:
+            future.result()
+
+    return results
@@ -19,12 +19,15 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import argparse
 import sys
 import subprocess
 import tempfile
 import re
 from collections import namedtuple
 
+import batch_runner
+
 
 Test = namedtuple("Test", "name source match_re")
 
@@ -2277,20 +2280,39 @@ TESTS = [
 ]
 
 
+COMPILER_OPTIONS = ['--version', '300', '--lower-precision', '--dump-lir']
+
+
 def compile_shader(standalone_compiler, source):
     with tempfile.NamedTemporaryFile(mode='wt', suffix='.frag') as source_file:
         print(source, file=source_file)
         source_file.flush()
-        return subprocess.check_output([standalone_compiler,
-                                        '--version', '300',
-                                        '--lower-precision',
-                                        '--dump-lir',
-                                        source_file.name],
+        return subprocess.check_output([standalone_compiler] +
+                                       COMPILER_OPTIONS +
+                                       [source_file.name],
                                        universal_newlines=True)
 
 
-def run_test(standalone_compiler, test):
-    ir = compile_shader(standalone_compiler, test.source)
+def compile_shaders(standalone_compiler, sources, jobs=None):
+    """Compile the fragment shaders in a few glsl_compiler processes, returns
+    the (status, IR, stderr) of each one."""
+    return batch_runner.run_batch([standalone_compiler] + COMPILER_OPTIONS +
+                                  ['--batch'],
+                                  [(['shader.frag'], source + '\n')
+                                   for source in sources],
+                                  jobs)
+
+
+def run_test(standalone_compiler, test, result=None):
+    if result is None:
+        ir = compile_shader(standalone_compiler, test.source)
+    else:
+        status, ir, err = result
+        sys.stderr.write(err)
+        if status != 0:
+            print(ir)
+            print('glsl_compiler exited with status {}'.format(status))
+            return False
 
     if re.search(test.match_re, ir) is None:
         print(ir)
@@ -2300,13 +2322,23 @@ def run_test(standalone_compiler, test):
 
 
 def main():
-    standalone_compiler = sys.argv[1]
+    parser = argparse.ArgumentParser()
+    parser.add_argument('standalone_compiler',
+                        help='The glsl_compiler binary.')
+    parser.add_argument('-j', '--jobs',
+                        type=int,
+                        help='Number of compiler processes, defaults to the '
+                             'number of CPUs.')
+    args = parser.parse_args()
     passed = 0
 
-    for test in TESTS:
+    results = compile_shaders(args.standalone_compiler,
+                              [test.source for test in TESTS], args.jobs)
+
+    for test, result in zip(TESTS, results):
         print('Testing {} ... '.format(test.name), end='')
 
-        result = run_test(standalone_compiler, test)
+        result = run_test(args.standalone_compiler, test, result)
 
         if result:
             print('PASS')
@@ -25,9 +25,9 @@ import argparse
 import difflib
 import errno
 import os
-import subprocess
 import sys
 
+import batch_runner
 import sexps
 import lower_jump_cases
 
@@ -45,6 +45,10 @@ def arg_parser():
         '--test-runner',
         required=True,
         help='The glsl_test binary.')
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        help='Number of glsl_test processes, defaults to the number of CPUs.')
     return parser.parse_args()
 
 
@@ -79,37 +83,34 @@ def main():
 
     runner = get_test_runner(args.test_runner)
 
-    for gen in lower_jump_cases.CASES:
-        for name, opt, source, expected in gen():
-            total += 1
-            print('{}: '.format(name), end='')
-            proc = subprocess.Popen(
-                runner + ['optpass', '--quiet', '--input-ir', opt],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.PIPE)
-            out, err = proc.communicate(source.encode('utf-8'))
-            out = out.decode('utf-8')
-            err = err.decode('utf-8')
-
-            if proc.returncode == 255:
-                print("Test returned general error, possibly missing linker")
-                sys.exit(77)
-
-            if err:
-                print('FAIL')
-                print('Unexpected output on stderr: {}'.format(err),
-                      file=sys.stdout)
-                continue
-
-            result = compare(out, expected)
-            if result is not None:
-                print('FAIL')
-                for l in result:
-                    print(l, file=sys.stderr)
-            else:
-                print('PASS')
-                passes += 1
+    tests = [test for gen in lower_jump_cases.CASES for test in gen()]
+    results = batch_runner.run_batch(
+        runner + ['optpass', '--quiet', '--input-ir', '--batch'],
+        [([opt], source) for name, opt, source, expected in tests],
+        args.jobs)
+
+    for (name, opt, source, expected), (returncode, out, err) in zip(tests, results):
+        total += 1
+        print('{}: '.format(name), end='')
+
+        if returncode == 255:
+            print("Test returned general error, possibly missing linker")
+            sys.exit(77)
+
+        if err:
+            print('FAIL')
+            print('Unexpected output on stderr: {}'.format(err),
+                  file=sys.stdout)
+            continue
+
+        result = compare(out, expected)
+        if result is not None:
+            print('FAIL')
+            for l in result:
+                print(l, file=sys.stderr)
+        else:
+            print('PASS')
+            passes += 1
 
     print('{}/{} tests returned correct results'.format(passes, total))
     exit(0 if passes == total else 1)
@@ -25,9 +25,15 @@
 
 import ast
 from collections import defaultdict
+import array
+import atexit
+import hashlib
 import itertools
+import os
+import pickle
 import struct
 import sys
+import time
 import mako.template
 import re
 import traceback
@@ -814,10 +820,40 @@ class TreeAutomaton(object):
    automaton using only symbol filtering. The filtering is crucial to reduce
    both the time taken to generate the tables and the size of the tables.
    """
-   def __init__(self, transforms):
+   def __init__(self, transforms, name=None, table_encoding='dense'):
+      assert table_encoding in ('dense', 'comb')
+      self.table_encoding = table_encoding
       self.patterns = [t.search for t in transforms]
+      # Time spent in each phase of the construction, see
+      # AlgebraicPass.print_stats()
+      self.phase_times = {}
+
+      cache = automaton_cache
+      if cache is not None:
+         start = time.perf_counter()
+         key = cache.key(self.patterns)
+         entry = cache.load(key)
+         self.phase_times['cache lookup'] = time.perf_counter() - start
+         if entry is not None:
+            self._restore(entry)
+            return
+         previous = cache.load_previous(name)
+      else:
+         previous = None
+
+      start = time.perf_counter()
       self._compute_items()
-      self._build_table()
+      items_done = time.perf_counter()
+      self._build_table(previous)
+      self.phase_times['items'] = items_done - start
+      self.phase_times['table'] = time.perf_counter() - items_done
+      if cache is not None:
+         build_time = time.perf_counter() - start
+         if previous is not None:
+            cache.reused_transitions += self.reused_transitions
+            cache.transitions += sum(len(t) for t in self.transitions.values())
+            cache.time_saved += max(previous['build_time'] - build_time, 0)
+         cache.store(key, name, self._save(), build_time)
       #print('num items: {}'.format(len(set(self.items.values()))))
       #print('num states: {}'.format(len(self.states)))
       #for state, patterns in zip(self.states, self.patterns):
@@ -876,6 +912,9 @@ class TreeAutomaton(object):
       def __init__(self, opcode, children):
          self.opcode = opcode
          self.children = children
+         # Structural key, identifying the item across runs of the
+         # generator. The same as str(self).
+         self.key = '(' + ', '.join([opcode] + [c.key for c in children]) + ')'
          # These are the indices of patterns for which this item is the root node.
          self.patterns = []
          # This the set of opcodes for parents of this item. Used to speed up
@@ -883,7 +922,7 @@ class TreeAutomaton(object):
          self.parent_ops = set()
 
       def __str__(self):
-         return '(' + ', '.join([self.opcode] + [str(c) for c in self.children]) + ')'
+         return self.key
 
       def __repr__(self):
          return str(self)
@@ -946,13 +985,27 @@ class TreeAutomaton(object):
       for i, pattern in enumerate(self.patterns):
          process_subpattern(pattern, i)
 
-   def _build_table(self):
+   def _op_signatures(self):
+      """Return, for each opcode, a string identifying its items. Comp_a only
+      depends on the items of opcode a, so its results can be reused between
+      automatons where these are the same.
+      """
+      keys = defaultdict(list)
+      for (op, children), item in self.items.items():
+         keys[op].append(', '.join(c.key for c in children) + ' -> ' + item.key)
+      return {op: '\n'.join(sorted(k)) for op, k in keys.items()}
+
+   def _build_table(self, previous=None):
       """This is the core algorithm which builds up the transition table. It
       is based off of Algorithm 5.7.38 "Reachability-based tabulation of Cl .
       Comp_a and Filt_{a,i} using integers to identify match sets." It
       simultaneously builds up a list of all possible "match sets" or
       "states", where each match set represents the set of Item's that match a
       given instruction, and builds up the transition table between states.
+
+      previous is an optional saved automaton (see _save()) built from a
+      similar set of patterns, whose transitions are reused for the opcodes
+      whose items didn't change, instead of computing Comp_a again.
       """
       # Map from opcode + filtered state indices to transitioned state.
       self.table = defaultdict(dict)
@@ -1034,6 +1087,21 @@ class TreeAutomaton(object):
       self.states.add(frozenset((self.const,self.wildcard)))
       process_new_states()
 
+      # Transitions that can be reused from the previous automaton, as maps
+      # from filtered state keys to previous filtered state indices.
+      self.op_signatures = self._op_signatures()
+      self.reused_transitions = 0
+      reuse = {}
+      if previous is not None:
+         item_by_key = {item.key: item for item in self.items.values()}
+         previous_states = previous['states']
+         # Map from previous state index to our corresponding state
+         prev_parents = {}
+         for op, signature in self.op_signatures.items():
+            if previous['op_signatures'].get(op) == signature and op in previous['rep']:
+               prev_rep = {keys: i for i, keys in enumerate(previous['rep'][op])}
+               reuse[op] = (prev_rep, [], previous['transitions'][op])
+
       while len(new_opcodes) > 0:
          for op in new_opcodes:
             rep = self.rep[op]
@@ -1044,12 +1112,36 @@ class TreeAutomaton(object):
             else:
                num_srcs = opcodes[op].num_inputs
 
+            if op in reuse:
+               # Map our filtered states to the previous ones
+               prev_rep, prev_indices, prev_transitions = reuse[op]
+               for src in itertools.islice(rep, len(prev_indices), None):
+                  prev_indices.append(prev_rep.get(frozenset(item.key for item in src)))
+               prev_num_filtered = len(prev_rep)
+
             # Iterate over all possible source combinations where at least one
             # is on the worklist.
             for src_indices in itertools.product(range(len(rep)), repeat=num_srcs):
                if all(src_idx < op_worklist_index for src_idx in src_indices):
                   continue
 
+               if op in reuse:
+                  prev_index = 0
+                  for src_idx in src_indices:
+                     prev_src_idx = prev_indices[src_idx]
+                     if prev_src_idx is None:
+                        break
+                     prev_index = prev_index * prev_num_filtered + prev_src_idx
+                  else:
+                     prev_state = prev_transitions[prev_index]
+                     parent = prev_parents.get(prev_state)
+                     if parent is None:
+                        parent = frozenset(item_by_key[key] for key in previous_states[prev_state])
+                        prev_parents[prev_state] = parent
+                     table[src_indices] = self.states.add(parent)
+                     self.reused_transitions += 1
+                     continue
+
                srcs = tuple(rep[src_idx] for src_idx in src_indices)
 
                # Try all possible pairings of source items and add the
@@ -1066,6 +1158,338 @@ class TreeAutomaton(object):
          new_opcodes.clear()
          process_new_states()
 
+      # Dense transition tables, as emitted: for each opcode, the state for
+      # every combination of filtered source states, the last source varying
+      # fastest.
+      self.num_filtered_states = {}
+      self.transitions = {}
+      for op in self.opcodes:
+         table = self.table[op]
+         num_filtered = len(self.rep[op])
+         num_srcs = len(next(iter(table)))
+         self.num_filtered_states[op] = num_filtered
+         self.transitions[op] = array.array('H', (table[indices] for indices in
+            itertools.product(range(num_filtered), repeat=num_srcs)))
+
+   def comb_table(self, op):
+      """Return the row displacement encoding of an opcode's transitions, or
+      None if it isn't smaller than the dense table or can't be encoded."""
+      if not hasattr(self, '_comb_tables'):
+         self._comb_tables = {}
+      if op not in self._comb_tables:
+         comb = CombTable(self.transitions[op], self.num_filtered_states[op])
+         if not comb.valid or comb.table_bytes() >= 2 * len(self.transitions[op]):
+            comb = None
+         self._comb_tables[op] = comb
+      return self._comb_tables[op]
+
+   def emitted_comb_table(self, op):
+      """Return the CombTable to emit for an opcode, or None to emit the
+      dense table."""
+      if self.table_encoding != 'comb':
+         return None
+      return self.comb_table(op)
+
+   def table_bytes(self, op):
+      """Return the size of the filter and transition tables emitted for an
+      opcode."""
+      filter_bytes = 0
+      if any(e != 0 for e in self.filter[op]):
+         filter_bytes = 2 * len(self.filter[op])
+      return filter_bytes, 2 * len(self.transitions[op])
+
+   def pattern_state_growth(self):
+      """Attribute the states of the automaton to the patterns.
+
+      A state exists because of the items it is made of, so each state is
+      split evenly between the patterns using any of its items (other than
+      the wildcard and constant ones, which every state can have). Returns
+      a list of (attributed states, states containing one of the pattern's
+      items) for each pattern, indexed like self.patterns.
+      """
+      # Patterns using each item, as a subtree or at the root
+      users = defaultdict(set)
+
+      def visit(src, pattern):
+         if isinstance(src, Expression):
+            opcode = src.opcode
+            stripped = opcode.rstrip('0123456789')
+            if stripped in conv_opcode_types:
+               opcode = stripped
+            children = tuple(visit(c, pattern) for c in src.sources)
+            item = self.items[opcode, children]
+         elif isinstance(src, Constant) or src.is_constant:
+            item = self.const
+         else:
+            item = self.wildcard
+         users[item].add(pattern)
+         return item
+
+      for i, pattern in enumerate(self.patterns):
+         visit(pattern, i)
+
+      growth = [[0.0, 0] for _ in self.patterns]
+      for state in self.states:
+         patterns = set()
+         for item in state:
+            if item is not self.wildcard and item is not self.const:
+               patterns |= users[item]
+         for pattern in patterns:
+            growth[pattern][0] += 1.0 / len(patterns)
+            growth[pattern][1] += 1
+      return [tuple(g) for g in growth]
+
+   def _save(self):
+      """Return the automaton as plain data, for the automaton cache.
+
+      Besides what's needed to emit the tables, this includes the states and
+      filtered states as keys of their items, so that a later _build_table()
+      can reuse the transitions.
+      """
+      return {
+         'opcodes': list(self.opcodes),
+         'filter': {op: array.array('H', self.filter[op]) for op in self.opcodes},
+         'num_filtered_states': self.num_filtered_states,
+         'transitions': self.transitions,
+         'state_patterns': self.state_patterns,
+         'state_pattern_offsets': self.state_pattern_offsets,
+         'states': [frozenset(item.key for item in state) for state in self.states],
+         'rep': {op: [frozenset(item.key for item in filtered) for filtered in self.rep[op]]
+                 for op in self.opcodes},
+         'op_signatures': self.op_signatures,
+      }
+
+   def _restore(self, entry):
+      self._comb_tables = {}
+      self.opcodes = entry['opcodes']
+      self.filter = entry['filter']
+      self.num_filtered_states = entry['num_filtered_states']
+      self.transitions = entry['transitions']
+      self.state_patterns = entry['state_patterns']
+      self.state_pattern_offsets = entry['state_pattern_offsets']
+
+
+class CombTable(object):
+   """Row displacement ("comb vector") encoding of a dense transition table.
+
+   The dense table of an opcode with n filtered states and k sources is seen
+   as n^(k-1) rows, indexed by the filtered states of the first k-1 sources,
+   of n columns, indexed by the filtered state of the last source. Identical
+   rows are merged, and the entries of each distinct row that differ from
+   the most common state are stored in a shared comb vector, each row being
+   displaced so that its entries land in free slots. The check vector
+   records which row owns each slot; the other entries of a row are the
+   default state. A lookup is then:
+
+      row = row_map[prefix]       (only for k > 1)
+      slot = row_offset[row] + col
+      state = check[slot] == row ? comb[slot] : default_state
+
+   This must match nir_algebraic_automaton() in nir_search.c.
+   """
+
+   NO_ROW = 0xffff
+
+   def __init__(self, transitions, num_filtered):
+      self.num_filtered = num_filtered
+      num_rows = len(transitions) // num_filtered if num_filtered else 0
+
+      counts = defaultdict(int)
+      for state in transitions:
+         counts[state] += 1
+      self.default_state = max(counts, key=lambda state: (counts[state], -state)) if counts else 0
+
+      # Deduplicate the rows
+      rows = TreeAutomaton.IndexMap()
+      row_map = []
+      for i in range(num_rows):
+         row_map.append(rows.add(tuple(transitions[i * num_filtered:(i + 1) * num_filtered])))
+      self.row_map = row_map if num_rows > 1 else None
+
+      # First fit placement, the rows with the most entries first
+      entries = [[(col, state) for col, state in enumerate(row) if state != self.default_state]
+                 for row in rows]
+      row_offset = [0] * len(rows)
+      comb = []
+      check = []
+      first_free = 0
+      for row in sorted(range(len(rows)), key=lambda r: -len(entries[r])):
+         if not entries[row]:
+            continue
+         # Start at the first free slot, there is no room before it.
+         while first_free < len(check) and check[first_free] != self.NO_ROW:
+            first_free += 1
+         cols = [col for col, state in entries[row]]
+         offset = max(first_free - cols[0], 0)
+         while any(offset + col < len(check) and check[offset + col] != self.NO_ROW
+                   for col in cols):
+            offset += 1
+         end = offset + num_filtered
+         if len(check) < end:
+            comb.extend([0] * (end - len(check)))
+            check.extend([self.NO_ROW] * (end - len(check)))
+         for col, state in entries[row]:
+            comb[offset + col] = state
+            check[offset + col] = row
+         row_offset[row] = offset
+
+      # Rows with no entries still need lookups to stay in bounds.
+      if len(check) < num_filtered:
+         comb.extend([0] * (num_filtered - len(check)))
+         check.extend([self.NO_ROW] * (num_filtered - len(check)))
+
+      self.row_offset = row_offset
+      self.comb = comb
+      self.check = check
+      self.valid = len(rows) < self.NO_ROW and len(comb) <= 0xffff + 1
+
+      if self.valid:
+         for index, state in enumerate(transitions):
+            assert self.lookup(index) == state
+
+   def lookup(self, index):
+      """Return the state for an index into the dense table."""
+      prefix, col = divmod(index, self.num_filtered)
+      row = self.row_map[prefix] if self.row_map is not None else 0
+      slot = self.row_offset[row] + col
+      return self.comb[slot] if self.check[slot] == row else self.default_state
+
+   def loads(self, index):
+      """Return the number of table loads done by a lookup."""
+      prefix, col = divmod(index, self.num_filtered)
+      row = self.row_map[prefix] if self.row_map is not None else 0
+      slot = self.row_offset[row] + col
+      return (self.row_map is not None) + 2 + (self.check[slot] == row)
+
+   def table_bytes(self):
+      row_map_bytes = 2 * len(self.row_map) if self.row_map is not None else 0
+      return row_map_bytes + 2 * (len(self.row_offset) + len(self.comb) + len(self.check))
+
+
+class AutomatonCache(object):
+   """Content-addressed cache of TreeAutomaton tables.
+
+   Entries are keyed by a hash of everything the automaton depends on: the
+   search patterns, as far as the automaton sees them, the opcode table and
+   the generator itself. On a miss, the last automaton built for the same
+   pass, if any, is used to reconstruct the new one incrementally.
+   """
+
+   # Maximum number of entries kept, the least recently used ones are
+   # removed first.
+   max_entries = 32
+
+   def __init__(self, directory):
+      self.directory = directory
+      self.hits = 0
+      self.misses = 0
+      self.time_saved = 0.0
+      self.reused_transitions = 0
+      self.transitions = 0
+      os.makedirs(directory, exist_ok=True)
+
+      with open(__file__, 'rb') as f:
+         generator = hashlib.sha256(f.read()).hexdigest()
+      ops = ['{} {} {}'.format(name, op.num_inputs,
+                               '2src_commutative' in op.algebraic_properties)
+             for name, op in sorted(opcodes.items())]
+      self.base_key = generator + '\n' + '\n'.join(ops) + '\n'
+
+      atexit.register(self.report)
+
+   @staticmethod
+   def from_environment():
+      directory = os.environ.get('NIR_ALGEBRAIC_CACHE_DIR')
+      return AutomatonCache(directory) if directory else None
+
+   @staticmethod
+   def _pattern_key(src):
+      # Mirrors TreeAutomaton._compute_items.process_subpattern()
+      if isinstance(src, Constant) or (isinstance(src, Variable) and src.is_constant):
+         return '#'
+      elif isinstance(src, Variable):
+         return '*'
+      opcode = src.opcode
+      stripped = opcode.rstrip('0123456789')
+      if stripped in conv_opcode_types:
+         opcode = stripped
+      return '(' + ' '.join([opcode] + [AutomatonCache._pattern_key(c) for c in src.sources]) + ')'
+
+   def key(self, patterns):
+      data = self.base_key + '\n'.join(self._pattern_key(p) for p in patterns)
+      return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+   def _path(self, name):
+      return os.path.join(self.directory, name)
+
+   def _read(self, key):
+      try:
+         with open(self._path(key + '.automaton'), 'rb') as f:
+            return pickle.load(f)
+      except (OSError, EOFError, pickle.UnpicklingError):
+         return None
+
+   def load(self, key):
+      start = time.perf_counter()
+      entry = self._read(key)
+      if entry is None:
+         self.misses += 1
+         return None
+      # Mark the entry as recently used
+      os.utime(self._path(key + '.automaton'))
+      self.hits += 1
+      self.time_saved += max(entry['build_time'] - (time.perf_counter() - start), 0)
+      return entry
+
+   def load_previous(self, name):
+      if name is None:
+         return None
+      try:
+         with open(self._path(name + '.last'), 'rt') as f:
+            key = f.read().strip()
+      except OSError:
+         return None
+      return self._read(key)
+
+   def store(self, key, name, entry, build_time):
+      entry['build_time'] = build_time
+
+      # Write atomically, as several generators may run in parallel.
+      path = self._path(key + '.automaton')
+      tmp = '{}.{}.tmp'.format(path, os.getpid())
+      with open(tmp, 'wb') as f:
+         pickle.dump(entry, f, pickle.HIGHEST_PROTOCOL)
+      os.replace(tmp, path)
+
+      if name is not None:
+         tmp = '{}.{}.tmp'.format(self._path(name + '.last'), os.getpid())
+         with open(tmp, 'wt') as f:
+            f.write(key + '\n')
+         os.replace(tmp, self._path(name + '.last'))
+
+      entries = sorted((f for f in os.listdir(self.directory) if f.endswith('.automaton')),
+                       key=lambda f: os.path.getmtime(self._path(f)))
+      for f in entries[:-self.max_entries]:
+         try:
+            os.remove(self._path(f))
+         except OSError:
+            pass
+
+   def report(self, file=sys.stderr):
+      lookups = self.hits + self.misses
+      if not lookups:
+         return
+      print('nir_algebraic: automaton cache: {}/{} hits ({:.0f}%), {:.2f}s saved'.format(
+               self.hits, lookups, 100.0 * self.hits / lookups, self.time_saved),
+            file=file)
+      if self.reused_transitions:
+         print('nir_algebraic: automaton cache: {}/{} transitions reused by incremental rebuilds'.format(
+                  self.reused_transitions, self.transitions),
+               file=file)
+
+
+automaton_cache = AutomatonCache.from_environment()
+
 _algebraic_pass_template = mako.template.Template("""
 #include "nir.h"
 #include "nir_builder.h"
@@ -1127,18 +1551,40 @@ static const struct per_op_table ${pass_name}_pass_op_table[nir_num_search_ops]
       % endfor
       },
 % endif
-      <%
-        num_filtered = len(automaton.rep[op])
-      %>
-      .num_filtered_states = ${num_filtered},
+      .num_filtered_states = ${automaton.num_filtered_states[op]},
+<% comb = automaton.emitted_comb_table(op) %>
+% if comb is None:
       .table = (const uint16_t []) {
-      <%
-        num_srcs = len(next(iter(automaton.table[op])))
-      %>
-      % for indices in itertools.product(range(num_filtered), repeat=num_srcs):
-         ${automaton.table[op][indices]},
+      % for state in automaton.transitions[op]:
+         ${state},
+      % endfor
+      },
+% else:
+      .table = NULL,
+% if comb.row_map is not None:
+      .row_map = (const uint16_t []) {
+      % for row in comb.row_map:
+         ${row},
       % endfor
       },
+% endif
+      .row_offset = (const uint16_t []) {
+      % for offset in comb.row_offset:
+         ${offset},
+      % endfor
+      },
+      .comb = (const uint16_t []) {
+      % for state in comb.comb:
+         ${state},
+      % endfor
+      },
+      .check = (const uint16_t []) {
+      % for row in comb.check:
+         ${row},
+      % endfor
+      },
+      .default_state = ${comb.default_state},
+% endif
    },
 % endfor
 };
@@ -1187,7 +1633,8 @@ ${pass_name}(nir_shader *shader)
 
 
 class AlgebraicPass(object):
-   def __init__(self, pass_name, transforms):
+   def __init__(self, pass_name, transforms, table_encoding='dense'):
+      start = time.perf_counter()
       self.xforms = []
       self.opcode_xforms = defaultdict(lambda : [])
       self.pass_name = pass_name
@@ -1243,13 +1690,84 @@ class AlgebraicPass(object):
                print("{}".format(xform.search.cond), file=sys.stderr)
                error = True
 
-      self.automaton = TreeAutomaton(self.xforms)
+      parse_time = time.perf_counter() - start
+      self.automaton = TreeAutomaton(self.xforms, pass_name, table_encoding)
+      self.phase_times = {'parse': parse_time}
+      self.phase_times.update(self.automaton.phase_times)
 
       if error:
          sys.exit(1)
 
 
    def render(self):
+      start = time.perf_counter()
+      result = self._render()
+      self.phase_times['render'] = time.perf_counter() - start
+      return result
+
+   def print_stats(self, file=sys.stderr, num_patterns=20):
+      """Print statistics about the generated automaton, and which patterns
+      make it big, to help keeping the generated code and the tables small.
+      """
+      automaton = self.automaton
+      print('{}: {} transforms'.format(self.pass_name, len(self.xforms)), file=file)
+      print('  time per phase: ' + ', '.join('{} {:.3f}s'.format(phase, t)
+            for phase, t in self.phase_times.items()), file=file)
+
+      if not hasattr(automaton, 'states'):
+         print('  automaton restored from the cache, no statistics', file=file)
+         return
+
+      items = defaultdict(set)
+      for (op, children), item in automaton.items.items():
+         items[op].add(item)
+      targets = defaultdict(set)
+      for op, table in automaton.table.items():
+         targets[op].update(table.values())
+
+      total_filter_bytes = total_table_bytes = total_comb_bytes = 0
+      dense_loads = comb_loads = lookups = 0
+      rows = []
+      for op in automaton.opcodes:
+         filter_bytes, table_bytes = automaton.table_bytes(op)
+         # The comb encoding is only used where it is smaller
+         comb = automaton.comb_table(op)
+         comb_bytes = comb.table_bytes() if comb else table_bytes
+         total_filter_bytes += filter_bytes
+         total_table_bytes += table_bytes
+         total_comb_bytes += comb_bytes
+         # Table loads per lookup, assuming all the entries are equally likely
+         num_entries = len(automaton.transitions[op])
+         lookups += num_entries
+         dense_loads += num_entries
+         comb_loads += sum(comb.loads(i) for i in range(num_entries)) if comb else num_entries
+         rows.append((filter_bytes + table_bytes, op, len(items[op]),
+                      len(targets[op]), automaton.num_filtered_states[op],
+                      filter_bytes, table_bytes, comb_bytes))
+
+      print('  {} items, {} states, {} filtered states, {} table bytes ({} filter + {} transition)'.format(
+               len(set(automaton.items.values())), len(automaton.states),
+               sum(automaton.num_filtered_states.values()),
+               total_filter_bytes + total_table_bytes, total_filter_bytes, total_table_bytes),
+            file=file)
+      print('  transition bytes: {} dense, {} comb ({:.1f}%); loads per lookup: {:.2f} dense, {:.2f} comb'.format(
+               total_table_bytes, total_comb_bytes,
+               100.0 * total_comb_bytes / max(total_table_bytes, 1),
+               dense_loads / max(lookups, 1), comb_loads / max(lookups, 1)),
+            file=file)
+      print('  {:>24} {:>6} {:>7} {:>9} {:>9} {:>9} {:>9}'.format(
+               'opcode', 'items', 'states', 'filtered', 'filter B', 'table B', 'comb B'), file=file)
+      for total, op, num_items, num_states, num_filtered, filter_bytes, table_bytes, comb_bytes in sorted(rows, reverse=True):
+         print('  {:>24} {:>6} {:>7} {:>9} {:>9} {:>9} {:>9}'.format(
+                  op, num_items, num_states, num_filtered, filter_bytes, table_bytes, comb_bytes), file=file)
+
+      growth = automaton.pattern_state_growth()
+      order = sorted(range(len(growth)), key=lambda i: growth[i], reverse=True)
+      print('  patterns responsible for the most states (attributed, containing):', file=file)
+      for i in order[:num_patterns]:
+         print('  {:8.1f} {:6} {}'.format(growth[i][0], growth[i][1], self.xforms[i].search), file=file)
+
+   def _render(self):
       return _algebraic_pass_template.render(pass_name=self.pass_name,
                                              xforms=self.xforms,
                                              opcode_xforms=self.opcode_xforms,
@@ -24,6 +24,7 @@
 # Authors:
 #    Jason Ekstrand (jason@jlekstrand.net)
 
+import argparse
 from collections import OrderedDict
 import nir_algebraic
 from nir_opcodes import type_sizes
@@ -2895,10 +2896,30 @@ distribute_src_mods = [
    (('fabs', ('fsign(is_used_once)', a)), ('fsign', ('fabs', a))),
 ]
 
-print(nir_algebraic.AlgebraicPass("nir_opt_algebraic", optimizations).render())
-print(nir_algebraic.AlgebraicPass("nir_opt_algebraic_before_ffma",
-                                  before_ffma_optimizations).render())
-print(nir_algebraic.AlgebraicPass("nir_opt_algebraic_late",
-                                  late_optimizations).render())
-print(nir_algebraic.AlgebraicPass("nir_opt_algebraic_distribute_src_mods",
-                                  distribute_src_mods).render())
+parser = argparse.ArgumentParser()
+parser.add_argument('--cache-dir', help='directory caching the automaton tables')
+parser.add_argument('--stats', action='store_true',
+                    help='print statistics about the automatons to stderr')
+parser.add_argument('--table-encoding', choices=['dense', 'comb'], default='dense',
+                    help='encoding of the transition tables: dense arrays, or '
+                         'row displacement where it is smaller')
+args = parser.parse_args()
+if args.stats:
+   # Statistics need the automatons to be built
+   nir_algebraic.automaton_cache = None
+elif args.cache_dir:
+   nir_algebraic.automaton_cache = nir_algebraic.AutomatonCache(args.cache_dir)
+
+passes = [
+   ("nir_opt_algebraic", optimizations),
+   ("nir_opt_algebraic_before_ffma", before_ffma_optimizations),
+   ("nir_opt_algebraic_late", late_optimizations),
+   ("nir_opt_algebraic_distribute_src_mods", distribute_src_mods),
+]
+
+for pass_name, transforms in passes:
+   algebraic_pass = nir_algebraic.AlgebraicPass(pass_name, transforms,
+                                                args.table_encoding)
+   print(algebraic_pass.render())
+   if args.stats:
+      algebraic_pass.print_stats()
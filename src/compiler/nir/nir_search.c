@@ -826,18 +826,33 @@ nir_algebraic_automaton(nir_instr *instr, struct util_dynarray *states,
        * itertools.product(), which was used to emit the transition
        * table.
        */
-      unsigned index = 0;
-      for (unsigned i = 0; i < nir_op_infos[op].num_inputs; i++) {
+      unsigned num_inputs = nir_op_infos[op].num_inputs;
+      unsigned index = 0, col = 0;
+      for (unsigned i = 0; i < num_inputs; i++) {
          index *= tbl->num_filtered_states;
+         col = 0;
          if (tbl->filter)
-            index += tbl->filter[*util_dynarray_element(states, uint16_t,
-                                                        alu->src[i].src.ssa->index)];
+            col = tbl->filter[*util_dynarray_element(states, uint16_t,
+                                                     alu->src[i].src.ssa->index)];
+         index += col;
+      }
+
+      uint16_t new_state;
+      if (tbl->table) {
+         new_state = tbl->table[index];
+      } else {
+         /* The row is selected by all the sources but the last. */
+         unsigned row = tbl->row_map ?
+            tbl->row_map[(index - col) / tbl->num_filtered_states] : 0;
+         unsigned slot = tbl->row_offset[row] + col;
+         new_state = tbl->check[slot] == row ? tbl->comb[slot] :
+                                               tbl->default_state;
       }
 
       uint16_t *state = util_dynarray_element(states, uint16_t,
                                               alu->dest.dest.ssa.index);
-      if (*state != tbl->table[index]) {
-         *state = tbl->table[index];
+      if (*state != new_state) {
+         *state = new_state;
          return true;
       }
       return false;
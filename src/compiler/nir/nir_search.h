@@ -175,7 +175,23 @@ typedef struct {
 struct per_op_table {
    const uint16_t *filter;
    unsigned num_filtered_states;
+
+   /* Dense transition table, indexed by the filtered states of the sources
+    * in the order of Python's itertools.product().
+    */
    const uint16_t *table;
+
+   /* Row displacement encoding of the transition table, used when table is
+    * NULL. A row is selected by the filtered states of all but the last
+    * source (row_map is NULL for unary opcodes, which have a single row),
+    * and the state for the last source is comb[row_offset[row] + col] if
+    * check[] of that slot holds the row, default_state otherwise.
+    */
+   const uint16_t *row_map;
+   const uint16_t *row_offset;
+   const uint16_t *comb;
+   const uint16_t *check;
+   uint16_t default_state;
 };
 
 struct transform {
@@ -9,9 +9,10 @@ import sys
 #
 parser = argparse.ArgumentParser()
 parser.add_argument('-p', '--import-path', required=True)
-parser.add_argument('--utrace-src', required=True)
-parser.add_argument('--utrace-hdr', required=True)
-parser.add_argument('--perfetto-hdr', required=True)
+parser.add_argument('--utrace-src')
+parser.add_argument('--utrace-hdr')
+parser.add_argument('--perfetto-hdr')
+parser.add_argument('--utrace-py', help='python module for the offline analysis of traces')
 args = parser.parse_args()
 sys.path.insert(0, args.import_path)
 
@@ -23,6 +24,7 @@ from u_trace import TracepointArg as Arg
 from u_trace import TracepointArgStruct as ArgStruct
 from u_trace import utrace_generate
 from u_trace import utrace_generate_perfetto_utils
+from u_trace import utrace_generate_py
 
 # List of the default tracepoints enabled. By default tracepoints are enabled,
 # set tp_default_enabled=False to disable them by default.
@@ -117,3 +119,4 @@ utrace_generate(cpath=args.utrace_src,
                 trace_toggle_name='tu_gpu_tracepoint',
                 trace_toggle_defaults=tu_default_tps)
 utrace_generate_perfetto_utils(hpath=args.perfetto_hdr)
+utrace_generate_py(pypath=args.utrace_py, script='tu_tracepoints.py')
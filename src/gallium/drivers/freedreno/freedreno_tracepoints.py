@@ -29,8 +29,9 @@ import sys
 #
 parser = argparse.ArgumentParser()
 parser.add_argument('-p', '--import-path', required=True)
-parser.add_argument('-C', '--src', required=True)
-parser.add_argument('-H', '--hdr', required=True)
+parser.add_argument('-C', '--src')
+parser.add_argument('-H', '--hdr')
+parser.add_argument('-P', '--py', help='python module for the offline analysis of traces')
 args = parser.parse_args()
 sys.path.insert(0, args.import_path)
 
@@ -39,6 +40,7 @@ from u_trace import Header
 from u_trace import Tracepoint
 from u_trace import TracepointArg
 from u_trace import utrace_generate
+from u_trace import utrace_generate_py
 
 # List of the default tracepoints enabled. By default tracepoints are enabled,
 # set tp_default_enabled=False to disable them by default.
@@ -153,3 +155,4 @@ utrace_generate(cpath=args.src,
                 ctx_param='struct pipe_context *pctx',
                 trace_toggle_name='fd_gpu_tracepoint',
                 trace_toggle_defaults=fd_default_tps)
+utrace_generate_py(pypath=args.py, script='freedreno_tracepoints.py')
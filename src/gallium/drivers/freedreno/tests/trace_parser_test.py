@@ -0,0 +1,111 @@
+# Copyright © 2026 Mesa contributors
+# SPDX-License-Identifier: MIT
+
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+trace_parser = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', 'trace-parser.py')
+
+# Two frames as written by u_trace, the first one only has blits, so its rows
+# don't have any of the renderpass columns:
+log = '''\
+0000000000001000        +0: start_blit: 0,0 -> 0,0
+0000000000001400      +400: end_blit
+ELAPSED: 1500 ns
+END OF FRAME 0
+0000000000002000        +0: flush_batch: 0xdead: cleared=7, gmem_reason=0x0, num_draws=12
+0000000000002000        +0: framebuffer: 1920x1080x1@1, nr_cbufs: 1
+0000000000002000        +0: surface: 1920x1080@1, fmt=PIPE_FORMAT_B8G8R8A8_UNORM
+0000000000002000        +0: render_gmem: 4x3 bins of 480x368
+0000000000002100      +100: end_prologue
+0000000000002300      +200: end_binning_ib
+0000000000002300        +0: start_clear_restore: fast_cleared: 0x7
+0000000000002350       +50: end_clear_restore
+0000000000003350     +1000: end_draw_ib
+0000000000003650      +300: end_resolve
+ELAPSED: 1700 ns
+0000000000004000        +0: flush_batch: 0xbeef: cleared=0, gmem_reason=0x1, num_draws=3
+0000000000004000        +0: framebuffer: 256x256x1@1, nr_cbufs: 1
+0000000000004000        +0: surface: 256x256@1, fmt=PIPE_FORMAT_R8G8B8A8_UNORM
+0000000000004000        +0: render_sysmem
+0000000000004040       +40: end_prologue
+0000000000004240      +200: end_draw_ib
+ELAPSED: 250 ns
+END OF FRAME 1
+'''
+
+class TraceParserTests(unittest.TestCase):
+    def setUp(self):
+        fd, self.log = tempfile.mkstemp(suffix='.log')
+        with os.fdopen(fd, 'w') as f:
+            f.write(log)
+
+    def tearDown(self):
+        os.unlink(self.log)
+
+    def run_parser(self, *args, check=True):
+        return subprocess.run([sys.executable, trace_parser] + list(args) + [self.log],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              universal_newlines=True, check=check)
+
+    def test_csv(self):
+        rows = list(csv.DictReader(io.StringIO(self.run_parser('-f', 'csv').stdout)))
+
+        self.assertEqual([(r['frame'], r['renderpass'], r['type']) for r in rows],
+                         [('0', '', 'frame'),
+                          ('1', '', 'frame'),
+                          ('1', '0', 'gmem'),
+                          ('1', '1', 'sysmem')])
+        self.assertEqual(rows[0]['blits'], '1')
+        self.assertEqual(rows[0]['total_ns'], '1500')
+        self.assertEqual(rows[1]['total_ns'], '1950')
+        self.assertEqual(rows[1]['gmem_passes'], '1')
+        self.assertEqual(rows[1]['sysmem_passes'], '1')
+
+        gmem, sysmem = rows[2], rows[3]
+        self.assertEqual((gmem['width'], gmem['height']), ('1920', '1080'))
+        self.assertEqual((gmem['nbins_x'], gmem['nbins_y']), ('4', '3'))
+        self.assertEqual(gmem['formats'], 'PIPE_FORMAT_B8G8R8A8_UNORM')
+        self.assertEqual(gmem['fast_cleared'], '0x7')
+        self.assertEqual(gmem['binning_ns'], '200')
+        self.assertEqual(gmem['restore_clear_ns'], '50')
+        self.assertEqual(gmem['draw_ns'], '1000')
+        self.assertEqual(gmem['resolve_ns'], '300')
+        self.assertEqual(gmem['elapsed_ns'], '1700')
+        self.assertEqual(sysmem['nbins_x'], '')
+        self.assertEqual(sysmem['num_draws'], '3')
+        self.assertEqual(sysmem['elapsed_ns'], '250')
+
+    def test_json(self):
+        result = json.loads(self.run_parser('-f', 'json', '-s', '-p', '0,50,100').stdout)
+
+        frames = result['frames']
+        self.assertEqual([f['frame'] for f in frames], [0, 1])
+        self.assertEqual(frames[0]['renderpasses'], [])
+        self.assertEqual(frames[0]['blit_ns'], 1500)
+        self.assertEqual([rp['type'] for rp in frames[1]['renderpasses']],
+                         ['gmem', 'sysmem'])
+        self.assertEqual(frames[1]['renderpasses'][0]['draw_ns'], 1000)
+
+        total = result['summary']['total_ns']
+        self.assertEqual(total['min'], 1500)
+        self.assertEqual(total['max'], 1950)
+        self.assertEqual(total['p0'], 1500)
+        self.assertEqual(total['p50'], 1725)
+        self.assertEqual(total['p100'], 1950)
+
+    def test_invalid_percentile(self):
+        for p in ['101', '-1', 'x']:
+            result = self.run_parser('-s', '-p', p, check=False)
+            self.assertEqual(result.returncode, 2)
+            self.assertIn('--percentiles', result.stderr)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 
+import argparse
+import concurrent.futures
+import csv
+import gzip
+import json
+import os
 import re
 import sys
-import gzip
-import io
 
 # Captures per-frame state, including all the renderpasses, and
 # time spent in blits and compute jobs:
@@ -17,33 +21,69 @@ class Frame:
         self.times_compute = []
         self.times_blit = []
 
-    def print(self):
+    def totals(self):
+        totals = {
+            'prologue': 0,
+            'binning': 0,
+            'restore_clear': 0,
+            'draw': 0,
+            'resolve': 0,
+            'elapsed': 0,
+        }
+        for renderpass in self.renderpasses:
+            totals['prologue'] += renderpass.prologue_time
+            totals['binning'] += renderpass.binning_time
+            totals['restore_clear'] += renderpass.restore_clear_time
+            totals['draw'] += renderpass.draw_time
+            totals['resolve'] += renderpass.resolve_time
+            totals['elapsed'] += renderpass.elapsed_time
+        totals['blit'] = sum(self.times_blit)
+        totals['compute'] = sum(self.times_compute)
+        totals['gmem'] = sum(self.times_gmem)
+        totals['sysmem'] = sum(self.times_sysmem)
+        totals['total'] = totals['blit'] + totals['sysmem'] + totals['gmem'] + totals['compute']
+        return totals
+
+    def stats(self):
+        """Return the statistics of the frame, times in ns."""
+        totals = self.totals()
+        return {
+            'frame': self.frame_nr,
+            'blits': len(self.times_blit),
+            'sysmem_passes': len(self.times_sysmem),
+            'gmem_passes': len(self.times_gmem),
+            'computes': len(self.times_compute),
+            'prologue_ns': totals['prologue'],
+            'binning_ns': totals['binning'],
+            'restore_clear_ns': totals['restore_clear'],
+            'draw_ns': totals['draw'],
+            'resolve_ns': totals['resolve'],
+            'blit_ns': totals['blit'],
+            'compute_ns': totals['compute'],
+            'gmem_ns': totals['gmem'],
+            'sysmem_ns': totals['sysmem'],
+            'total_ns': totals['total'],
+        }
+
+    def print(self, file=None):
         print("FRAME[{}]: {} blits ({:,} ns), {} SYSMEM ({:,} ns), {} GMEM ({:,} ns), {} COMPUTE ({:,} ns)".format(
                 self.frame_nr,
                 len(self.times_blit),    sum(self.times_blit),
                 len(self.times_sysmem),  sum(self.times_sysmem),
                 len(self.times_gmem),    sum(self.times_gmem),
                 len(self.times_compute), sum(self.times_compute)
-            ))
+            ), file=file)
 
-        i = 0
-        prologue_time = 0
-        binning_time = 0
-        restore_clear_time = 0
-        draw_time = 0
-        resolve_time = 0
-        elapsed_time = 0
-        total_time = sum(self.times_blit) + sum(self.times_sysmem) + sum(self.times_gmem) + sum(self.times_compute)
+        for i, renderpass in enumerate(self.renderpasses):
+            renderpass.print(i, file=file)
 
-        for renderpass in self.renderpasses:
-            renderpass.print(i)
-            prologue_time += renderpass.prologue_time
-            binning_time += renderpass.binning_time
-            restore_clear_time += renderpass.restore_clear_time
-            draw_time += renderpass.draw_time
-            resolve_time += renderpass.resolve_time
-            elapsed_time += renderpass.elapsed_time
-            i += 1
+        totals = self.totals()
+        prologue_time = totals['prologue']
+        binning_time = totals['binning']
+        restore_clear_time = totals['restore_clear']
+        draw_time = totals['draw']
+        resolve_time = totals['resolve']
+        total_time = totals['total']
 
         print("  TOTAL: prologue: {:,} ns ({}%), binning: {:,} ns ({}%), restore/clear: {:,} ns ({}%), draw: {:,} ns ({}%), resolve: {:,} ns ({}%), blit: {:,} ns ({}%), compute: {:,} ns ({}%), GMEM: {:,} ns ({}%), sysmem: {:,} ns ({}%), total: {:,} ns\n".format(
                 prologue_time, 100.0 * prologue_time / total_time,
@@ -56,7 +96,7 @@ class Frame:
                 sum(self.times_gmem), 100.0 * sum(self.times_gmem) / total_time,
                 sum(self.times_sysmem), 100.0 * sum(self.times_sysmem) / total_time,
                 total_time
-            ))
+            ), file=file)
 
 class FramebufferState:
     def __init__(self, width, height, layers, samples, nr_cbufs):
@@ -112,7 +152,31 @@ class RenderPass:
         self.vsc_overflow_test_time = 0
         self.resolve_time = 0
 
-    def print_gmem_pass(self, nr):
+    def stats(self):
+        """Return the statistics of the renderpass, times in ns."""
+        binning = self.binning_state
+        return {
+            'type': 'gmem' if binning else 'sysmem',
+            'width': self.fb.width if self.fb else None,
+            'height': self.fb.height if self.fb else None,
+            'nbins_x': binning.nbins_x if binning else None,
+            'nbins_y': binning.nbins_y if binning else None,
+            'num_draws': self.num_draws,
+            'cleared': self.cleared,
+            'fast_cleared': self.fast_cleared,
+            'gmem_reason': self.gmem_reason,
+            'formats': " ".join(self.fb.get_formats()) if self.fb else None,
+            'state_restore_ns': self.state_restore_time,
+            'prologue_ns': self.prologue_time,
+            'binning_ns': self.binning_time,
+            'vsc_overflow_test_ns': self.vsc_overflow_test_time,
+            'restore_clear_ns': self.restore_clear_time,
+            'draw_ns': self.draw_time,
+            'resolve_ns': self.resolve_time,
+            'elapsed_ns': self.elapsed_time,
+        }
+
+    def print_gmem_pass(self, nr, file=None):
         print("  GMEM[{}]: {}x{} ({}x{} tiles), {} draws, prologue: {:,} ns, binning: {:,} ns, restore/clear: {:,} ns, draw: {:,} ns, resolve: {:,} ns, total: {:,} ns, rt/zs: {}".format(
                 nr, self.fb.width, self.fb.height,
                 self.binning_state.nbins_x, self.binning_state.nbins_y,
@@ -120,189 +184,344 @@ class RenderPass:
                 self.restore_clear_time, self.draw_time, self.resolve_time,
                 self.elapsed_time,
                 ", ".join(self.fb.get_formats())
-            ))
+            ), file=file)
 
-    def print_sysmem_pass(self, nr):
+    def print_sysmem_pass(self, nr, file=None):
         print("  SYSMEM[{}]: {}x{}, {} draws, prologue: {:,} ns, clear: {:,} ns, draw: {:,} ns, total: {:,} ns, rt/zs: {}".format(
                 nr, self.fb.width, self.fb.height,
                 self.num_draws, self.prologue_time,
                 self.restore_clear_time, self.draw_time,
                 self.elapsed_time,
                 ", ".join(self.fb.get_formats())
-            ))
+            ), file=file)
 
-    def print(self, nr):
+    def print(self, nr, file=None):
         if self.binning_state:
-            self.print_gmem_pass(nr)
+            self.print_gmem_pass(nr, file=file)
         else:
-            self.print_sysmem_pass(nr)
-
-def main():
-    filename = sys.argv[1]
-    if filename.endswith(".gz"):
-        file = gzip.open(filename, "r")
-        file = io.TextIOWrapper(file)
-    else:
-        file = open(filename, "r")
-    lines = file.read().split('\n')
-
-    flush_batch_match = re.compile(r": flush_batch: (\S+): cleared=(\S+), gmem_reason=(\S+), num_draws=(\S+)")
-    framebuffer_match = re.compile(r": framebuffer: (\S+)x(\S+)x(\S+)@(\S+), nr_cbufs: (\S+)")
-    surface_match     = re.compile(r": surface: (\S+)x(\S+)@(\S+), fmt=(\S+)")
-
-    # draw/renderpass passes:
-    gmem_match          = re.compile(r": render_gmem: (\S+)x(\S+) bins of (\S+)x(\S+)")
-    sysmem_match        = re.compile(r": render_sysmem")
-    state_restore_match = re.compile(r"\+(\S+): end_state_restore")
-    prologue_match      = re.compile(r"\+(\S+): end_prologue")
-    binning_ib_match    = re.compile(r"\+(\S+): end_binning_ib")
-    vsc_overflow_match  = re.compile(r"\+(\S+): end_vsc_overflow_test")
-    draw_ib_match       = re.compile(r"\+(\S+): end_draw_ib")
-    resolve_match       = re.compile(r"\+(\S+): end_resolve")
-    
-    start_clear_restore_match = re.compile(r"start_clear_restore: fast_cleared: (\S+)")
-    end_clear_restore_match   = re.compile(r"\+(\S+): end_clear_restore")
-
-    # Non-draw passes:
-    compute_match = re.compile(r": start_compute")
-    blit_match    = re.compile(r": start_blit")
-
-    # End of pass/frame markers:
-    elapsed_match = re.compile(r"ELAPSED: (\S+) ns")
-    eof_match     = re.compile(r"END OF FRAME (\S+)")
-
-    frame = Frame()      # current frame state
-    renderpass = None    # current renderpass state
-    times = None
+            self.print_sysmem_pass(nr, file=file)
+
+# The arguments of the traces we look at, the other ones are ignored:
+flush_batch_match = re.compile(r"(\S+): cleared=(\S+), gmem_reason=(\S+), num_draws=(\S+)")
+framebuffer_match = re.compile(r"(\S+)x(\S+)x(\S+)@(\S+), nr_cbufs: (\S+)")
+surface_match     = re.compile(r"(\S+)x(\S+)@(\S+), fmt=(\S+)")
+gmem_match        = re.compile(r"(\S+)x(\S+) bins of (\S+)x(\S+)")
+start_clear_restore_match = re.compile(r"fast_cleared: (\S+)")
+
+# Builds the Frames from the lines of a log, one line at a time.
+#
+# The lines of the events are "<ns> <delta>: <trace>[: <args>]", so each line
+# is only split once on ': ' and dispatched on the name of its trace, instead
+# of being searched for the pattern of each trace.
+class TraceParser:
+    def __init__(self, filename):
+        self.filename = filename
+        self.frame = Frame()      # current frame state
+        self.renderpass = None    # current renderpass state
+        self.times = None
+
+        self.handlers = {
+            # Note, we only expect the flush_batch trace for !nondraw:
+            'flush_batch':           self.flush_batch,
+            'framebuffer':           self.framebuffer,
+            'surface':               self.surface,
+
+            # draw/renderpass passes:
+            'render_gmem':           self.render_gmem,
+            'render_sysmem':         self.render_sysmem,
+            'end_state_restore':     self.end_state_restore,
+            'end_prologue':          self.end_prologue,
+            'end_binning_ib':        self.end_binning_ib,
+            'end_vsc_overflow_test': self.end_vsc_overflow_test,
+            'end_draw_ib':           self.end_draw_ib,
+            'end_resolve':           self.end_resolve,
+            'start_clear_restore':   self.start_clear_restore,
+            'end_clear_restore':     self.end_clear_restore,
+
+            # Non-draw passes:
+            'start_compute':         self.start_compute,
+            'start_blit':            self.start_blit,
+
+            # End of pass marker:
+            'ELAPSED':               self.elapsed,
+        }
 
     # Helper to set the appropriate times table for the current pass,
     # which is expected to only happen once for a given render pass
-    def set_times(t):
-        nonlocal times
-        if times  is not None:
-            print("expected times to not be set yet")
-        times = t
-
-    for line in lines:
-        # Note, we only expect the flush_batch trace for !nondraw:
-        match = re.search(flush_batch_match, line)
-        if match is not None:
-            assert(renderpass is None)
-            renderpass = RenderPass(cleared=match.group(2),
-                                    gmem_reason=match.group(3),
-                                    num_draws=match.group(4))
-            frame.renderpasses.append(renderpass)
-            continue
-
-        match = re.search(framebuffer_match, line)
-        if match is not None:
-            assert(renderpass.fb is None)
-            renderpass.fb = FramebufferState(width=match.group(1),
-                                             height=match.group(2),
-                                             layers=match.group(3),
-                                             samples=match.group(4),
-                                             nr_cbufs=match.group(5))
-            continue
-
-        match = re.search(surface_match, line)
-        if match is not None:
-            surface = SurfaceState(width=match.group(1),
-                                   height=match.group(2),
-                                   samples=match.group(3),
-                                   format=match.group(4))
-            renderpass.fb.surfaces.append(surface)
-            continue
-
-        match = re.search(gmem_match, line)
-        if match is not None:
-            assert(renderpass.binning_state is None)
-            renderpass.binning_state = BinningState(nbins_x=match.group(1),
-                                                    nbins_y=match.group(2),
-                                                    bin_w=match.group(3),
-                                                    bin_h=match.group(4))
-            set_times(frame.times_gmem)
-            continue
-
-        match = re.search(sysmem_match, line)
-        if match is not None:
-            assert(renderpass.binning_state is None)
-            set_times(frame.times_sysmem)
-            continue
-
-        match = re.search(state_restore_match, line)
-        if match is not None:
-            renderpass.state_restore_time += int(match.group(1))
-            continue
-
-        match = re.search(prologue_match, line)
-        if match is not None:
-            renderpass.prologue_time += int(match.group(1))
-            continue
-
-        match = re.search(binning_ib_match, line)
-        if match is not None:
-            assert(renderpass.binning_state is not None)
-            renderpass.binning_time += int(match.group(1))
-            continue
-
-        match = re.search(vsc_overflow_match, line)
-        if match is not None:
-            assert(renderpass.binning_state is not None)
-            renderpass.vsc_overflow_test_time += int(match.group(1))
-            continue
-
-        match = re.search(draw_ib_match, line)
-        if match is not None:
-            renderpass.draw_time += int(match.group(1))
-            continue
-
-        match = re.search(resolve_match, line)
-        if match is not None:
-            assert(renderpass.binning_state is not None)
-            renderpass.resolve_time += int(match.group(1))
-            continue
-
-        match = re.search(start_clear_restore_match, line)
-        if match is not None:
-            renderpass.fast_cleared = match.group(1)
-            continue
-
-        match = re.search(end_clear_restore_match, line)
-        if match is not None:
-            renderpass.restore_clear_time += int(match.group(1))
-            continue
-
-        match = re.search(compute_match, line)
-        if match is not None:
-            set_times(frame.times_compute)
-            continue
-
-        match = re.search(blit_match, line)
-        if match is not None:
-            set_times(frame.times_blit)
-            continue
-
-        match = re.search(eof_match, line)
-        if match is not None:
-            frame.frame_nr = int(match.group(1))
-            frame.print()
-            frame = Frame()
-            times = None
-            renderpass = None
+    def set_times(self, t):
+        if self.times is not None:
+            print("{}: expected times to not be set yet".format(self.filename),
+                  file=sys.stderr)
+        self.times = t
+
+    def flush_batch(self, delta, args):
+        match = flush_batch_match.match(args)
+        assert(self.renderpass is None)
+        self.renderpass = RenderPass(cleared=match.group(2),
+                                     gmem_reason=match.group(3),
+                                     num_draws=match.group(4))
+        self.frame.renderpasses.append(self.renderpass)
+
+    def framebuffer(self, delta, args):
+        match = framebuffer_match.match(args)
+        assert(self.renderpass.fb is None)
+        self.renderpass.fb = FramebufferState(width=match.group(1),
+                                              height=match.group(2),
+                                              layers=match.group(3),
+                                              samples=match.group(4),
+                                              nr_cbufs=match.group(5))
+
+    def surface(self, delta, args):
+        match = surface_match.match(args)
+        surface = SurfaceState(width=match.group(1),
+                               height=match.group(2),
+                               samples=match.group(3),
+                               format=match.group(4))
+        self.renderpass.fb.surfaces.append(surface)
+
+    def render_gmem(self, delta, args):
+        match = gmem_match.match(args)
+        assert(self.renderpass.binning_state is None)
+        self.renderpass.binning_state = BinningState(nbins_x=match.group(1),
+                                                     nbins_y=match.group(2),
+                                                     bin_w=match.group(3),
+                                                     bin_h=match.group(4))
+        self.set_times(self.frame.times_gmem)
+
+    def render_sysmem(self, delta, args):
+        assert(self.renderpass.binning_state is None)
+        self.set_times(self.frame.times_sysmem)
+
+    def end_state_restore(self, delta, args):
+        self.renderpass.state_restore_time += int(delta)
+
+    def end_prologue(self, delta, args):
+        self.renderpass.prologue_time += int(delta)
+
+    def end_binning_ib(self, delta, args):
+        assert(self.renderpass.binning_state is not None)
+        self.renderpass.binning_time += int(delta)
+
+    def end_vsc_overflow_test(self, delta, args):
+        assert(self.renderpass.binning_state is not None)
+        self.renderpass.vsc_overflow_test_time += int(delta)
+
+    def end_draw_ib(self, delta, args):
+        self.renderpass.draw_time += int(delta)
+
+    def end_resolve(self, delta, args):
+        assert(self.renderpass.binning_state is not None)
+        self.renderpass.resolve_time += int(delta)
+
+    def start_clear_restore(self, delta, args):
+        match = start_clear_restore_match.match(args)
+        self.renderpass.fast_cleared = match.group(1)
+
+    def end_clear_restore(self, delta, args):
+        self.renderpass.restore_clear_time += int(delta)
+
+    def start_compute(self, delta, args):
+        self.set_times(self.frame.times_compute)
+
+    def start_blit(self, delta, args):
+        self.set_times(self.frame.times_blit)
+
+    def elapsed(self, delta, args):
+        time = int(args.split(' ', 1)[0])
+        if self.renderpass is not None:
+            self.renderpass.elapsed_time = time
+        self.times.append(time)
+        self.times = None
+        self.renderpass = None
+
+    def end_of_frame(self, frame_nr):
+        frame = self.frame
+        frame.frame_nr = int(frame_nr)
+        self.frame = Frame()
+        self.times = None
+        self.renderpass = None
+        return frame
+
+    def parse(self, lines):
+        """Generate the Frames of the lines, as they are completed."""
+        handlers = self.handlers
+        for line in lines:
+            head, sep, rest = line.partition(': ')
+            if not sep:
+                if line.startswith('END OF FRAME '):
+                    yield self.end_of_frame(line[13:].split()[0])
+                continue
+
+            if head == 'ELAPSED':
+                self.elapsed(None, rest)
+                continue
+
+            name, sep, args = rest.rstrip('\n').partition(': ')
+            handler = handlers.get(name)
+            if handler is None:
+                continue
+
+            # Only positive deltas are accounted for in the times of the
+            # end_* traces, the other traces are handled whatever their
+            # delta (which wraps negative after ~2.1s):
+            delta = head.rpartition(' ')[2]
+            if delta[:1] != '+':
+                if name.startswith('end_'):
+                    continue
+            else:
+                delta = delta[1:]
+            handler(delta, args)
+
+def open_log(filename):
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "rt")
+    return open(filename, "r")
+
+def parse_file(filename):
+    with open_log(filename) as file:
+        return list(TraceParser(filename).parse(file))
+
+def parse_files(filenames, jobs):
+    """Generate the (filename, Frame) of each frame of the files, in order.
+
+    The files are parsed in parallel processes if there are several of them,
+    otherwise the frames are streamed as the file is read."""
+    if jobs <= 1 or len(filenames) <= 1:
+        for filename in filenames:
+            with open_log(filename) as file:
+                for frame in TraceParser(filename).parse(file):
+                    yield filename, frame
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(jobs) as pool:
+        for filename, frames in zip(filenames, pool.map(parse_file, filenames)):
+            for frame in frames:
+                yield filename, frame
+
+# Per-frame statistics aggregated across all the frames by --summary:
+summary_stats = [
+    'total_ns', 'gmem_ns', 'sysmem_ns', 'blit_ns', 'compute_ns',
+    'prologue_ns', 'binning_ns', 'restore_clear_ns', 'draw_ns', 'resolve_ns',
+    'gmem_passes', 'sysmem_passes', 'blits', 'computes',
+]
+
+def percentile(values, p):
+    """Linearly interpolated percentile p of the sorted values."""
+    k = (len(values) - 1) * p / 100.0
+    f = int(k)
+    c = min(f + 1, len(values) - 1)
+    return values[f] + (values[c] - values[f]) * (k - f)
+
+def percentile_list(arg):
+    """Parse the comma separated percentiles of -p."""
+    try:
+        percentiles = [float(p) for p in arg.split(',') if p]
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid percentiles: '{}'".format(arg))
+    for p in percentiles:
+        if not 0 <= p <= 100:
+            raise argparse.ArgumentTypeError("percentile out of 0..100: {:g}".format(p))
+    return percentiles
+
+# The columns of the CSV output, one row per frame followed by its
+# renderpasses.  They come from the keys of the statistics rather than from
+# the rows, as the first frame might not have any renderpass:
+csv_fields = ['file', 'frame', 'renderpass', 'type']
+for key in list(Frame().stats()) + list(RenderPass(None, None, None).stats()):
+    if key not in csv_fields:
+        csv_fields.append(key)
+
+def summarize(frame_stats, percentiles):
+    summary = {}
+    for stat in summary_stats:
+        values = sorted(stats[stat] for stats in frame_stats)
+        if not values:
             continue
+        summary[stat] = {
+            'mean': sum(values) / len(values),
+            'min': values[0],
+            'max': values[-1],
+        }
+        for p in percentiles:
+            summary[stat]['p{:g}'.format(p)] = percentile(values, p)
+    return summary
+
+def print_summary(summary, nr_frames, percentiles, file=None):
+    columns = ['mean', 'min'] + ['p{:g}'.format(p) for p in percentiles] + ['max']
+    print("SUMMARY: {} frames".format(nr_frames), file=file)
+    print("  {:<18}".format('') + "".join("{:>16}".format(c) for c in columns), file=file)
+    for stat, values in summary.items():
+        print("  {:<18}".format(stat) +
+              "".join("{:>16,.0f}".format(values[c]) for c in columns), file=file)
 
-        match = re.search(elapsed_match, line)
-        if match is not None:
-            time = int(match.group(1))
-            #print("ELAPSED: " + str(time) + " ns")
-            if renderpass is not None:
-                renderpass.elapsed_time = time
-            times.append(time)
-            times = None
-            renderpass = None
-            continue
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('files', nargs='+',
+                        help='u_trace logs, optionally gzipped')
+    parser.add_argument('-f', '--format', choices=['text', 'csv', 'json'],
+                        default='text',
+                        help='output format of the per-frame statistics')
+    parser.add_argument('-o', '--output',
+                        help='write the statistics to this file instead of stdout')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of files parsed in parallel, defaults to the number of CPUs')
+    parser.add_argument('-s', '--summary', action='store_true',
+                        help='aggregate the per-frame statistics across all the frames')
+    parser.add_argument('-p', '--percentiles', type=percentile_list,
+                        default='50,90,99',
+                        help='comma separated percentiles of the summary, between 0 and 100')
+    args = parser.parse_args()
+
+    percentiles = args.percentiles
+    jobs = args.jobs if args.jobs is not None else os.cpu_count()
+    out = open(args.output, "w", newline='') if args.output else sys.stdout
+
+    frame_stats = []
+    json_frames = []
+    writer = None
+    last_filename = None
+
+    for filename, frame in parse_files(args.files, jobs):
+        stats = frame.stats()
+        if args.summary:
+            frame_stats.append(stats)
+
+        if args.format == 'text':
+            if len(args.files) > 1 and filename != last_filename:
+                print("{}:".format(filename), file=out)
+            frame.print(file=out)
+        elif args.format == 'csv':
+            renderpasses = [renderpass.stats() for renderpass in frame.renderpasses]
+            if writer is None:
+                writer = csv.DictWriter(out, csv_fields, restval='')
+                writer.writeheader()
+            writer.writerow(dict(stats, file=filename, type='frame'))
+            for i, renderpass in enumerate(renderpasses):
+                writer.writerow(dict(renderpass, file=filename,
+                                     frame=frame.frame_nr, renderpass=i))
+        else:
+            json_frames.append(dict(stats, file=filename, renderpasses=[
+                renderpass.stats() for renderpass in frame.renderpasses]))
+        last_filename = filename
+
+    summary = summarize(frame_stats, percentiles) if args.summary else None
+
+    if args.format == 'json':
+        result = {'frames': json_frames}
+        if summary is not None:
+            result['summary'] = summary
+        json.dump(result, out, indent=1)
+        out.write('\n')
+    elif summary is not None:
+        # The summary isn't part of the CSV, keep it parsable:
+        if args.format == 'csv':
+            summary_file = sys.stderr if out is sys.stdout else sys.stdout
+        else:
+            summary_file = out
+        print_summary(summary, len(frame_stats), percentiles, file=summary_file)
 
+    if out is not sys.stdout:
+        out.close()
 
 if __name__ == "__main__":
     main()
-
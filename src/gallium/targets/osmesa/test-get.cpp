@@ -0,0 +1,115 @@
+#include <cstdint>
+#include <memory>
+#include <vector>
+
+#include <gtest/gtest.h>
+
+#include "GL/osmesa.h"
+
+/* glGet lookups go through the hash tables generated by
+ * get_hash_generator.py, which are perfect hashes with
+ * -Dglget-perfect-hash=true.
+ */
+class OSMesaGetTest : public testing::Test {
+protected:
+   void SetUp() override
+   {
+      ctx.reset(OSMesaCreateContextExt(OSMESA_RGBA, 24, 8, 0, NULL));
+      ASSERT_TRUE(ctx);
+      ASSERT_EQ(OSMesaMakeCurrent(ctx.get(), pixels, GL_UNSIGNED_BYTE, 4, 2), GL_TRUE);
+      while (glGetError() != GL_NO_ERROR);
+   }
+
+   std::unique_ptr<osmesa_context, decltype(&OSMesaDestroyContext)> ctx{
+      NULL, &OSMesaDestroyContext};
+   uint32_t pixels[4 * 2];
+};
+
+TEST_F(OSMesaGetTest, values)
+{
+   GLint v[4];
+
+   glGetIntegerv(GL_VIEWPORT, v);
+   EXPECT_EQ(v[0], 0);
+   EXPECT_EQ(v[1], 0);
+   EXPECT_EQ(v[2], 4);
+   EXPECT_EQ(v[3], 2);
+
+   glGetIntegerv(GL_MAX_TEXTURE_SIZE, v);
+   EXPECT_GT(v[0], 0);
+
+   glGetIntegerv(GL_DEPTH_BITS, v);
+   EXPECT_EQ(v[0], 24);
+
+   glGetIntegerv(GL_CULL_FACE_MODE, v);
+   EXPECT_EQ(v[0], GL_BACK);
+
+   glPixelStorei(GL_PACK_ALIGNMENT, 2);
+   glGetIntegerv(GL_PACK_ALIGNMENT, v);
+   EXPECT_EQ(v[0], 2);
+
+   GLboolean b;
+   glEnable(GL_BLEND);
+   glGetBooleanv(GL_BLEND, &b);
+   EXPECT_EQ(b, GL_TRUE);
+   glDisable(GL_BLEND);
+   glGetBooleanv(GL_BLEND, &b);
+   EXPECT_EQ(b, GL_FALSE);
+
+   GLfloat f;
+   glLineWidth(2.0);
+   glGetFloatv(GL_LINE_WIDTH, &f);
+   EXPECT_EQ(f, 2.0);
+
+   EXPECT_EQ(glGetError(), GL_NO_ERROR);
+}
+
+TEST_F(OSMesaGetTest, invalid_enum)
+{
+   /* Index 0 of the tables means "not found", so 0 must not be found. */
+   const GLenum pnames[] = { 0, GL_RGBA, GL_FLOAT, GL_TEXTURE0, 0xffff, 0xffffffff };
+   GLint v[16];
+
+   for (GLenum pname : pnames) {
+      glGetIntegerv(pname, v);
+      EXPECT_EQ(glGetError(), GL_INVALID_ENUM) << "pname 0x" << std::hex << pname;
+   }
+}
+
+/* Every enum accepted by one of the glGet functions is accepted by the
+ * others, as they share the lookup.  The buffers are large enough for
+ * GL_COMPRESSED_TEXTURE_FORMATS.
+ *
+ * The GL_EXT_memory_object queries are skipped, they call pipe_screen
+ * functions which softpipe doesn't implement.
+ */
+TEST_F(OSMesaGetTest, scan)
+{
+   std::vector<GLenum> found;
+   static GLint v[1024];
+
+   for (GLenum pname = 0; pname < 0x20000; pname++) {
+      if (pname == GL_DEVICE_UUID_EXT || pname == GL_DRIVER_UUID_EXT ||
+          pname == GL_DEVICE_LUID_EXT || pname == GL_DEVICE_NODE_MASK_EXT)
+         continue;
+
+      glGetIntegerv(pname, v);
+      if (glGetError() == GL_NO_ERROR)
+         found.push_back(pname);
+   }
+
+   for (GLenum pname : found) {
+      static GLboolean b[1024];
+      static GLfloat f[1024];
+      static GLdouble d[1024];
+
+      glGetBooleanv(pname, b);
+      EXPECT_EQ(glGetError(), GL_NO_ERROR) << "pname 0x" << std::hex << pname;
+      glGetFloatv(pname, f);
+      EXPECT_EQ(glGetError(), GL_NO_ERROR) << "pname 0x" << std::hex << pname;
+      glGetDoublev(pname, d);
+      EXPECT_EQ(glGetError(), GL_NO_ERROR) << "pname 0x" << std::hex << pname;
+   }
+
+   EXPECT_GT(found.size(), 300u);
+}
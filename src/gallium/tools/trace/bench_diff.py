@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# Copyright © 2026 Mesa contributors
+# SPDX-License-Identifier: MIT
+
+
+'''Speed benchmark of the pytracediff diff engines.
+
+Builds two synthetic call sequences, the second one a mutated copy of the
+first (scattered insertions, deletions and replacements plus one long
+diverging stretch), and times difflib.SequenceMatcher over the calls, as
+pytracediff.py does by default, against the hash diff used by its -F
+option.  difflib is quadratic on such input, so it only runs on the first
+--difflib-calls calls.'''
+
+
+import argparse
+import difflib
+import random
+import time
+
+import hashdiff
+import model
+
+
+def make_calls(num_calls, seed = 0):
+    rng = random.Random(seed)
+
+    # Most calls are repeated state binds and draws, the rest carry
+    # unique arguments (buffer offsets, new objects, ...).
+    def value():
+        if rng.random() < 0.3:
+            return rng.getrandbits(48)
+        return rng.randint(0, 200)
+
+    values1 = [value() for _ in range(num_calls)]
+    values2 = list(values1)
+    for _ in range(200):
+        pos = rng.randrange(len(values2))
+        count = rng.randint(1, 20)
+        op = rng.randint(0, 2)
+        if op == 0:
+            del values2[pos:pos + count]
+        elif op == 1:
+            values2[pos:pos] = [value() for _ in range(count)]
+        else:
+            values2[pos:pos + count] = [value() for _ in range(count)]
+    pos = rng.randrange(len(values2))
+    values2[pos:pos + num_calls // 50] = [value() for _ in range(num_calls // 50)]
+
+    def calls(values):
+        return [model.Call(no, 'pipe_context', 'draw_vbo', (('info', model.Literal(v)),), None, None)
+                for no, v in enumerate(values)]
+
+    return calls(values1), calls(values2)
+
+
+def time_difflib(calls1, calls2):
+    start = time.perf_counter()
+    sequence = difflib.SequenceMatcher(lambda x : x.is_junk, calls1, calls2, autojunk=False)
+    opcodes = sequence.get_opcodes()
+    return time.perf_counter() - start, opcodes
+
+
+def time_hashdiff(calls1, calls2):
+    start = time.perf_counter()
+    opcodes = hashdiff.get_opcodes(hashdiff.call_digests(calls1), hashdiff.call_digests(calls2))
+    return time.perf_counter() - start, opcodes
+
+
+def changed(opcodes):
+    return sum(max(i2 - i1, j2 - j1) for tag, i1, i2, j1, j2 in opcodes if tag != 'equal')
+
+
+def main():
+    optparser = argparse.ArgumentParser(description=__doc__)
+    optparser.add_argument("-n", "--calls", type=int, default=1000000, dest="num_calls",
+        help="number of calls in the synthetic traces (default: %(default)s)")
+    optparser.add_argument("--difflib-calls", type=int, default=50000, dest="difflib_calls",
+        help="number of calls to run difflib on (default: %(default)s)")
+    args = optparser.parse_args()
+
+    calls1, calls2 = make_calls(args.num_calls)
+
+    small1, small2 = make_calls(args.difflib_calls)
+    difflib_time, difflib_opcodes = time_difflib(small1, small2)
+    small_time, small_opcodes = time_hashdiff(small1, small2)
+    print(f"{args.difflib_calls} calls:")
+    print(f"  difflib: {difflib_time:8.2f} s, {changed(difflib_opcodes)} calls changed")
+    print(f"  hash:    {small_time:8.2f} s, {changed(small_opcodes)} calls changed")
+    print(f"  speedup: {difflib_time / max(small_time, 1e-6):.1f}x")
+
+    hash_time, hash_opcodes = time_hashdiff(calls1, calls2)
+    print(f"{args.num_calls} calls:")
+    print(f"  hash:    {hash_time:8.2f} s, {changed(hash_opcodes)} calls changed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# Copyright © 2026 Mesa contributors
+# SPDX-License-Identifier: MIT
+
+
+'''Memory benchmark of the trace model.
+
+Parses a trace keeping every call in memory, as pytracediff.py does, once
+with the compact model (slotted, shared nodes) and once with a legacy model
+(dict-backed nodes, nothing shared), each in a fresh process, and compares
+the resident set size growth.
+
+The trace is a captured one, or a synthetic one shaped like a capture.  How
+much sharing saves depends on how often the trace repeats the same values,
+so the hit rate of the shared nodes is reported too.'''
+
+
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+
+import model
+import parse
+
+
+def write_synthetic_trace(stream, num_calls, seed = 0):
+    '''Write a trace shaped like a captured one: the CSOs of a few dozen
+    materials are created up front and bound over and over, while every
+    draw uploads its own constants and has its own draw parameters.'''
+
+    rng = random.Random(seed)
+
+    def ptr(address):
+        return '<ptr>0x%x</ptr>' % address
+
+    def uint(value):
+        return '<uint>%u</uint>' % value
+
+    def struct(name, members):
+        return ('<struct name="%s">' % name +
+                ''.join('<member name="%s">%s</member>' % member for member in members) +
+                '</struct>')
+
+    def array(elems):
+        return '<array>' + ''.join('<elem>%s</elem>' % elem for elem in elems) + '</array>'
+
+    def rt_blend_state():
+        enable = rng.random() < 0.4
+        return struct('pipe_rt_blend_state', [
+            ('blend_enable', uint(enable)),
+            ('rgb_func', uint(rng.choice((0, 0, 0, 1, 4)) if enable else 0)),
+            ('rgb_src_factor', uint(rng.choice((1, 3, 4, 0x11)) if enable else 1)),
+            ('rgb_dst_factor', uint(rng.choice((0x11, 0x13, 0x14, 0x15)) if enable else 0x11)),
+            ('alpha_func', uint(0)),
+            ('alpha_src_factor', uint(rng.choice((1, 4)) if enable else 1)),
+            ('alpha_dst_factor', uint(rng.choice((0x11, 0x14)) if enable else 0x11)),
+            ('colormask', uint(rng.choice((15, 15, 15, 7, 8, 0)))),
+        ])
+
+    def blend_state():
+        num_rts = rng.choice((1, 1, 1, 2, 4))
+        return struct('pipe_blend_state', [
+            ('independent_blend_enable', '<bool>%u</bool>' % (num_rts > 1)),
+            ('logicop_enable', '<bool>0</bool>'),
+            ('logicop_func', uint(0)),
+            ('dither', '<bool>0</bool>'),
+            ('alpha_to_coverage', '<bool>%u</bool>' % (rng.random() < 0.1)),
+            ('max_rt', uint(num_rts - 1)),
+            ('rt', array(rt_blend_state() for i in range(num_rts))),
+        ])
+
+    def depth_stencil_alpha_state():
+        return struct('pipe_depth_stencil_alpha_state', [
+            ('depth_enabled', '<bool>%u</bool>' % (rng.random() < 0.8)),
+            ('depth_writemask', '<bool>%u</bool>' % (rng.random() < 0.6)),
+            ('depth_func', uint(rng.choice((1, 2, 3, 7)))),
+            ('stencil', array(struct('pipe_stencil_state', [
+                ('enabled', '<bool>0</bool>'),
+                ('func', uint(rng.choice((0, 7)))),
+                ('fail_op', uint(0)),
+                ('zpass_op', uint(0)),
+                ('zfail_op', uint(0)),
+                ('valuemask', uint(255)),
+                ('writemask', uint(rng.choice((0, 255)))),
+            ]) for i in range(2))),
+            ('alpha_enabled', '<bool>%u</bool>' % (rng.random() < 0.2)),
+            ('alpha_func', uint(6)),
+            ('alpha_ref_value', '<float>%g</float>' % rng.choice((0.5, 0.1))),
+        ])
+
+    def sampler_state():
+        return struct('pipe_sampler_state', [
+            ('wrap_s', uint(rng.choice((0, 1, 2)))),
+            ('wrap_t', uint(rng.choice((0, 1, 2)))),
+            ('min_img_filter', uint(rng.choice((0, 1)))),
+            ('min_mip_filter', uint(rng.choice((0, 1, 2)))),
+            ('mag_img_filter', uint(rng.choice((0, 1)))),
+            ('max_anisotropy', uint(rng.choice((0, 0, 4, 16)))),
+            ('lod_bias', '<float>%g</float>' % rng.choice((0.0, 0.0, -0.5))),
+            ('max_lod', '<float>%g</float>' % rng.choice((1000.0, 0.0, 12.0))),
+        ])
+
+    def draw_info(mesh):
+        index_size = mesh['index_size']
+        return struct('pipe_draw_info', [
+            ('index_size', uint(index_size)),
+            ('has_user_indices', uint(0)),
+            ('mode', uint(mesh['mode'])),
+            ('start_instance', uint(0)),
+            ('instance_count', uint(mesh['instances'])),
+            ('min_index', uint(0)),
+            ('max_index', uint(mesh['vertices'] - 1 if index_size else 0xffffffff)),
+            ('primitive_restart', '<bool>0</bool>'),
+            ('restart_index', uint(0)),
+            ('index.resource', ptr(mesh['index_buffer']) if index_size else '<null/>'),
+        ])
+
+    class Writer:
+        def __init__(self):
+            self.no = 0
+
+        def call(self, method, args, ret = None):
+            self.no += 1
+            stream.write("\t<call no='%u' class='pipe_context' method='%s'>" % (self.no, method))
+            stream.write("<arg name='pipe'>%s</arg>" % ptr(0x1000))
+            for name, value in args:
+                stream.write("<arg name='%s'>%s</arg>" % (name, value))
+            if ret is not None:
+                stream.write('<ret>%s</ret>' % ret)
+            stream.write('<time><int>%u</int></time></call>\n' % rng.randint(1, 100))
+
+    writer = Writer()
+    addresses = iter(range(0x100000, 1 << 48, 0x40))
+
+    def create(method, state):
+        address = next(addresses)
+        writer.call(method, [('state', state)], ptr(address))
+        return address
+
+    def create_buffer(size, bind):
+        address = next(addresses)
+        stream.write("\t<call no='0' class='pipe_screen' method='resource_create'>"
+                     "<arg name='screen'>%s</arg><arg name='templat'>%s</arg><ret>%s</ret></call>\n"
+                     % (ptr(0x800), struct('pipe_resource', [
+                         ('target', '<enum>PIPE_BUFFER</enum>'),
+                         ('format', '<enum>PIPE_FORMAT_R8_UNORM</enum>'),
+                         ('width', uint(size)), ('height', uint(1)), ('depth', uint(1)),
+                         ('array_size', uint(1)), ('last_level', uint(0)),
+                         ('nr_samples', uint(0)), ('nr_storage_samples', uint(0)),
+                         ('usage', uint(0)), ('bind', uint(bind)), ('flags', uint(0)),
+                     ]), ptr(address)))
+        return address
+
+    stream.write("<?xml version='1.0' encoding='UTF-8'?>\n<trace version='0.1'>\n")
+    stream.write("\t<call no='0' class='' method='pipe_screen_create'><ret>%s</ret></call>\n"
+                 "\t<call no='0' class='pipe_screen' method='context_create'>"
+                 "<arg name='screen'>%s</arg><arg name='priv'><ptr>0</ptr></arg>"
+                 "<arg name='flags'><uint>0</uint></arg><ret>%s</ret></call>\n"
+                 % (ptr(0x800), ptr(0x800), ptr(0x1000)))
+
+    blends = [create('create_blend_state', blend_state()) for i in range(24)]
+    dsas = [create('create_depth_stencil_alpha_state', depth_stencil_alpha_state()) for i in range(16)]
+    samplers = [create('create_sampler_state', sampler_state()) for i in range(32)]
+    views = [next(addresses) for i in range(256)]
+    # The meshes are suballocated from a few large buffers.
+    vertex_buffers = [create_buffer(1 << 20, 0x10) for i in range(4)]
+    index_buffers = [create_buffer(1 << 20, 0x20) for i in range(2)]
+    meshes = []
+    for i in range(512):
+        meshes.append({
+            'index_size': rng.choice((0, 2, 2, 4)),
+            'mode': rng.choice((4, 4, 4, 5, 1)),
+            'instances': rng.choice((1, 1, 1, 1, rng.randint(2, 64))),
+            'vertices': rng.randint(3, 65536),
+            'index_buffer': rng.choice(index_buffers),
+            'vertex_buffer': rng.choice(vertex_buffers),
+            'vertex_offset': 256 * rng.randint(0, 2048),
+        })
+    materials = [(rng.choice(blends), rng.choice(dsas),
+                  [rng.choice(samplers) for i in range(rng.randint(1, 4))],
+                  [rng.choice(views) for i in range(rng.randint(1, 4))])
+                 for i in range(64)]
+    upload_buffer = create_buffer(1 << 18, 0x4)
+
+    frame = 0
+    while writer.no < num_calls:
+        frame += 1
+        upload_offset = 0
+        for draw in range(rng.randint(100, 400)):
+            blend, dsa, material_samplers, material_views = rng.choice(materials)
+            mesh = rng.choice(meshes)
+            writer.call('bind_blend_state', [('state', ptr(blend))])
+            writer.call('bind_depth_stencil_alpha_state', [('state', ptr(dsa))])
+            writer.call('bind_sampler_states', [
+                ('shader', '<enum>PIPE_SHADER_FRAGMENT</enum>'), ('start', uint(0)),
+                ('num_states', uint(len(material_samplers))),
+                ('states', array(ptr(sampler) for sampler in material_samplers))])
+            writer.call('set_sampler_views', [
+                ('shader', '<enum>PIPE_SHADER_FRAGMENT</enum>'), ('start', uint(0)),
+                ('num', uint(len(material_views))),
+                ('unbind_num_trailing_slots', uint(0)),
+                ('take_ownership', '<bool>0</bool>'),
+                ('views', array(ptr(view) for view in material_views))])
+
+            # Per draw transforms and material constants, streamed
+            # through an upload buffer.
+            size = 64 * rng.randint(1, 4)
+            data = bytes(rng.getrandbits(8) for i in range(size))
+            writer.call('buffer_subdata', [
+                ('resource', ptr(upload_buffer)), ('usage', uint(2)),
+                ('offset', uint(upload_offset)), ('size', uint(size)),
+                ('data', '<bytes>%s</bytes>' % data.hex())])
+            writer.call('set_constant_buffer', [
+                ('shader', '<enum>PIPE_SHADER_VERTEX</enum>'), ('index', uint(1)),
+                ('take_ownership', '<bool>0</bool>'),
+                ('constant_buffer', struct('pipe_constant_buffer', [
+                    ('buffer', ptr(upload_buffer)),
+                    ('buffer_offset', uint(upload_offset)),
+                    ('buffer_size', uint(size)),
+                ]))])
+            upload_offset += size
+
+            writer.call('set_vertex_buffers', [
+                ('start_slot', uint(0)), ('num_buffers', uint(1)),
+                ('unbind_num_trailing_slots', uint(0)),
+                ('take_ownership', '<bool>0</bool>'),
+                ('buffers', array([struct('pipe_vertex_buffer', [
+                    ('is_user_buffer', '<bool>0</bool>'),
+                    ('buffer_offset', uint(mesh['vertex_offset'])),
+                    ('buffer.resource', ptr(mesh['vertex_buffer'])),
+                ])]))])
+            count = rng.randint(1, mesh['vertices'])
+            writer.call('draw_vbo', [
+                ('info', draw_info(mesh)),
+                ('drawid_offset', uint(0)),
+                ('indirect', '<null/>'),
+                ('draws', array([struct('pipe_draw_start_count_bias', [
+                    ('start', uint(rng.randint(0, mesh['vertices'] - count))),
+                    ('count', uint(count)),
+                    ('index_bias', '<int>%d</int>' % (rng.randint(0, 4096) if mesh['index_size'] else 0)),
+                ])])),
+                ('num_draws', uint(1))])
+        writer.call('flush', [('flags', uint(0))], ptr(next(addresses)))
+
+    stream.write("</trace>\n")
+
+
+def install_legacy_model():
+    '''Replace the parser's node classes with dict-backed variants, and
+    disable node sharing, mimicking the original trace model.'''
+
+    def legacy(cls):
+        return type(cls.__name__, (cls,), {})
+
+    for name in ('Literal', 'Blob', 'NamedConstant', 'Array', 'Struct', 'Pointer', 'Call'):
+        setattr(parse, name, legacy(getattr(model, name)))
+
+    def shared_node(self, key, factory, *args):
+        return factory(*args)
+
+    parse.TraceParser.shared_node = shared_node
+
+
+def maxrss_kib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(filename, legacy):
+    lookups = [0, 0]
+    if legacy:
+        install_legacy_model()
+    else:
+        shared_node = parse.TraceParser.shared_node
+
+        def counting_shared_node(self, key, factory, *args):
+            lookups[key in self.nodes] += 1
+            return shared_node(self, key, factory, *args)
+
+        parse.TraceParser.shared_node = counting_shared_node
+    before = maxrss_kib()
+    calls = list(parse.iter_calls(filename))
+    after = maxrss_kib()
+    print(len(calls), after - before, lookups[True], sum(lookups))
+
+
+def run(filename, legacy):
+    args = [sys.executable, os.path.abspath(__file__), '--measure', filename]
+    if legacy:
+        args.append('--legacy')
+    output = subprocess.check_output(args, text=True)
+    return [int(value) for value in output.split()]
+
+
+def main():
+    optparser = argparse.ArgumentParser(description=__doc__)
+    optparser.add_argument("trace", nargs="?",
+        help="captured trace to parse, instead of a synthetic one")
+    optparser.add_argument("-n", "--calls", type=int, default=100000, dest="num_calls",
+        help="number of calls in the synthetic trace (default: %(default)s)")
+    optparser.add_argument("--min-ratio", type=float, dest="min_ratio",
+        help="fail if the legacy/compact ratio is below this")
+    optparser.add_argument("--measure", metavar="TRACE", help=argparse.SUPPRESS)
+    optparser.add_argument("--legacy", action="store_true", help=argparse.SUPPRESS)
+    args = optparser.parse_args()
+
+    if args.measure:
+        measure(args.measure, args.legacy)
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = args.trace
+        if filename is None:
+            filename = os.path.join(tmpdir, 'synthetic.gtrace')
+            with open(filename, 'wt') as stream:
+                write_synthetic_trace(stream, args.num_calls)
+
+        num_calls, legacy_rss, _, _ = run(filename, True)
+        num_calls, compact_rss, hits, lookups = run(filename, False)
+
+    ratio = legacy_rss / max(compact_rss, 1)
+    print(f"calls:   {num_calls}")
+    print(f"shared:  {100 * hits / max(lookups, 1):.1f}% of {lookups} nodes")
+    print(f"legacy:  {legacy_rss / 1024:.1f} MiB")
+    print(f"compact: {compact_rss / 1024:.1f} MiB")
+    print(f"ratio:   {ratio:.2f}x")
+
+    if args.min_ratio is not None and ratio < args.min_ratio:
+        print(f"ERROR: RSS reduction below {args.min_ratio}x", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
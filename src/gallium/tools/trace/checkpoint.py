@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# Copyright © 2026 Mesa contributors
+# SPDX-License-Identifier: MIT
+
+
+'''Sidecar checkpoints of the dump_state.py interpreter state.
+
+Rebuilding the pipeline state at a draw means replaying every call before
+it, so dump_state.py can periodically save the interpreter state (the
+objects created so far, including the contexts with their bound CSOs,
+constant buffers, framebuffer and sampler views, and the pointer naming
+state) and later resume from the nearest checkpoint before the requested
+call or draw.
+
+Checkpoints are appended to <trace>.ckpt, which is made of a header
+followed by records:
+
+    header      struct HEADER_FORMAT
+    record      struct RECORD_FORMAT, then the zlib compressed pickle of
+                the state after that call
+
+A checkpoint file whose trace has changed is discarded.  The header holds
+the SHA-256 of the trace, which is checked before anything is unpickled,
+and the unpickler only accepts the classes of the trace tools.  This keeps
+a stale or foreign checkpoint from being loaded by mistake, but the
+checkpoint is still a pickle: only resume from the checkpoints you wrote
+yourself.'''
+
+
+import hashlib
+import io
+import os
+import pickle
+import struct
+import sys
+import zlib
+
+
+CHECKPOINT_MAGIC = b'GTRACECK'
+CHECKPOINT_VERSION = 2
+CHECKPOINT_SUFFIX = '.ckpt'
+
+# magic, version, trace size, trace mtime (ns), trace SHA-256
+HEADER_FORMAT = '=8sIQQ32s'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# call number, number of draws so far, size of the compressed state
+RECORD_FORMAT = '=QQQ'
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+
+def checkpoint_filename(filename):
+    return filename + CHECKPOINT_SUFFIX
+
+
+def _trace_stat(filename):
+    st = os.stat(filename)
+    return st.st_size, st.st_mtime_ns
+
+
+_trace_digests = {}
+
+def _trace_digest(filename):
+    key = (os.path.abspath(filename),) + _trace_stat(filename)
+    digest = _trace_digests.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = _trace_digests[key] = h.digest()
+    return digest
+
+
+# The interpreter state is made of the objects of dump_state.py, which is
+# usually run as a script, and of model.py.
+_STATE_MODULES = ('__main__', 'dump_state', 'model')
+_STATE_BUILTINS = ('set', 'frozenset', 'bytearray', 'complex')
+
+class _StateUnpickler(pickle.Unpickler):
+    '''Unpickler which only resolves the classes of the interpreter state,
+    so that a checkpoint can't call arbitrary functions.'''
+
+    def find_class(self, module, name):
+        if module == 'builtins' and name in _STATE_BUILTINS:
+            return super().find_class(module, name)
+        if module in _STATE_MODULES and '.' not in name:
+            obj = getattr(sys.modules.get(module), name, None)
+            if isinstance(obj, type) and obj.__module__ == module:
+                return obj
+        raise pickle.UnpicklingError('checkpoint refers to %s.%s' % (module, name))
+
+
+def _load_state(data):
+    return _StateUnpickler(io.BytesIO(zlib.decompress(data))).load()
+
+
+def _read_records(f, filename):
+    '''Yield the (call number, draw number, offset, size) of the records of
+    an open checkpoint file, stopping at a truncated one.'''
+
+    header = f.read(HEADER_SIZE)
+    if len(header) != HEADER_SIZE:
+        return
+    magic, version, trace_size, trace_mtime, digest = struct.unpack(HEADER_FORMAT, header)
+    if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+        return
+    if (trace_size, trace_mtime) != _trace_stat(filename):
+        return
+    if digest != _trace_digest(filename):
+        return
+
+    end = os.fstat(f.fileno()).st_size
+    pos = HEADER_SIZE
+    while pos + RECORD_SIZE <= end:
+        f.seek(pos)
+        call_no, draw_no, size = struct.unpack(RECORD_FORMAT, f.read(RECORD_SIZE))
+        pos += RECORD_SIZE
+        if pos + size > end:
+            return
+        yield call_no, draw_no, pos, size
+        pos += size
+
+
+def list_checkpoints(filename):
+    '''Return the (call number, draw number) of the valid checkpoints of a
+    trace.'''
+
+    try:
+        with open(checkpoint_filename(filename), 'rb') as f:
+            return [(call_no, draw_no) for call_no, draw_no, pos, size in _read_records(f, filename)]
+    except OSError:
+        return []
+
+
+def load_checkpoint(filename, call = None, draw = None):
+    '''Load the latest checkpoint taken before the given call number and
+    draw number.
+
+    Returns a (call number, state) tuple, or None if there is no suitable
+    checkpoint.'''
+
+    try:
+        f = open(checkpoint_filename(filename), 'rb')
+    except OSError:
+        return None
+    with f:
+        best = None
+        for call_no, draw_no, pos, size in _read_records(f, filename):
+            if call is not None and call_no >= call:
+                continue
+            if draw is not None and draw_no >= draw:
+                continue
+            if best is None or call_no > best[0]:
+                best = (call_no, pos, size)
+        if best is None:
+            return None
+        call_no, pos, size = best
+        f.seek(pos)
+        try:
+            return call_no, _load_state(f.read(size))
+        except (pickle.UnpicklingError, zlib.error) as e:
+            sys.stderr.write('warning: ignoring checkpoint: %s\n' % e)
+            return None
+
+
+class CheckpointWriter:
+    '''Appends checkpoints every interval calls to a trace's checkpoint
+    file, keeping those already there.'''
+
+    def __init__(self, filename, interval):
+        self.interval = interval
+        self.last_call_no = None
+
+        fname = checkpoint_filename(filename)
+        try:
+            self.existing = set(call_no for call_no, draw_no in list_checkpoints(filename))
+            if self.existing:
+                self._file = open(fname, 'ab')
+            else:
+                trace_size, trace_mtime = _trace_stat(filename)
+                self._file = open(fname, 'wb')
+                self._file.write(struct.pack(HEADER_FORMAT, CHECKPOINT_MAGIC, CHECKPOINT_VERSION,
+                                             trace_size, trace_mtime, _trace_digest(filename)))
+        except OSError:
+            # E.g., read only directory
+            self._file = None
+
+    def due(self, call_no):
+        '''Whether a checkpoint should be taken after this call, i.e.,
+        whether it is the first one past a multiple of the interval.'''
+        last_call_no = self.last_call_no
+        self.last_call_no = call_no
+        if self._file is None or last_call_no is None:
+            return False
+        if call_no // self.interval == last_call_no // self.interval:
+            return False
+        return call_no not in self.existing
+
+    def write(self, call_no, draw_no, state):
+        data = zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+        self._file.write(struct.pack(RECORD_FORMAT, call_no, draw_no, len(data)))
+        self._file.write(data)
+        self._file.flush()
+        self.existing.add(call_no)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
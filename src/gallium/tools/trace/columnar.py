@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# Copyright © 2026 Mesa contributors
+# SPDX-License-Identifier: MIT
+
+
+'''Columnar export of traces for analytics.
+
+A trace is exported to a directory holding one NumPy .npy file per column
+and a meta.json describing the tables and their dictionaries:
+
+    calls.*.npy     one row per call
+        no          call number
+        method      index into meta['methods'] ("class::method")
+        time        call time, -1 when the call has no <time>
+        junk        whether the call is a junk call (see parse.py)
+    args.*.npy      one row per scalar leaf of the arguments and return value
+        call        row of the call in the calls table
+        field       index into meta['fields'], the dotted path of the leaf
+                    (e.g. "info.index_size", "state.rt[].blend_enable")
+        index       index of the innermost array element, -1 if none
+        kind        index into meta['kinds']
+        int         integer, bool, pointer address, blob size, or index
+                    into meta['strings'] of strings and enums
+        float       float value
+
+The .npy files are written without NumPy, a chunk at a time, so exporting
+needs constant memory.  Reading them back with load() needs NumPy; the
+columns are memory mapped, and aggregations such as time_per_method() are
+vectorized.'''
+
+
+import argparse
+import array
+import json
+import os
+import sys
+
+import model
+
+
+COLUMNAR_VERSION = 1
+
+KIND_NULL, KIND_INT, KIND_FLOAT, KIND_STRING, KIND_ENUM, KIND_POINTER, KIND_BLOB = range(7)
+KINDS = ['null', 'int', 'float', 'string', 'enum', 'pointer', 'blob']
+
+CALL_COLUMNS = [('no', 'I'), ('method', 'I'), ('time', 'q'), ('junk', 'B')]
+ARG_COLUMNS = [('call', 'I'), ('field', 'I'), ('index', 'i'), ('kind', 'B'), ('int', 'q'), ('float', 'd')]
+
+NPY_MAGIC = b'\x93NUMPY\x01\x00'
+NPY_HEADER_SIZE = 128
+
+
+def _npy_descr(typecode):
+    itemsize = array.array(typecode).itemsize
+    kind = {'B': 'u', 'H': 'u', 'I': 'u', 'Q': 'u',
+            'b': 'i', 'h': 'i', 'i': 'i', 'q': 'i',
+            'd': 'f'}[typecode]
+    if itemsize == 1:
+        return '|' + kind + '1'
+    byteorder = '<' if sys.byteorder == 'little' else '>'
+    return byteorder + kind + str(itemsize)
+
+
+class NpyColumnWriter:
+    '''Writes a one dimensional .npy file a chunk at a time.
+
+    The header is reserved up front and rewritten with the final shape on
+    close().'''
+
+    chunk_size = 64*1024
+
+    def __init__(self, filename, typecode):
+        self.typecode = typecode
+        self.values = array.array(typecode)
+        self.length = 0
+        self._file = open(filename, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        header = "{'descr': '%s', 'fortran_order': False, 'shape': (%u,), }" % (
+            _npy_descr(self.typecode), self.length)
+        size = NPY_HEADER_SIZE - len(NPY_MAGIC) - 2
+        header = header.ljust(size - 1) + '\n'
+        self._file.seek(0)
+        self._file.write(NPY_MAGIC)
+        self._file.write(size.to_bytes(2, 'little'))
+        self._file.write(header.encode('latin1'))
+
+    def append(self, value):
+        self.values.append(value)
+        if len(self.values) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        self.values.tofile(self._file)
+        self.length += len(self.values)
+        del self.values[:]
+
+    def close(self):
+        self.flush()
+        self._write_header()
+        self._file.close()
+
+
+class ColumnarWriter(model.Visitor):
+    '''Flattens calls into the calls and args tables.'''
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.methods = {}
+        self.fields = {}
+        self.strings = {}
+        self.call_columns = self._open_table('calls', CALL_COLUMNS)
+        self.arg_columns = self._open_table('args', ARG_COLUMNS)
+        self.nrows = 0
+
+        # Current call row, leaf field and array element index
+        self.row = 0
+        self.field = None
+        self.index = -1
+
+    def _open_table(self, table, columns):
+        return [NpyColumnWriter(os.path.join(self.directory, '%s.%s.npy' % (table, name)), typecode)
+                for name, typecode in columns]
+
+    @staticmethod
+    def _intern(table, key):
+        value = table.get(key)
+        if value is None:
+            value = table[key] = len(table)
+        return value
+
+    def add_call(self, call):
+        if call.klass is not None:
+            method = call.klass + '::' + call.method
+        else:
+            method = call.method
+        time = call.time.value if call.time is not None else -1
+
+        no, method_id, time_col, junk = self.call_columns
+        no.append(call.no)
+        method_id.append(self._intern(self.methods, method))
+        time_col.append(time)
+        junk.append(1 if call.is_junk else 0)
+
+        self.row = self.nrows
+        self.nrows += 1
+        for name, value in call.args:
+            self._add_value(name, value)
+        if call.ret is not None:
+            self._add_value('ret', call.ret)
+
+    def _add_value(self, path, node):
+        saved = self.field, self.index
+        self.field = path
+        node.visit(self)
+        self.field, self.index = saved
+
+    def _add_leaf(self, kind, int_value = 0, float_value = 0.0):
+        call, field, index, kind_col, int_col, float_col = self.arg_columns
+        call.append(self.row)
+        field.append(self._intern(self.fields, self.field))
+        index.append(self.index)
+        kind_col.append(kind)
+        # Wrap 64 bit unsigned values around, as in C
+        int_col.append(((int_value + (1 << 63)) & 0xffffffffffffffff) - (1 << 63))
+        float_col.append(float_value)
+
+    def visit_literal(self, node):
+        value = node.value
+        if value is None:
+            self._add_leaf(KIND_NULL)
+        elif isinstance(value, str):
+            self._add_leaf(KIND_STRING, self._intern(self.strings, value))
+        elif isinstance(value, float):
+            self._add_leaf(KIND_FLOAT, 0, value)
+        else:
+            self._add_leaf(KIND_INT, value)
+
+    def visit_blob(self, node):
+        self._add_leaf(KIND_BLOB, len(node.value))
+
+    def visit_named_constant(self, node):
+        self._add_leaf(KIND_ENUM, self._intern(self.strings, node.name))
+
+    def visit_array(self, node):
+        path = self.field + '[]'
+        for i, element in enumerate(node.elements):
+            self.field = path
+            self.index = i
+            element.visit(self)
+
+    def visit_struct(self, node):
+        path = self.field
+        index = self.index
+        for name, value in node.members:
+            self.field = path + '.' + name
+            self.index = index
+            value.visit(self)
+
+    def visit_pointer(self, node):
+        address = node.address
+        if address.startswith('0x'):
+            self._add_leaf(KIND_POINTER, int(address, 16))
+        else:
+            self._add_leaf(KIND_NULL)
+
+    def close(self):
+        for column in self.call_columns + self.arg_columns:
+            column.close()
+
+        meta = {
+            'version': COLUMNAR_VERSION,
+            'kinds': KINDS,
+            'methods': list(self.methods),
+            'fields': list(self.fields),
+            'strings': list(self.strings),
+            'tables': {
+                'calls': [name for name, typecode in CALL_COLUMNS],
+                'args': [name for name, typecode in ARG_COLUMNS],
+            },
+        }
+        with open(os.path.join(self.directory, 'meta.json'), 'wt') as f:
+            json.dump(meta, f)
+
+
+def export(calls, directory):
+    '''Export an iterable of calls to a columnar directory.'''
+    writer = ColumnarWriter(directory)
+    try:
+        for call in calls:
+            writer.add_call(call)
+    finally:
+        writer.close()
+
+
+class ColumnarTrace:
+    '''A columnar trace directory, as written by export().
+
+    calls and args map column names to (memory mapped) NumPy arrays.'''
+
+    def __init__(self, directory):
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError('loading columnar traces requires NumPy')
+        self.numpy = numpy
+
+        with open(os.path.join(directory, 'meta.json'), 'rt') as f:
+            meta = json.load(f)
+        if meta.get('version') != COLUMNAR_VERSION:
+            raise ValueError('%s: unsupported columnar trace version' % directory)
+
+        self.kinds = meta['kinds']
+        self.methods = meta['methods']
+        self.fields = meta['fields']
+        self.strings = meta['strings']
+
+        def table(name):
+            return {column: numpy.load(os.path.join(directory, '%s.%s.npy' % (name, column)), mmap_mode='r')
+                    for column in meta['tables'][name]}
+
+        self.calls = table('calls')
+        self.args = table('args')
+
+    def __len__(self):
+        return len(self.calls['no'])
+
+    def method_id(self, name):
+        '''Look up a "method" or "class::method" name.'''
+        for method_id, method in enumerate(self.methods):
+            if method == name or method.split('::', 1)[-1] == name:
+                return method_id
+        raise KeyError(name)
+
+    def field_id(self, name):
+        return self.fields.index(name)
+
+    def calls_per_method(self):
+        '''Return the number of calls of each method, indexed like methods.'''
+        return self.numpy.bincount(self.calls['method'], minlength=len(self.methods))
+
+    def time_per_method(self):
+        '''Return the total time spent in each method, indexed like methods.
+
+        Calls without a time are not counted.'''
+        numpy = self.numpy
+        time = self.calls['time']
+        timed = time >= 0
+        return numpy.bincount(self.calls['method'][timed], weights=time[timed],
+                              minlength=len(self.methods))
+
+    def field_values(self, name):
+        '''Return the call rows and integer values of a scalar field, e.g.
+        field_values('info.mode') for the primitive type of each draw.'''
+        mask = self.args['field'] == self.field_id(name)
+        return self.args['call'][mask], self.args['int'][mask]
+
+
+def load(directory):
+    return ColumnarTrace(directory)
+
+
+def main():
+    optparser = argparse.ArgumentParser(
+        description="Summarize the time spent per method in columnar trace exports")
+
+    optparser.add_argument("directory", action="extend", nargs="+",
+        type=str, metavar="directory", help="directory written by parse.py --export columnar")
+
+    args = optparser.parse_args()
+
+    for directory in args.directory:
+        trace = load(directory)
+        counts = trace.calls_per_method()
+        times = trace.time_per_method()
+        print('%s: %u calls' % (directory, len(trace)))
+        for method_id in reversed(times.argsort(kind='stable')):
+            print('%14u %10u  %s' % (times[method_id], counts[method_id], trace.methods[method_id]))
+
+
+if __name__ == '__main__':
+    main()
@@ -38,6 +38,7 @@ import argparse
 import model
 import format
 import parse as parser
+import checkpoint
 
 
 try:
@@ -148,6 +149,12 @@ class Dispatcher:
     def __init__(self, interpreter):
         self.interpreter = interpreter
 
+    def __getstate__(self):
+        # The interpreter is reattached when restoring a checkpoint
+        state = self.__dict__.copy()
+        del state['interpreter']
+        return state
+
 
 class Global(Dispatcher):
     '''Global name space.
@@ -786,6 +793,7 @@ class Interpreter(parser.SimpleTraceDumper):
         self.result = None
         self.globl = Global(self)
         self.call_no = None
+        self.checkpoints = None
 
     def register_object(self, address, object):
         self.objects[address] = object
@@ -838,6 +846,27 @@ class Interpreter(parser.SimpleTraceDumper):
 
         self.call_no = None
 
+        if self.checkpoints is not None and self.checkpoints.due(call.no):
+            self.save_checkpoint(call.no)
+
+    def draw_no(self):
+        draw_no = 0
+        for obj in self.objects.values():
+            if isinstance(obj, Context):
+                draw_no = max(draw_no, obj._draw_no)
+        return draw_no
+
+    def save_checkpoint(self, call_no):
+        self.checkpoints.write(call_no, self.draw_no(), (self.objects, self.state))
+
+    def restore_checkpoint(self, call_no, saved):
+        '''Resume interpreting right after the checkpointed call.'''
+        self.objects, self.state = saved
+        for obj in self.objects.values():
+            if isinstance(obj, Dispatcher):
+                obj.interpreter = self
+        self.call_range = (call_no + 1, sys.maxsize)
+
     def interpret_arg(self, node):
         translator = Translator(self)
         return translator.visit(node)
@@ -854,6 +883,8 @@ class DumpStateOptions(parser.ParseOptions):
         self.verbosity = None
         self.call = None
         self.draw = None
+        self.checkpoint_interval = None
+        self.resume = None
 
         parser.ParseOptions.__init__(self, args)
 
@@ -871,15 +902,43 @@ class Main(parser.Main):
         optparser.add_argument("-q", "--quiet", action="store_const", const=0, dest="verbosity", help="no messages")
         optparser.add_argument("-c", "--call", action="store", type=int, dest="call", default=0xffffffff, help="dump on this call")
         optparser.add_argument("-d", "--draw", action="store", type=int, dest="draw", default=0xffffffff, help="dump on this draw")
+        optparser.add_argument("-k", "--checkpoint-interval", action="store", type=int, dest="checkpoint_interval", default=0, metavar="N",
+            help="save the state every N calls in a <trace>.ckpt sidecar file; "
+                 "the states are pickles, so only resume from checkpoints you wrote yourself")
+        optparser.add_argument("--no-resume", action="store_false", dest="resume", default=True,
+            help="don't resume from the nearest saved state in the <trace>.ckpt file")
+        parser.add_parse_arguments(optparser)
         return optparser
 
     def make_options(self, args):
         return DumpStateOptions(args)
 
+    def open_stream(self, fname, options):
+        self.checkpoint = None
+
+        # Checkpoints only make sense when interpreting every call
+        if options.call_range is None and options.methods is None and options.resume:
+            self.checkpoint = checkpoint.load_checkpoint(fname, options.call, options.draw)
+
+        if self.checkpoint is not None:
+            call_no, saved = self.checkpoint
+            if options.verbosity:
+                sys.stderr.write('resuming after call %u\n' % call_no)
+            return parser.Main.open_stream(self, fname, options, (call_no + 1, sys.maxsize))
+        return parser.Main.open_stream(self, fname, options)
+
     def process_arg(self, stream, options):
         formatter = format.Formatter(sys.stderr)
         parser = Interpreter(stream, options, formatter, model.TraceStateData())
-        parser.parse()
+        if self.checkpoint is not None:
+            parser.restore_checkpoint(*self.checkpoint)
+        if options.checkpoint_interval > 0 and options.call_range is None and options.methods is None:
+            parser.checkpoints = checkpoint.CheckpointWriter(self.filename, options.checkpoint_interval)
+        try:
+            parser.parse()
+        finally:
+            if parser.checkpoints is not None:
+                parser.checkpoints.close()
 
 
 if __name__ == '__main__':
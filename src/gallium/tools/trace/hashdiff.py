@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# Copyright © 2026 Mesa contributors
+# SPDX-License-Identifier: MIT
+
+
+'''Diff of call sequences by their structural hashes.
+
+Calls are reduced to the hash computed by model.Call, and the digest
+sequences are compared with a patience diff: digests occurring exactly once
+in both sequences are matched up along their longest increasing
+subsequence, and the gaps between these anchors are diffed recursively.
+Gaps without unique digests fall back to Myers' linear space O(ND)
+algorithm, which gives up and reports the gap as replaced once the edit
+distance exceeds a budget, so the cost stays bounded on badly diverging
+traces.
+
+The result is a list of opcodes in the format of
+difflib.SequenceMatcher.get_opcodes().'''
+
+
+import bisect
+from collections import Counter
+
+
+# Upper bound on the (N + M) * D work spent on one Myers gap.
+MYERS_BUDGET = 1 << 20
+MYERS_MIN_D = 32
+
+
+def call_digests(calls):
+    return [call.hashvalue for call in calls]
+
+
+def _patience_anchors(a, alo, ahi, b, blo, bhi, isjunk):
+    '''Return the (i, j) positions of the longest increasing sequence of
+    digests that are unique in both a[alo:ahi] and b[blo:bhi].'''
+
+    counts = Counter(a[alo:ahi])
+    index = {}
+    for j in range(blo, bhi):
+        value = b[j]
+        if counts.get(value) == 1:
+            # -1 marks digests seen more than once in b
+            index[value] = -1 if value in index else j
+
+    pairs = []
+    for i in range(alo, ahi):
+        j = index.get(a[i], -1)
+        if j >= 0 and counts[a[i]] == 1 and (isjunk is None or not isjunk(a[i])):
+            pairs.append((i, j))
+
+    # Patience sort on the b positions, remembering the predecessor of
+    # each card to read back the longest increasing subsequence.
+    tops = []
+    top_index = []
+    prev = [-1] * len(pairs)
+    for n, (i, j) in enumerate(pairs):
+        pile = bisect.bisect_left(tops, j)
+        if pile:
+            prev[n] = top_index[pile - 1]
+        if pile == len(tops):
+            tops.append(j)
+            top_index.append(n)
+        else:
+            tops[pile] = j
+            top_index[pile] = n
+
+    anchors = []
+    n = top_index[-1] if top_index else -1
+    while n >= 0:
+        anchors.append(pairs[n])
+        n = prev[n]
+    anchors.reverse()
+    return anchors
+
+
+def _middle_snake(a, alo, ahi, b, blo, bhi, max_d):
+    '''Find the middle snake of Myers' linear space algorithm.
+
+    Returns (x0, y0, x1, y1), the start and end of the snake, or None if
+    the edit distance exceeds 2 * max_d.'''
+
+    n = ahi - alo
+    m = bhi - blo
+    delta = n - m
+    odd = delta & 1
+    size = 2 * max_d + 3
+    offset = max_d + 1
+    vf = [0] * size
+    vb = [0] * size
+
+    for d in range(0, max_d + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and vf[offset + k - 1] < vf[offset + k + 1]):
+                x = vf[offset + k + 1]
+            else:
+                x = vf[offset + k - 1] + 1
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            vf[offset + k] = x
+            c = delta - k
+            if odd and -d < c < d and x + vb[offset + c] >= n:
+                return x0, y0, x, y
+
+        for c in range(-d, d + 1, 2):
+            if c == -d or (c != d and vb[offset + c - 1] < vb[offset + c + 1]):
+                x = vb[offset + c + 1]
+            else:
+                x = vb[offset + c - 1] + 1
+            y = x - c
+            x0, y0 = x, y
+            while x < n and y < m and a[ahi - 1 - x] == b[bhi - 1 - y]:
+                x += 1
+                y += 1
+            vb[offset + c] = x
+            k = delta - c
+            if not odd and -d <= k <= d and x + vf[offset + k] >= n:
+                return n - x, m - y, n - x0, m - y0
+
+    return None
+
+
+def matching_blocks(a, b, isjunk = None):
+    '''Return the (i, j, size) blocks of equal digests of a and b, in
+    order, terminated by a (len(a), len(b), 0) sentinel.'''
+
+    blocks = []
+    # Work list, processed from the end: ranges to diff, tagged with
+    # whether unique anchors may still be found in them, and blocks of
+    # known matches.
+    todo = [(0, len(a), 0, len(b), True)]
+    while todo:
+        item = todo.pop()
+        if len(item) == 3:
+            blocks.append(item)
+            continue
+
+        alo, ahi, blo, bhi, patience = item
+
+        # Common prefix and suffix
+        i, j = alo, blo
+        while i < ahi and j < bhi and a[i] == b[j]:
+            i += 1
+            j += 1
+        if i > alo:
+            blocks.append((alo, blo, i - alo))
+        alo, blo = i, j
+
+        i, j = ahi, bhi
+        while i > alo and j > blo and a[i - 1] == b[j - 1]:
+            i -= 1
+            j -= 1
+        if i < ahi:
+            todo.append((i, j, ahi - i))
+        ahi, bhi = i, j
+
+        if alo == ahi or blo == bhi:
+            continue
+
+        if patience:
+            anchors = _patience_anchors(a, alo, ahi, b, blo, bhi, isjunk)
+            if anchors:
+                # Push the gaps and anchors in reverse order
+                i, j = ahi, bhi
+                for ai, bj in reversed(anchors):
+                    todo.append((ai + 1, i, bj + 1, j, True))
+                    todo.append((ai, bj, 1))
+                    i, j = ai, bj
+                todo.append((alo, i, blo, j, True))
+                continue
+
+        n = ahi - alo
+        m = bhi - blo
+        max_d = max(MYERS_MIN_D, MYERS_BUDGET // (n + m))
+        snake = _middle_snake(a, alo, ahi, b, blo, bhi, min(max_d, (n + m + 1) // 2))
+        if snake is None:
+            continue
+        x0, y0, x1, y1 = snake
+        todo.append((alo + x1, ahi, blo + y1, bhi, False))
+        if x1 > x0:
+            todo.append((alo + x0, blo + y0, x1 - x0))
+        todo.append((alo, alo + x0, blo, blo + y0, False))
+
+    # Coalesce adjacent blocks
+    merged = []
+    for i, j, size in blocks:
+        if merged:
+            pi, pj, psize = merged[-1]
+            if pi + psize == i and pj + psize == j:
+                merged[-1] = (pi, pj, psize + size)
+                continue
+        merged.append((i, j, size))
+    merged.append((len(a), len(b), 0))
+    return merged
+
+
+def get_opcodes(a, b, isjunk = None):
+    '''Diff the digest sequences a and b, returning difflib style
+    (tag, i1, i2, j1, j2) opcodes.
+
+    isjunk optionally tells digests that should not be used as anchors.'''
+
+    opcodes = []
+    i = j = 0
+    for ai, bj, size in matching_blocks(a, b, isjunk):
+        if i < ai and j < bj:
+            opcodes.append(('replace', i, ai, j, bj))
+        elif i < ai:
+            opcodes.append(('delete', i, ai, j, bj))
+        elif j < bj:
+            opcodes.append(('insert', i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            opcodes.append(('equal', ai, i, bj, j))
+    return opcodes
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# Copyright © 2026 Mesa contributors
+# SPDX-License-Identifier: MIT
+
+
+'''Sidecar index for random access into uncompressed trace files.
+
+The index records, for every top level <call> element, its byte offset in
+the trace, its call number, its class::method and its time.  It is stored
+next to the trace as <trace>.idx in a compact binary format made of plain
+arrays, so it can be memory mapped and binary searched without decoding:
+
+    header      struct HEADER_FORMAT
+    methods     '\\n' separated "class::method" names, padded to 8 bytes
+    offsets     uint64[ncalls + 1], the last entry being the end of the
+                last call
+    times       int64[ncalls], -1 when the call has no <time>
+    nos         uint32[ncalls], padded to 8 bytes
+    method ids  uint16[ncalls]
+'''
+
+
+import argparse
+import array
+import bisect
+import codecs
+import mmap
+import os
+import re
+import struct
+from xml.sax.saxutils import unescape
+
+
+INDEX_MAGIC = b'GTRACEIX'
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.idx'
+
+# magic, version, byte order marker, number of methods, number of calls,
+# trace size, trace mtime (ns), size of the method table
+HEADER_FORMAT = '=8sIIIIQQQ'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+BYTE_ORDER_MARKER = 0x01020304
+
+
+_call_re = re.compile(rb'''<call\s([^>]*)>|</call>|<time>\s*<int>(-?[0-9]+)</int>''')
+_attr_re = re.compile(rb'''([A-Za-z_]+)=(?:'([^']*)'|"([^"]*)")''')
+
+
+def index_filename(filename):
+    return filename + INDEX_SUFFIX
+
+
+def _pad(n, alignment = 8):
+    return (alignment - n % alignment) % alignment
+
+
+def _trace_stat(filename):
+    st = os.stat(filename)
+    return st.st_size, st.st_mtime_ns
+
+
+def build_index(filename, index_fname = None):
+    '''Scan an uncompressed trace and write its sidecar index.'''
+
+    if index_fname is None:
+        index_fname = index_filename(filename)
+
+    offsets = array.array('Q')
+    times = array.array('q')
+    nos = array.array('I')
+    method_ids = array.array('H')
+    methods = {}
+
+    trace_size, trace_mtime = _trace_stat(filename)
+
+    with open(filename, 'rb') as f:
+        if trace_size == 0:
+            data = b''
+        else:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        depth = 0
+        last_no = 0
+        end = 0
+        for mo in _call_re.finditer(data):
+            attrs, time = mo.group(1, 2)
+            if attrs is not None:
+                if depth == 0:
+                    values = {}
+                    for name, value1, value2 in _attr_re.findall(attrs):
+                        value = value1 or value2
+                        values[name.decode()] = unescape(value.decode('utf-8'))
+                    try:
+                        no = int(values['no'])
+                    except KeyError:
+                        no = last_no + 1
+                    last_no = no
+                    name = values.get('class', '') + '::' + values.get('method', '')
+                    method_id = methods.setdefault(name, len(methods))
+                    offsets.append(mo.start())
+                    times.append(-1)
+                    nos.append(no)
+                    method_ids.append(method_id)
+                depth += 1
+            elif time is not None:
+                if depth == 1:
+                    times[-1] = int(time)
+            else:
+                depth -= 1
+                if depth == 0:
+                    end = mo.end()
+
+        if len(offsets):
+            offsets.append(max(end, offsets[-1]))
+        else:
+            offsets.append(0)
+
+        if trace_size:
+            data.close()
+
+    if len(methods) > 0xffff:
+        raise ValueError('too many distinct methods for the index format')
+
+    method_table = '\n'.join(methods).encode('utf-8')
+
+    tmp_fname = index_fname + '.tmp'
+    with open(tmp_fname, 'wb') as f:
+        f.write(struct.pack(HEADER_FORMAT, INDEX_MAGIC, INDEX_VERSION, BYTE_ORDER_MARKER,
+                            len(methods), len(nos), trace_size, trace_mtime,
+                            len(method_table)))
+        f.write(method_table)
+        f.write(b'\0' * _pad(len(method_table)))
+        offsets.tofile(f)
+        times.tofile(f)
+        nos.tofile(f)
+        f.write(b'\0' * _pad(nos.itemsize * len(nos)))
+        method_ids.tofile(f)
+    os.replace(tmp_fname, index_fname)
+
+
+class TraceIndex:
+    '''Memory mapped view of a trace sidecar index.'''
+
+    def __init__(self, filename, index_fname = None):
+        if index_fname is None:
+            index_fname = index_filename(filename)
+
+        self.filename = filename
+
+        with open(index_fname, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            (magic, version, marker, nmethods, ncalls,
+             trace_size, trace_mtime, table_size) = struct.unpack_from(HEADER_FORMAT, self._mmap)
+        except struct.error:
+            raise ValueError('%s: truncated index' % index_fname)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION or marker != BYTE_ORDER_MARKER:
+            raise ValueError('%s: unsupported index' % index_fname)
+        if (trace_size, trace_mtime) != _trace_stat(filename):
+            raise ValueError('%s: stale index' % index_fname)
+
+        view = memoryview(self._mmap)
+        pos = HEADER_SIZE
+        table = bytes(view[pos:pos + table_size]).decode('utf-8')
+        self.methods = table.split('\n') if nmethods else []
+        pos += table_size + _pad(table_size)
+
+        def section(fmt, count):
+            nonlocal pos
+            size = struct.calcsize(fmt) * count
+            result = view[pos:pos + size].cast(fmt)
+            pos += size + _pad(size)
+            return result
+
+        self.offsets = section('Q', ncalls + 1)
+        self.times = section('q', ncalls)
+        self.nos = section('I', ncalls)
+        self.method_ids = section('H', ncalls)
+
+    def __len__(self):
+        return len(self.nos)
+
+    def find(self, no):
+        '''Return the position of the first call numbered no or higher.'''
+        return bisect.bisect_left(self.nos, no)
+
+    def method(self, i):
+        return self.methods[self.method_ids[i]]
+
+    def select(self, call_range = None, methods = None):
+        '''Return the positions of the calls matching the given filters.'''
+        if call_range is None:
+            start, stop = 0, len(self)
+        else:
+            start = self.find(call_range[0])
+            stop = bisect.bisect_right(self.nos, call_range[1], start)
+
+        if methods is None:
+            return range(start, stop)
+
+        wanted = set()
+        for method_id, name in enumerate(self.methods):
+            if name in methods or name.split('::', 1)[1] in methods:
+                wanted.add(method_id)
+        method_ids = self.method_ids
+        return [i for i in range(start, stop) if method_ids[i] in wanted]
+
+    def byte_ranges(self, selection):
+        '''Coalesce a selection of calls into (start, end) byte ranges.'''
+        ranges = []
+        offsets = self.offsets
+        for i in selection:
+            if ranges and ranges[-1][1] == offsets[i]:
+                ranges[-1][1] = offsets[i + 1]
+            else:
+                ranges.append([offsets[i], offsets[i + 1]])
+        return ranges
+
+    def chunks(self, selection, chunk_size):
+        '''Split a selection of calls into chunks of about chunk_size bytes.
+
+        Returns a list of (first call number, byte ranges) tuples.'''
+        chunks = []
+        offsets = self.offsets
+        current = []
+        size = 0
+        for i in selection:
+            if not current:
+                first_no = self.nos[i]
+            current.append(i)
+            size += offsets[i + 1] - offsets[i]
+            if size >= chunk_size:
+                chunks.append((first_no, self.byte_ranges(current)))
+                current = []
+                size = 0
+        if current:
+            chunks.append((first_no, self.byte_ranges(current)))
+        return chunks
+
+    def close(self):
+        self.offsets.release()
+        self.times.release()
+        self.nos.release()
+        self.method_ids.release()
+        self._mmap.close()
+
+
+def load_index(filename, build = True):
+    '''Load the sidecar index of a trace, (re)building it if needed.
+
+    Returns None for traces that can't be indexed (e.g., compressed ones).'''
+
+    if filename.endswith('.gz') or filename.endswith('.bz2'):
+        return None
+
+    try:
+        return TraceIndex(filename)
+    except (OSError, ValueError):
+        if not build:
+            return None
+
+    try:
+        build_index(filename)
+    except OSError:
+        # E.g., read only directory
+        return None
+    return TraceIndex(filename)
+
+
+class TraceSliceReader:
+    '''Text stream over selected byte ranges of a memory mapped trace,
+    wrapped in a <trace> element so it can be fed to the trace parser.'''
+
+    def __init__(self, filename, ranges):
+        self._file = open(filename, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._mmap = b''
+        self._pieces = [(0, len(b'<trace>'), b'<trace>')]
+        for start, end in ranges:
+            self._pieces.append((start, end, self._mmap))
+        self._pieces.append((0, len(b'</trace>'), b'</trace>'))
+        self._pieces.reverse()
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._pending = ''
+
+    def _read_bytes(self, size):
+        chunks = []
+        left = size
+        while self._pieces and (size < 0 or left > 0):
+            start, end, data = self._pieces[-1]
+            if size < 0 or end - start <= left:
+                stop = end
+                self._pieces.pop()
+            else:
+                stop = start + left
+                self._pieces[-1] = (stop, end, data)
+            chunks.append(data[start:stop])
+            left -= stop - start
+        return b''.join(chunks)
+
+    def read(self, size = -1):
+        # Like io.TextIOWrapper, only return less than size characters at
+        # the end of the stream, as the tokenizer relies on that.
+        text = self._pending
+        while self._pieces and (size < 0 or len(text) < size):
+            data = self._read_bytes(size if size >= 0 else -1)
+            text += self._decoder.decode(data, final = not self._pieces)
+        if size < 0:
+            self._pending = ''
+            return text
+        self._pending = text[size:]
+        return text[:size]
+
+    def close(self):
+        if not isinstance(self._mmap, bytes):
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_trace_slice(filename, call_range = None, methods = None):
+    '''Open only the calls of a trace matching the filters, using the
+    sidecar index to seek straight to them.
+
+    Returns None if the trace can't be indexed.'''
+
+    index = load_index(filename)
+    if index is None:
+        return None
+    try:
+        ranges = index.byte_ranges(index.select(call_range, methods))
+    finally:
+        index.close()
+    return TraceSliceReader(filename, ranges)
+
+
+def main():
+    optparser = argparse.ArgumentParser(
+        description="Build the sidecar index used for random access into Gallium trace(s)")
+
+    optparser.add_argument("filename", action="extend", nargs="+",
+        type=str, metavar="filename", help="Gallium trace filename (uncompressed)")
+
+    optparser.add_argument("-l", "--list",
+        action="store_const", const=True, default=False,
+        dest="list", help="list the indexed calls")
+
+    args = optparser.parse_args()
+
+    for fname in args.filename:
+        build_index(fname)
+        if args.list:
+            index = TraceIndex(fname)
+            for i in range(len(index)):
+                time = index.times[i]
+                print('%u %s @%u%s' % (index.nos[i], index.method(i), index.offsets[i],
+                                       ' // time %d' % time if time >= 0 else ''))
+            index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -58,14 +58,83 @@ class ModelOptions:
 
 class TraceStateData:
 
+    ptr_ignore_list = ["ret", "elem"]
+
     def __init__(self):
         self.ptr_list = {}
         self.ptr_type_list = {}
         self.ptr_types_list = {}
 
+    def add_pointer(self, address, pname):
+        # Check if address exists in list and if it is a return value address
+        t1 = address in self.ptr_list
+        if t1:
+            rname = self.ptr_type_list[address]
+            t2 = rname in self.ptr_ignore_list and pname not in self.ptr_ignore_list
+        else:
+            rname = pname
+            t2 = False
+
+        # If address does NOT exist (add it), OR IS a ret value (update with new type)
+        if not t1 or t2:
+            # If previously set to ret value, remove one from count
+            if t1 and t2:
+                self.adjust_ptr_type_count(rname, -1)
+
+            # Add / update
+            self.adjust_ptr_type_count(pname, 1)
+            tmp = "{}_{}".format(pname, self.ptr_types_list[pname])
+            self.ptr_list[address] = tmp
+            self.ptr_type_list[address] = pname
+
+    def adjust_ptr_type_count(self, pname, delta):
+        if pname not in self.ptr_types_list:
+            self.ptr_types_list[pname] = 0
+
+        self.ptr_types_list[pname] += delta
+
+
+class RecordingTraceStateData(TraceStateData):
+    '''Pointer state of a trace fragment parsed out of order.
+
+    Pointer names depend on every pointer seen before, so the names given
+    while parsing the fragment are only provisional.  The pointers are
+    logged, call by call, and replay() later names them in the state shared
+    by the whole trace, which the fragment's pointers then refer to.'''
+
+    def __init__(self):
+        TraceStateData.__init__(self)
+        self.log = []
+
+    def add_pointer(self, address, pname):
+        TraceStateData.add_pointer(self, address, pname)
+        self.log.append((address, pname))
+
+    def end_call(self):
+        self.log.append(None)
+
+    def replay(self, state, calls):
+        '''Name the pointers of the fragment's calls in state, yielding
+        each call once its pointers (and hence its hash) are final.'''
+        self.ptr_list = state.ptr_list
+        self.ptr_type_list = state.ptr_type_list
+        self.ptr_types_list = state.ptr_types_list
+        log = iter(self.log)
+        for call in calls:
+            for entry in log:
+                if entry is None:
+                    break
+                state.add_pointer(*entry)
+            call.rehash()
+            yield call
+        self.log = []
+
 
 class Node:
-    
+
+    # Traces can have millions of nodes, so avoid a __dict__ per node.
+    __slots__ = ()
+
     def visit(self, visitor):
         raise NotImplementedError
 
@@ -81,7 +150,9 @@ class Node:
 
 
 class Literal(Node):
-    
+
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -93,7 +164,9 @@ class Literal(Node):
 
 
 class Blob(Node):
-    
+
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = binascii.a2b_hex(value)
 
@@ -108,7 +181,9 @@ class Blob(Node):
 
 
 class NamedConstant(Node):
-    
+
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
@@ -120,7 +195,9 @@ class NamedConstant(Node):
     
 
 class Array(Node):
-    
+
+    __slots__ = ('elements',)
+
     def __init__(self, elements):
         self.elements = elements
 
@@ -135,10 +212,12 @@ class Array(Node):
 
 
 class Struct(Node):
-    
+
+    __slots__ = ('name', 'members')
+
     def __init__(self, name, members):
         self.name = name
-        self.members = members        
+        self.members = members
 
     def visit(self, visitor):
         visitor.visit_struct(self)
@@ -152,38 +231,12 @@ class Struct(Node):
 
 class Pointer(Node):
 
-    ptr_ignore_list = ["ret", "elem"]
+    __slots__ = ('address', 'state')
 
     def __init__(self, state, address, pname):
         self.address = address
         self.state = state
-
-        # Check if address exists in list and if it is a return value address
-        t1 = address in state.ptr_list
-        if t1:
-            rname = state.ptr_type_list[address]
-            t2 = rname in self.ptr_ignore_list and pname not in self.ptr_ignore_list
-        else:
-            rname = pname
-            t2 = False
-
-        # If address does NOT exist (add it), OR IS a ret value (update with new type)
-        if not t1 or t2:
-            # If previously set to ret value, remove one from count
-            if t1 and t2:
-                self.adjust_ptr_type_count(rname, -1)
-
-            # Add / update
-            self.adjust_ptr_type_count(pname, 1)
-            tmp = "{}_{}".format(pname, state.ptr_types_list[pname])
-            state.ptr_list[address] = tmp
-            state.ptr_type_list[address] = pname
-
-    def adjust_ptr_type_count(self, pname, delta):
-        if pname not in self.state.ptr_types_list:
-            self.state.ptr_types_list[pname] = 0
-
-        self.state.ptr_types_list[pname] += delta
+        state.add_pointer(address, pname)
 
     def named_address(self):
         return self.state.ptr_list[self.address]
@@ -196,7 +249,9 @@ class Pointer(Node):
 
 
 class Call:
-    
+
+    __slots__ = ('no', 'klass', 'method', 'args', 'ret', 'time', 'hashvalue', 'is_junk')
+
     def __init__(self, no, klass, method, args, ret, time):
         self.no = no
         self.klass = klass
@@ -204,12 +259,15 @@ class Call:
         self.args = args
         self.ret = ret
         self.time = time
+        self.is_junk = False
+        self.rehash()
 
+    def rehash(self):
         # Calculate hashvalue "cached" into a variable
         self.hashvalue = hash(self.klass) ^ hash(self.method)
         for mname, mobj in self.args:
             self.hashvalue = self.hashvalue ^ hash(mname) ^ hash(mobj)
-        
+
     def visit(self, visitor):
         visitor.visit_call(self)
 
@@ -28,11 +28,16 @@
 
 
 import io
+import os
 import sys
 import xml.parsers.expat as xpat
 import argparse
+import collections
+import multiprocessing
 
+import columnar
 import format
+import index
 from model import *
 
 
@@ -80,6 +85,8 @@ class XmlToken:
 class XmlTokenizer:
     """Expat based XML tokenizer."""
 
+    read_size = 256*1024
+
     def __init__(self, fp, skip_ws = True):
         self.fp = fp
         self.tokens = []
@@ -91,6 +98,10 @@ class XmlTokenizer:
         self.character_data = []
         
         self.parser = xpat.ParserCreate()
+        # Let expat coalesce character data into as few callbacks as
+        # possible, rather than delivering it one chunk at a time.
+        self.parser.buffer_text = True
+        self.parser.buffer_size = self.read_size
         self.parser.StartElementHandler  = self.handle_element_start
         self.parser.EndElementHandler    = self.handle_element_end
         self.parser.CharacterDataHandler = self.handle_character_data
@@ -122,7 +133,7 @@ class XmlTokenizer:
             self.character_data = []
     
     def next(self):
-        size = 16*1024
+        size = self.read_size
         while self.index >= len(self.tokens) and not self.final:
             self.tokens = []
             self.index = 0
@@ -170,6 +181,21 @@ class XmlParser:
     def consume(self):
         self.token = self.tokenizer.next()
 
+    def skip_element(self, name):
+        """Skip the current element and all its children, without
+        interpreting them."""
+        self.element_start(name)
+        depth = 1
+        while depth:
+            token = self.token
+            if token.type == ELEMENT_START:
+                depth += 1
+            elif token.type == ELEMENT_END:
+                depth -= 1
+            elif token.type == EOF:
+                raise TokenMismatch(XmlToken(ELEMENT_END, name), token)
+            self.consume()
+
     def match_element_start(self, name):
         return self.token.type == ELEMENT_START and self.token.name_or_data == name
     
@@ -208,32 +234,77 @@ class XmlParser:
 
 class TraceParser(XmlParser):
 
-    def __init__(self, fp, options, state):
+    def __init__(self, fp, options, state, call_range = None, methods = None):
         XmlParser.__init__(self, fp)
         self.last_call_no = 0
         self.state = state
         self.options = options
+        if call_range is None:
+            call_range = getattr(options, 'call_range', None)
+        if methods is None:
+            methods = getattr(options, 'methods', None)
+        self.call_range = call_range
+        self.methods = set(methods) if methods is not None else None
+        self.nodes = {}
 
     def parse(self):
+        for call in self.iter_calls():
+            self.handle_call(call)
+
+    def iter_calls(self):
+        """Generator yielding the calls of the trace one at a time.
+
+        Calls are not kept around once they have been yielded, so memory
+        usage does not depend on the size of the trace."""
+        if isinstance(self.tokenizer.fp, ParallelTraceReader):
+            yield from self.tokenizer.fp.iter_calls(self)
+            return
         self.element_start('trace')
         while self.token.type not in (ELEMENT_END, EOF):
             call = self.parse_call()
+            if call is None:
+                if self.call_range is not None and self.last_call_no > self.call_range[1]:
+                    # Call numbers are monotonic, nothing more to find.
+                    return
+                continue
             call.is_junk = trace_call_ignore(call)
-            self.handle_call(call)
+            yield call
         if self.token.type != EOF:
             self.element_end('trace')
 
+    def want_call(self, no, klass, method):
+        if self.call_range is not None:
+            first, last = self.call_range
+            if no < first or no > last:
+                return False
+        if self.methods is not None:
+            if method not in self.methods and f'{klass}::{method}' not in self.methods:
+                return False
+        return True
+
     def parse_call(self):
-        attrs = self.element_start('call')
+        while self.token.type == CHARACTER_DATA:
+            self.consume()
+        if self.token.type == ELEMENT_START:
+            attrs = self.token.attrs
+        else:
+            attrs = {}
         try:
             no = int(attrs['no'])
         except KeyError as e:
-            self.last_call_no += 1
-            no = self.last_call_no
-        else:
-            self.last_call_no = no
-        klass = attrs['class']
-        method = attrs['method']
+            no = self.last_call_no + 1
+        self.last_call_no = no
+        klass = attrs.get('class')
+        method = attrs.get('method')
+        if klass is not None:
+            klass = sys.intern(klass)
+        if method is not None:
+            method = sys.intern(method)
+        if not self.want_call(no, klass, method):
+            # Filtered out calls are skipped without building any nodes.
+            self.skip_element('call')
+            return None
+        self.element_start('call')
         args = []
         ret = None
         time = None
@@ -251,12 +322,12 @@ class TraceParser(XmlParser):
             else:
                 raise TokenMismatch("<arg ...> or <ret ...>", self.token)
         self.element_end('call')
-        
-        return Call(no, klass, method, args, ret, time)
+
+        return Call(no, klass, method, tuple(args), ret, time)
 
     def parse_arg(self):
         attrs = self.element_start('arg')
-        name = attrs['name']
+        name = sys.intern(attrs['name'])
         value = self.parse_value(name)
         self.element_end('arg')
 
@@ -286,43 +357,43 @@ class TraceParser(XmlParser):
     def parse_null(self, pname):
         self.element_start('null')
         self.element_end('null')
-        return Literal(None)
+        return self.shared_literal(None)
         
     def parse_bool(self, pname):
         self.element_start('bool')
         value = int(self.character_data())
         self.element_end('bool')
-        return Literal(value)
+        return self.shared_literal(value)
         
     def parse_int(self, pname):
         self.element_start('int')
         value = int(self.character_data())
         self.element_end('int')
-        return Literal(value)
+        return self.shared_literal(value)
         
     def parse_uint(self, pname):
         self.element_start('uint')
         value = int(self.character_data())
         self.element_end('uint')
-        return Literal(value)
+        return self.shared_literal(value)
         
     def parse_float(self, pname):
         self.element_start('float')
         value = float(self.character_data())
         self.element_end('float')
-        return Literal(value)
+        return self.shared_literal(value)
         
     def parse_enum(self, pname):
         self.element_start('enum')
-        name = self.character_data()
+        name = sys.intern(self.character_data())
         self.element_end('enum')
-        return NamedConstant(name)
+        return self.shared_node((NamedConstant, name), NamedConstant, name)
         
     def parse_string(self, pname):
         self.element_start('string')
         value = self.character_data()
         self.element_end('string')
-        return Literal(value)
+        return self.shared_literal(value)
         
     def parse_bytes(self, pname):
         self.element_start('bytes')
@@ -336,7 +407,9 @@ class TraceParser(XmlParser):
         while self.token.type != ELEMENT_END:
             elems.append(self.parse_elem('array'))
         self.element_end('array')
-        return Array(elems)
+        elems = tuple(elems)
+        key = (Array,) + tuple(map(id, elems))
+        return self.shared_node(key, Array, elems)
 
     def parse_elem(self, pname):
         self.element_start('elem')
@@ -346,16 +419,18 @@ class TraceParser(XmlParser):
 
     def parse_struct(self, pname):
         attrs = self.element_start('struct')
-        name = attrs['name']
+        name = sys.intern(attrs['name'])
         members = []
         while self.token.type != ELEMENT_END:
             members.append(self.parse_member(name))
         self.element_end('struct')
-        return Struct(name, members)
+        members = tuple(members)
+        key = (Struct, name) + tuple((mname, id(mobj)) for mname, mobj in members)
+        return self.shared_node(key, Struct, name, members)
 
     def parse_member(self, pname):
         attrs = self.element_start('member')
-        name = attrs['name']
+        name = sys.intern(attrs['name'])
         value = self.parse_value(name)
         self.element_end('member')
 
@@ -366,10 +441,155 @@ class TraceParser(XmlParser):
         address = self.character_data()
         self.element_end('ptr')
 
-        return Pointer(self.state, address, pname)
+        key = (Pointer, address)
+        node = self.nodes.get(key)
+        if node is None:
+            return self.shared_node(key, Pointer, self.state, address, pname)
+        # The pointer node can be shared, but it still counts as a use.
+        self.state.add_pointer(address, pname)
+        return node
+
+    # Maximum number of distinct values whose nodes are shared.  The cache is
+    # simply dropped when full, so memory use stays bounded when streaming.
+    node_cache_size = 64*1024
+
+    # Longer strings are unlikely to repeat, so don't bother sharing them.
+    shared_string_size = 256
+
+    def shared_node(self, key, factory, *args):
+        """Return the node for the given key, sharing it with identical
+        values parsed before.
+
+        Keys of compound nodes refer to their children by id, which is safe
+        as children are themselves shared and kept alive by the cache."""
+        node = self.nodes.get(key)
+        if node is None:
+            if len(self.nodes) >= self.node_cache_size:
+                self.nodes.clear()
+            node = factory(*args)
+            self.nodes[key] = node
+        return node
+
+    def shared_literal(self, value):
+        if isinstance(value, str) and len(value) > self.shared_string_size:
+            return Literal(value)
+        # The type is part of the key, as 1 == 1.0
+        return self.shared_node((Literal, type(value), value), Literal, value)
 
     def handle_call(self, call):
         pass
+
+
+def open_trace(filename, call_range = None, methods = None):
+    """Open a (possibly compressed) trace file as a text stream.
+
+    When call_range or methods are given, uncompressed traces are indexed
+    (see index.py) and only the matching calls are read."""
+    if call_range is not None or methods is not None:
+        stream = index.open_trace_slice(filename, call_range, methods)
+        if stream is not None:
+            return stream
+    if filename.endswith('.gz'):
+        from gzip import GzipFile
+        return io.TextIOWrapper(GzipFile(filename, 'rb'))
+    elif filename.endswith('.bz2'):
+        from bz2 import BZ2File
+        return io.TextIOWrapper(BZ2File(filename, 'rb'))
+    else:
+        return open(filename, 'rt')
+
+
+def _parse_chunk(filename, first_no, ranges, options):
+    state = RecordingTraceStateData()
+    with index.TraceSliceReader(filename, ranges) as stream:
+        parser = TraceParser(stream, options, state)
+        parser.last_call_no = first_no - 1
+        calls = []
+        for call in parser.iter_calls():
+            calls.append(call)
+            state.end_call()
+    return calls, state
+
+
+class ParallelTraceReader:
+    """Stand-in for a trace stream, that parses chunks of an indexed trace
+    in a pool of worker processes.
+
+    To the XML tokenizer it looks like an empty stream, while the calls
+    are given, in order, to TraceParser.iter_calls() by iter_calls()."""
+
+    max_chunk_size = 16*1024*1024
+
+    def __init__(self, filename, jobs, call_range = None, methods = None):
+        self.filename = filename
+        self.jobs = jobs
+        self.chunks = None
+
+        trace_index = index.load_index(filename)
+        if trace_index is None:
+            return
+        try:
+            selection = trace_index.select(call_range, methods)
+            if len(selection):
+                total = trace_index.offsets[selection[-1] + 1] - trace_index.offsets[selection[0]]
+            else:
+                total = 0
+            chunk_size = max(1, min(total // jobs, self.max_chunk_size))
+            self.chunks = trace_index.chunks(selection, chunk_size)
+        finally:
+            trace_index.close()
+
+    def read(self, size = -1):
+        return ''
+
+    def close(self):
+        pass
+
+    def iter_calls(self, parser):
+        with multiprocessing.Pool(self.jobs) as pool:
+            # Only keep a few chunks in flight, so memory usage stays
+            # bounded however slowly the calls are consumed.
+            pending = collections.deque()
+            chunks = iter(self.chunks)
+            while True:
+                while len(pending) < 2*self.jobs:
+                    try:
+                        first_no, ranges = next(chunks)
+                    except StopIteration:
+                        break
+                    pending.append(pool.apply_async(_parse_chunk,
+                        (self.filename, first_no, ranges, parser.options)))
+                if not pending:
+                    break
+                calls, state = pending.popleft().get()
+                # Name pointers exactly as a serial parse would have.
+                yield from state.replay(parser.state, calls)
+
+
+def open_trace_parallel(filename, jobs, call_range = None, methods = None):
+    """Open an uncompressed trace for parsing with several processes.
+
+    Returns None if the trace can't be indexed."""
+    reader = ParallelTraceReader(filename, jobs, call_range, methods)
+    if reader.chunks is None:
+        return None
+    return reader
+
+
+def iter_calls(filename, call_range = None, methods = None, options = None, state = None):
+    """Iterate over the calls in a trace file.
+
+    call_range is an optional inclusive (first, last) tuple of call numbers,
+    and methods an optional collection of "method" or "class::method" names.
+    Calls not matching either filter are skipped without parsing their
+    arguments, so they do not contribute to pointer naming in state."""
+    if options is None:
+        options = ParseOptions()
+    if state is None:
+        state = TraceStateData()
+    with open_trace(filename, call_range, methods) as stream:
+        parser = TraceParser(stream, options, state, call_range, methods)
+        yield from parser.iter_calls()
     
     
 class SimpleTraceDumper(TraceParser):
@@ -403,12 +623,46 @@ class TraceDumper(SimpleTraceDumper):
             call.visit(self.pretty_printer)
 
 
+def call_range_type(value):
+    """Parse a call range argument, of the form N, N-M, N- or -M."""
+    try:
+        if '-' in value:
+            first, last = value.split('-', 1)
+            first = int(first) if first else 0
+            last = int(last) if last else sys.maxsize
+        else:
+            first = last = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid call range '{value}'")
+    if first > last:
+        raise argparse.ArgumentTypeError(f"empty call range '{value}'")
+    return first, last
+
+
+def add_parse_arguments(optparser):
+    optparser.add_argument("-r", "--call-range",
+        type=call_range_type, default=None, metavar="N-M",
+        dest="call_range", help="only parse calls in this range (uses a sidecar index for uncompressed traces)")
+
+    optparser.add_argument("-m", "--method",
+        action="append", default=None, metavar="[CLASS::]METHOD",
+        dest="methods", help="only parse calls to this method, may be repeated")
+
+    optparser.add_argument("-j", "--jobs",
+        type=int, default=1, metavar="N",
+        dest="jobs", help="parse uncompressed traces with N processes")
+
+
 class ParseOptions(ModelOptions):
 
     def __init__(self, args=None):
         # Initialize options local to this module
         self.plain = False
         self.ignore_junk = False
+        self.call_range = None
+        self.methods = None
+        self.jobs = 1
+        self.export = None
 
         ModelOptions.__init__(self, args)
 
@@ -424,22 +678,27 @@ class Main:
         args = optparser.parse_args()
         options = self.make_options(args)
 
+        self.filenames = args.filename
         for fname in args.filename:
+            self.filename = fname
             try:
-                if fname.endswith('.gz'):
-                    from gzip import GzipFile
-                    stream = io.TextIOWrapper(GzipFile(fname, 'rb'))
-                elif fname.endswith('.bz2'):
-                    from bz2 import BZ2File
-                    stream = io.TextIOWrapper(BZ2File(fname, 'rb'))
-                else:
-                    stream = open(fname, 'rt')
+                stream = self.open_stream(fname, options)
             except Exception as e:
                 print("ERROR: {}".format(str(e)))
                 sys.exit(1)
 
             self.process_arg(stream, options)
 
+    def open_stream(self, fname, options, call_range = None):
+        if call_range is None:
+            call_range = options.call_range
+        stream = None
+        if options.jobs > 1:
+            stream = open_trace_parallel(fname, options.jobs, call_range, options.methods)
+        if stream is None:
+            stream = open_trace(fname, call_range, options.methods)
+        return stream
+
     def make_options(self, args):
         return ParseOptions(args)
 
@@ -476,9 +735,26 @@ class Main:
             action="store_const", const=True, default=False,
             dest="ignore_junk", help="filter out/ignore junk calls (see below)")
 
+        optparser.add_argument("--export",
+            nargs=2, default=None, metavar=("FORMAT", "DIR"),
+            dest="export", help="export the calls to DIR instead of dumping them (FORMAT: columnar)")
+
+        add_parse_arguments(optparser)
+
         return optparser
 
     def process_arg(self, stream, options):
+        if options.export is not None:
+            export_format, directory = options.export
+            if export_format != 'columnar':
+                print("ERROR: unsupported export format '{}'".format(export_format))
+                sys.exit(1)
+            if len(self.filenames) > 1:
+                directory = os.path.join(directory, os.path.basename(self.filename))
+            parser = TraceParser(stream, options, TraceStateData())
+            columnar.export(parser.iter_calls(), directory)
+            return
+
         if options.plain:
             formatter = format.Formatter(sys.stdout)
         else:
@@ -26,6 +26,7 @@
 ##########################################################################
 
 from parse import *
+import hashdiff
 import os
 import sys
 import re
@@ -232,15 +233,7 @@ class PKKPrettyPrinter(PrettyPrinter):
 def pkk_parse_trace(filename, options, state):
     pkk_info(f"Parsing {filename} ...")
     try:
-        if filename.endswith(".gz"):
-            from gzip import GzipFile
-            stream = io.TextIOWrapper(GzipFile(filename, "rb"))
-        elif filename.endswith(".bz2"):
-            from bz2 import BZ2File
-            stream = io.TextIOWrapper(BZ2File(filename, "rb"))
-        else:
-            stream = open(filename, "rt")
-
+        stream = open_trace(filename)
     except OSError as e:
         pkk_fatal(str(e))
 
@@ -313,6 +306,12 @@ if __name__ == "__main__":
         action="store_true",
         help="suppress common sections completely")
 
+    optparser.add_argument("-F", "--fast",
+        dest="fast_diff",
+        action="store_true",
+        help="diff structural call hashes with a patience/Myers diff instead of "
+        "difflib, much faster on large traces (implies -C)")
+
     optparser.add_argument("-N", "--named",
         dest="named_ptrs",
         action="store_true",
@@ -342,10 +341,18 @@ if __name__ == "__main__":
 
     ### Perform diffing
     pkk_info("Matching trace sequences ...")
-    sequence = difflib.SequenceMatcher(lambda x : x.is_junk, stack1, stack2, autojunk=False)
+    if options.fast_diff:
+        options.suppress_common = True
+        junk = set(call.hashvalue for call in stack1 + stack2 if call.is_junk)
+        opcodes = hashdiff.get_opcodes(
+            hashdiff.call_digests(stack1),
+            hashdiff.call_digests(stack2),
+            junk.__contains__)
+    else:
+        sequence = difflib.SequenceMatcher(lambda x : x.is_junk, stack1, stack2, autojunk=False)
 
-    pkk_info("Sequencing diff ...")
-    opcodes = sequence.get_opcodes()
+        pkk_info("Sequencing diff ...")
+        opcodes = sequence.get_opcodes()
     if len(opcodes) == 1 and opcodes[0][0] == "equal":
         print("The files are identical.")
         sys.exit(0)
@@ -149,19 +149,22 @@ def define_tracepoints(args):
 def generate_code(args):
     from u_trace import utrace_generate
     from u_trace import utrace_generate_perfetto_utils
+    from u_trace import utrace_generate_py
 
     utrace_generate(cpath=args.utrace_src, hpath=args.utrace_hdr,
                     ctx_param='struct intel_ds_device *dev',
                     need_cs_param=False)
     utrace_generate_perfetto_utils(hpath=args.perfetto_hdr)
+    utrace_generate_py(pypath=args.utrace_py, script='intel_tracepoints.py')
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('-p', '--import-path', required=True)
-    parser.add_argument('--utrace-src', required=True)
-    parser.add_argument('--utrace-hdr', required=True)
-    parser.add_argument('--perfetto-hdr', required=True)
+    parser.add_argument('--utrace-src')
+    parser.add_argument('--utrace-hdr')
+    parser.add_argument('--perfetto-hdr')
+    parser.add_argument('--utrace-py', help='python module for the offline analysis of traces')
     args = parser.parse_args()
     sys.path.insert(0, args.import_path)
     define_tracepoints(args)
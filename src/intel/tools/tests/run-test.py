@@ -1,12 +1,16 @@
 #!/usr/bin/env python3
 
 import argparse
+import concurrent.futures
 import difflib
 import errno
+import hashlib
+import json
 import os
 import pathlib
 import subprocess
 import sys
+import time
 
 # The meson version handles windows paths better, but if it's not available
 # fall back to shlex
@@ -15,57 +19,167 @@ try:
 except ImportError:
     from shlex import split as split_args
 
-parser = argparse.ArgumentParser()
-parser.add_argument('--i965_asm',
-                    help='path to i965_asm binary')
-parser.add_argument('--gen_name',
-                    help='name of the hardware generation (as understood by i965_asm)')
-parser.add_argument('--gen_folder',
-                    type=pathlib.Path,
-                    help='name of the folder for the generation')
-args = parser.parse_args()
-
-wrapper = os.environ.get('MESON_EXE_WRAPPER')
-if wrapper is not None:
-    i965_asm = split_args(wrapper) + [args.i965_asm]
-else:
-    i965_asm = [args.i965_asm]
-
-success = True
-
-for asm_file in args.gen_folder.glob('*.asm'):
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def run_test(i965_asm, gen_name, asm_file):
+    """Assembles asm_file and compares the result with the .expected file
+    next to it. Returns the unified diff, empty if the test passed."""
     expected_file = asm_file.stem + '.expected'
-    expected_path = args.gen_folder / expected_file
+    expected_path = asm_file.parent / expected_file
+
+    command = i965_asm + [
+        '--type', 'hex',
+        '--gen', gen_name,
+        asm_file
+    ]
+    output = subprocess.run(command,
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL).stdout.decode('ascii')
+
+    with expected_path.open() as f:
+        expected = f.read()
+
+    if output == expected:
+        return ''
+
+    return ''.join(difflib.unified_diff(expected.splitlines(keepends=True),
+                                        output.splitlines(keepends=True),
+                                        expected_file, asm_file.stem + '.out'))
+
+
+def load_cache(path):
+    if path is None:
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path, cache):
+    if path is None:
+        return
+    tmp = str(path) + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
 
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--i965_asm',
+                        help='path to i965_asm binary')
+    parser.add_argument('--gen_name',
+                        action='append',
+                        required=True,
+                        help='name of the hardware generation (as understood by i965_asm), '
+                             'may be repeated along with --gen_folder')
+    parser.add_argument('--gen_folder',
+                        type=pathlib.Path,
+                        action='append',
+                        required=True,
+                        help='name of the folder for the generation')
+    parser.add_argument('-j', '--jobs',
+                        type=int,
+                        default=os.cpu_count(),
+                        help='number of tests to run concurrently')
+    parser.add_argument('--cache',
+                        type=pathlib.Path,
+                        help='file recording the passing tests, which are skipped '
+                             'as long as their input, expected output and i965_asm '
+                             'binary are unchanged')
+    parser.add_argument('--summary',
+                        type=pathlib.Path,
+                        help='write a JSON summary of the results to this file')
+    args = parser.parse_args()
+
+    if len(args.gen_name) != len(args.gen_folder):
+        parser.error('--gen_name and --gen_folder must be given the same number of times')
+
+    wrapper = os.environ.get('MESON_EXE_WRAPPER')
+    if wrapper is not None:
+        i965_asm = split_args(wrapper) + [args.i965_asm]
+    else:
+        i965_asm = [args.i965_asm]
+
+    binary_hash = file_hash(args.i965_asm)
+    cache = load_cache(args.cache)
+
+    tests = []
+    for gen_name, gen_folder in zip(args.gen_name, args.gen_folder):
+        for asm_file in sorted(gen_folder.glob('*.asm')):
+            tests.append((gen_name, asm_file))
+
+    def hashes(gen_name, asm_file):
+        return {
+            'gen': gen_name,
+            'asm': file_hash(asm_file),
+            'expected': file_hash(asm_file.parent / (asm_file.stem + '.expected')),
+            'i965_asm': binary_hash,
+        }
+
+    def run(test):
+        gen_name, asm_file = test
+        start = time.perf_counter()
+        key = str(asm_file.resolve())
+        state = hashes(gen_name, asm_file)
+        if cache.get(key) == state:
+            return test, 'cached', '', time.perf_counter() - start, state
+        diff = run_test(i965_asm, gen_name, asm_file)
+        status = 'fail' if diff else 'pass'
+        return test, status, diff, time.perf_counter() - start, state
+
+    start = time.perf_counter()
     try:
-        command = i965_asm + [
-            '--type', 'hex',
-            '--gen', args.gen_name,
-            asm_file
-        ]
-        with subprocess.Popen(command,
-                              stdout=subprocess.PIPE,
-                              stderr=subprocess.DEVNULL) as cmd:
-            lines_after = [line.decode('ascii') for line in cmd.stdout.readlines()]
+        with concurrent.futures.ThreadPoolExecutor(max(1, args.jobs)) as pool:
+            results = list(pool.map(run, tests))
     except OSError as e:
         if e.errno == errno.ENOEXEC:
             print('Skipping due to inability to run host binaries.',
                   file=sys.stderr)
             exit(77)
         raise
+    elapsed = time.perf_counter() - start
 
-    with expected_path.open() as f:
-        lines_before = f.readlines()
+    success = True
+    for (gen_name, asm_file), status, diff, seconds, state in results:
+        key = str(asm_file.resolve())
+        if status == 'fail':
+            print('Output comparison for {}:'.format(asm_file.name))
+            print(diff)
+            success = False
+            cache.pop(key, None)
+        else:
+            print('{} : PASS{}'.format(asm_file.name,
+                                       ' (cached)' if status == 'cached' else ''))
+            cache[key] = state
 
-    diff = ''.join(difflib.unified_diff(lines_before, lines_after,
-                                        expected_file, asm_file.stem + '.out'))
+    save_cache(args.cache, cache)
+
+    if args.summary is not None:
+        summary = {
+            'seconds': elapsed,
+            'jobs': args.jobs,
+            'counts': {status: sum(1 for r in results if r[1] == status)
+                       for status in ['pass', 'fail', 'cached']},
+            'tests': [{
+                'gen': gen_name,
+                'file': str(asm_file),
+                'status': status,
+                'seconds': seconds,
+            } for (gen_name, asm_file), status, diff, seconds, state in results],
+        }
+        with args.summary.open('w') as f:
+            json.dump(summary, f, indent=1)
+
+    if not success:
+        exit(1)
 
-    if diff:
-        print('Output comparison for {}:'.format(asm_file.name))
-        print(diff)
-        success = False
-    else:
-        print('{} : PASS'.format(asm_file.name))
 
-if not success:
-    exit(1)
+if __name__ == '__main__':
+    main()
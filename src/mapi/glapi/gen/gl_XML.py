@@ -29,15 +29,155 @@ from decimal import Decimal
 import xml.etree.ElementTree as ET
 import re, sys
 import os.path
+import contextlib
+import gc
+import hashlib
+import pickle
+import tempfile
 import typeexpr
 import static_data
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# Processed APIs, pickled, by cache key. When the cache is enabled, this
+# makes parsing the same XML file with the same factory more than once in a
+# process cheap.
+_parsed_apis = {}
+
+def _api_cache_key(file_name, factory):
+    """Key of the API parsed from file_name with factory, from the path of
+    the file and the sources of the modules creating the objects.
+
+    The XML files included by file_name are not known before parsing it, so
+    the cache entries record their digests, see _load_cached_api()."""
+
+    h = hashlib.sha256()
+    h.update(os.path.abspath(file_name).encode())
+    modules = [sys.modules[__name__], typeexpr, static_data]
+    for cls in type(factory).__mro__[:-1]:
+        modules.append(sys.modules[cls.__module__])
+
+    for module in modules:
+        h.update(module.__name__.encode())
+        with open(module.__file__, 'rb') as f:
+            h.update(f.read())
+
+    return h.hexdigest()
+
+
+def _file_digest(file_name):
+    with open(file_name, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _load_cached_api(cache_file):
+    try:
+        with open(cache_file, 'rb') as f:
+            digests = pickle.load(f)
+            for file_name, digest in digests.items():
+                if _file_digest(file_name) != digest:
+                    return None
+            return f.read()
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def _store_cached_api(cache_file, files, data):
+    digests = {}
+    for file_name in files:
+        digests[file_name] = _file_digest(file_name)
+
+    # Write to a temporary file and rename it, so that generators running in
+    # parallel never see a partial entry.
+    cache_dir = os.path.dirname(cache_file)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache_dir)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(digests, f, pickle.HIGHEST_PROTOCOL)
+            f.write(data)
+        os.replace(tmp, cache_file)
+    except OSError:
+        pass
+
+
+@contextlib.contextmanager
+def _cache_lock(cache_file):
+    """Lock a cache entry, so that generators running in parallel wait for
+    the one parsing the API instead of all parsing it."""
+    if fcntl is None:
+        yield
+        return
+
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        f = open(cache_file + '.lock', 'a')
+    except OSError:
+        yield
+        return
+
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def _unpickle_api(data):
+    # The type_expression objects need the built-in types, which are
+    # normally created by gl_api.__init__().
+    typeexpr.create_initial_types()
+
+    # Unpickling creates a lot of objects without any cycle to collect.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.loads(data)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
 
 def parse_GL_API( file_name, factory = None ):
+    """Parse an API XML file, using factory to create the objects.
+
+    If the MESA_GLAPI_CACHE_DIR environment variable is set, the processed
+    API is cached in that directory, so that the generators can share the
+    work of parsing the XML files."""
 
     if not factory:
         factory = gl_item_factory()
 
+    # Hashing the sources of the modules isn't free, so the key is only
+    # computed when there is a cache to look up.
+    cache_dir = os.environ.get('MESA_GLAPI_CACHE_DIR')
+    if not cache_dir:
+        return _parse_GL_API(file_name, factory)
+
+    key = _api_cache_key(file_name, factory)
+    if key in _parsed_apis:
+        return _unpickle_api(_parsed_apis[key])
+
+    cache_file = os.path.join(cache_dir, key)
+
+    data = _load_cached_api(cache_file)
+    if data is None:
+        with _cache_lock(cache_file):
+            data = _load_cached_api(cache_file)
+            if data is None:
+                api = _parse_GL_API(file_name, factory)
+                data = pickle.dumps(api, pickle.HIGHEST_PROTOCOL)
+                _parsed_apis[key] = data
+                _store_cached_api(cache_file, api.parsed_files, data)
+                return api
+
+    _parsed_apis[key] = data
+    return _unpickle_api(data)
+
+
+def _parse_GL_API( file_name, factory ):
     api = factory.create_api()
     api.parse_file( file_name )
 
@@ -865,10 +1005,14 @@ class gl_api(object):
 
         self.next_offset = 0
 
+        # XML files read, the cache entries depend on them.
+        self.parsed_files = []
+
         typeexpr.create_initial_types()
         return
 
     def parse_file(self, file_name):
+        self.parsed_files.append(file_name)
         doc = ET.parse( file_name )
         self.process_element(file_name, doc)
 
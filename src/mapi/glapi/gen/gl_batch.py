@@ -0,0 +1,167 @@
+
+# Copyright © 2026 Mesa contributors
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice (including the next
+# paragraph) shall be included in all copies or substantial portions of the
+# Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+# This script runs several of the glapi generators in one invocation.
+#
+# The manifest has one output per line: the path of the output file, the
+# generator script and its options, as they would be given on the command
+# line, e.g.:
+#
+#   glprocs.h        gl_procs.py -c -f gl_and_es_API.xml
+#   api_exec_init.c  api_exec_init.py -f gl_and_es_API.xml
+#   indirect.c       glX_proto_send.py -f gl_API.xml -m proto
+#
+# The generators run in a pool of worker processes sharing a cache of the
+# parsed API (see parse_GL_API()), so each XML file is only parsed once per
+# factory. Outputs are only written when their content changes, so that
+# their dependents aren't rebuilt needlessly.
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import runpy
+import shlex
+import sys
+import tempfile
+import time
+import traceback
+
+
+def read_manifest(f):
+    """Return the (output, script, options) entries of a manifest."""
+    entries = []
+    for line_number, line in enumerate(f, 1):
+        words = shlex.split(line, comments=True)
+        if not words:
+            continue
+        if len(words) < 2:
+            raise ValueError('line %d: expected an output and a generator' %
+                             line_number)
+        entries.append((words[0], words[1], words[2:]))
+
+    return entries
+
+
+def find_script(script):
+    if os.path.exists(script):
+        return script
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), script)
+
+
+def write_if_changed(file_name, content):
+    """Write content to file_name, unless it already holds it. Returns
+    whether the file was written."""
+    try:
+        with open(file_name, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+
+    with open(file_name, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
+
+
+def run_generator(entry):
+    """Run a generator as if from the command line, capturing its output.
+
+    Returns (output, seconds, written, error)."""
+    output, script, options = entry
+
+    start = time.perf_counter()
+    stdout = io.StringIO()
+    argv = sys.argv
+    sys.argv = [script] + options
+    try:
+        with contextlib.redirect_stdout(stdout):
+            runpy.run_path(find_script(script), run_name='__main__')
+    except SystemExit as e:
+        if e.code:
+            return output, time.perf_counter() - start, False, \
+                '%s exited with status %s' % (script, e.code)
+    except Exception:
+        return output, time.perf_counter() - start, False, \
+            traceback.format_exc()
+    finally:
+        sys.argv = argv
+
+    written = write_if_changed(output, stdout.getvalue())
+    return output, time.perf_counter() - start, written, None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('manifest',
+                        type=argparse.FileType('r'),
+                        help='the outputs to generate, "-" for stdin')
+    parser.add_argument('-j', '--jobs',
+                        type=int,
+                        default=os.cpu_count(),
+                        help='number of worker processes')
+    parser.add_argument('--cache-dir',
+                        default=os.environ.get('MESA_GLAPI_CACHE_DIR'),
+                        help='directory caching the parsed APIs, defaults '
+                             'to a temporary one')
+    parser.add_argument('--timing',
+                        action='store_true',
+                        help='report the time taken by each generator')
+    args = parser.parse_args()
+
+    entries = read_manifest(args.manifest)
+
+    with contextlib.ExitStack() as stack:
+        if not args.cache_dir:
+            args.cache_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        # The workers inherit the environment.
+        os.environ['MESA_GLAPI_CACHE_DIR'] = args.cache_dir
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(max(1, min(args.jobs, len(entries)))) as pool:
+            results = list(pool.imap_unordered(run_generator, entries))
+        elapsed = time.perf_counter() - start
+
+    failed = False
+    for output, seconds, written, error in results:
+        if error:
+            failed = True
+            print('%s: %s' % (output, error), file=sys.stderr)
+
+    if args.timing:
+        scripts = dict((output, script) for output, script, options in entries)
+        for output, seconds, written, error in sorted(results,
+                                                      key=lambda r: -r[1]):
+            status = 'failed' if error else \
+                     'written' if written else 'unchanged'
+            print('%7.3fs  %-24s %-32s %s' % (seconds, scripts[output],
+                                               output, status),
+                  file=sys.stderr)
+        print('%7.3fs  total for %d outputs' % (elapsed, len(entries)),
+              file=sys.stderr)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1584,7 +1584,6 @@ static const struct value_desc *
 find_value(const char *func, GLenum pname, void **p, union value *v)
 {
    GET_CURRENT_CONTEXT(ctx);
-   int mask, hash;
    const struct value_desc *d;
    int api;
 
@@ -1605,8 +1604,31 @@ find_value(const char *func, GLenum pname, void **p, union value *v)
       else if (ctx->Version >= 30)
          api = API_OPENGL_LAST + 1;
    }
-   mask = ARRAY_SIZE(table(api)) - 1;
-   hash = (pname * prime_factor);
+#ifdef GET_HASH_DISPLACEMENT_BITS
+   /* The tables are perfect hashes: the top bits of the hash select a
+    * displacement which is mixed into the hash to find the only slot where
+    * the enum can be. This must match perfect_slot() in
+    * get_hash_generator.py.
+    */
+   {
+      unsigned hash = pname * prime_factor;
+      int idx;
+
+      hash ^= displacement_table(api)[hash >> (32 - GET_HASH_DISPLACEMENT_BITS)];
+      hash *= prime_factor;
+      idx = table(api)[hash >> (32 - GET_HASH_TABLE_BITS)];
+
+      /* Index 0 is the invalid first entry of values[]. */
+      d = &values[idx];
+      if (unlikely(idx == 0 || d->pname != pname)) {
+         _mesa_error(ctx, GL_INVALID_ENUM, "%s(pname=%s)", func,
+               _mesa_enum_to_string(pname));
+         return &error_value;
+      }
+   }
+#else
+   int mask = ARRAY_SIZE(table(api)) - 1;
+   int hash = (pname * prime_factor);
    while (1) {
       int idx = table(api)[hash & mask];
 
@@ -1625,6 +1647,7 @@ find_value(const char *func, GLenum pname, void **p, union value *v)
 
       hash += prime_step;
    }
+#endif
 
    if (unlikely(d->extra && !check_extra(ctx, func, d)))
       return &error_value;
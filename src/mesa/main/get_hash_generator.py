@@ -42,12 +42,27 @@ prime_factor = 89
 prime_step = 281
 hash_table_size = 1024
 
+# With -p, the tables are perfect hashes using hash and displace: the top
+# displacement_bits of the hash select a displacement, which is mixed into
+# the hash to find the only slot the enum can be in. The hashes are
+# computed on 32 bits with a bigger multiplier.
+perfect_prime_factor = 0x9e3779b1
+displacement_bits = 8
+
 gl_apis=set(["GL", "GL_CORE", "GLES", "GLES2", "GLES3", "GLES31", "GLES32"])
 
-def print_header():
+def print_header(perfect):
    print("typedef const unsigned short table_t[%d];\n" % (hash_table_size))
-   print("static const int prime_factor = %d, prime_step = %d;\n" % \
-          (prime_factor, prime_step))
+   if perfect:
+      print("#define GET_HASH_TABLE_BITS %d" % (hash_table_size.bit_length() - 1))
+      print("#define GET_HASH_DISPLACEMENT_BITS %d" % displacement_bits)
+      print("typedef const unsigned short displacement_table_t[%d];\n" % \
+            (1 << displacement_bits))
+      print("static const unsigned prime_factor = 0x%x;\n" % \
+            perfect_prime_factor)
+   else:
+      print("static const int prime_factor = %d, prime_step = %d;\n" % \
+             (prime_factor, prime_step))
 
 def print_params(params):
    print("static const struct value_desc values[] = {")
@@ -92,26 +107,59 @@ def print_table(api, table):
 
    print("};\n")
 
-def print_tables(tables):
-   for table in tables:
-      print_table(table["apis"][0], table["indices"])
+def displacement_table_name(api):
+   return "displacement_" + api_name(api)
 
+def print_displacement_table(api, displacements):
+   print("static displacement_table_t %s = {" % (displacement_table_name(api)))
+
+   row_size = 8
+   for i in range(0, len(displacements), row_size):
+      row = displacements[i : i + row_size]
+      print(" " * 4 + ", ".join(["%5d" % d for d in row]) + ",")
+
+   print("};\n")
+
+def print_table_set(tables, type_name, name, set_name):
    dense_tables = ['NULL'] * len(api_enum)
    for table in tables:
-      tname = table_name(table["apis"][0])
+      tname = name(table["apis"][0])
       for api in table["apis"]:
          i = api_index(api)
          dense_tables[i] = "&%s" % (tname)
 
-   print("static table_t *table_set[] = {")
+   print("static %s *%s[] = {" % (type_name, set_name))
    for expr in dense_tables:
       print("   %s," % expr)
    print("};\n")
 
+def print_stats(tables):
+   print("/* Lookup probes (average and worst case, hits then misses):")
+   for table in tables:
+      print(" *   %s: %s" % (", ".join(table["apis"]), ", ".join(
+               "%s %.2f/%d %.2f/%d" % ((kind,) + tuple(stats))
+               for kind, stats in table["stats"])))
+   print(" */\n")
+
+def print_tables(tables):
+   print_stats(tables)
+
+   for table in tables:
+      print_table(table["apis"][0], table["indices"])
+      if "displacements" in table:
+         print_displacement_table(table["apis"][0], table["displacements"])
+
+   print_table_set(tables, "table_t", table_name, "table_set")
+   if "displacements" in tables[0]:
+      print_table_set(tables, "displacement_table_t", displacement_table_name,
+                      "displacement_set")
+
    print("#define table(api) (*table_set[api])")
+   if "displacements" in tables[0]:
+      print("#define displacement_table(api) (*displacement_set[api])")
 
 # Merge tables with matching parameter lists (i.e. GL and GL_CORE)
-def merge_tables(tables):
+def merge_tables(tables, extra = {}):
    merged_tables = []
    for api, indices in sorted(tables.items()):
       matching_table = list(filter(lambda mt:mt["indices"] == indices,
@@ -119,7 +167,10 @@ def merge_tables(tables):
       if matching_table:
          matching_table[0]["apis"].append(api)
       else:
-         merged_tables.append({"apis": [api], "indices": indices})
+         table = {"apis": [api], "indices": indices}
+         for key, values in extra.items():
+            table[key] = values[api]
+         merged_tables.append(table)
 
    return merged_tables
 
@@ -131,14 +182,81 @@ def add_to_hash_table(table, hash_val, value):
          break
       hash_val += prime_step
 
+def probe_stats(table, keys):
+   """Return the average and worst probe lengths of the lookups of the
+   enums of keys, and of misses, in an open addressing table."""
+   mask = hash_table_size - 1
+   hit_probes = []
+   for enum_val in set(enum_val for enum_val, value in keys):
+      hash_val = enum_val * prime_factor
+      probes = 1
+      while table[hash_val & mask][0] != enum_val:
+         hash_val += prime_step
+         probes += 1
+      hit_probes.append(probes)
+
+   # A miss walks from its first slot to the first empty one.
+   miss_probes = []
+   for start in range(hash_table_size):
+      index = start
+      probes = 1
+      while index in table:
+         index = (index + prime_step) & mask
+         probes += 1
+      miss_probes.append(probes)
+
+   return [("probing",
+            (sum(hit_probes) / len(hit_probes), max(hit_probes),
+             sum(miss_probes) / len(miss_probes), max(miss_probes)))]
+
+def perfect_slot(hash_val, displacement):
+   # This must match find_value() in get.c
+   hash_val = ((hash_val ^ displacement) * perfect_prime_factor) & 0xffffffff
+   return hash_val >> (32 - (hash_table_size.bit_length() - 1))
+
+def build_perfect_table(keys):
+   """Place the (enum, value) keys in a perfect hash table, returns the
+   table as a {slot: value} dict and the displacements."""
+   # Only the first value of an enum is found by lookups.
+   first = {}
+   for enum_val, value in keys:
+      first.setdefault(enum_val, value)
+
+   buckets = defaultdict(list)
+   for enum_val in first:
+      hash_val = (enum_val * perfect_prime_factor) & 0xffffffff
+      buckets[hash_val >> (32 - displacement_bits)].append((hash_val, enum_val))
+
+   table = {}
+   displacements = [0] * (1 << displacement_bits)
+   # Place the biggest buckets first, while there's the most room.
+   for bucket, hashes in sorted(buckets.items(), key=lambda b: -len(b[1])):
+      for displacement in range(1 << 16):
+         slots = set(perfect_slot(h, displacement) for h, enum_val in hashes)
+         if len(slots) == len(hashes) and not slots & set(table):
+            break
+      else:
+         die("couldn't find a perfect hash for %d enums" % len(first))
+
+      displacements[bucket] = displacement
+      for h, enum_val in hashes:
+         table[perfect_slot(h, displacement)] = first[enum_val]
+
+   return table, displacements
+
 def die(msg):
    sys.stderr.write("%s: %s\n" % (program, msg))
    exit(1)
 
 program = os.path.basename(sys.argv[0])
 
-def generate_hash_tables(enum_list, enabled_apis, param_descriptors):
+def generate_hash_tables(enum_list, enabled_apis, param_descriptors,
+                         perfect = False):
    tables = defaultdict(lambda:{})
+   # (enum, value) in insertion order, and the enum in each slot, of the
+   # open addressing tables.
+   keys = defaultdict(list)
+   slots = defaultdict(lambda:{})
 
    # the first entry should be invalid, so that get.c:find_value can use
    # its index for the 'enum not found' condition.
@@ -165,39 +283,56 @@ def generate_hash_tables(enum_list, enabled_apis, param_descriptors):
          enum_val = enum_list[enum_name].value
          hash_val = enum_val * prime_factor
 
-         for api in valid_apis:
+         def add(api):
             add_to_hash_table(tables[api], hash_val, len(params))
+            add_to_hash_table(slots[api], hash_val, (enum_val, len(params)))
+            keys[api].append((enum_val, len(params)))
+
+         for api in valid_apis:
+            add(api)
             # Also add GLES2 items to the GLES3+ hash tables
             if api == "GLES2":
-               add_to_hash_table(tables["GLES3"], hash_val, len(params))
-               add_to_hash_table(tables["GLES31"], hash_val, len(params))
-               add_to_hash_table(tables["GLES32"], hash_val, len(params))
+               add("GLES3")
+               add("GLES31")
+               add("GLES32")
             # Also add GLES3 items to the GLES31+ hash tables
             if api == "GLES3":
-               add_to_hash_table(tables["GLES31"], hash_val, len(params))
-               add_to_hash_table(tables["GLES32"], hash_val, len(params))
+               add("GLES31")
+               add("GLES32")
             # Also add GLES31 items to the GLES32+ hash tables
             if api == "GLES31":
-               add_to_hash_table(tables["GLES32"], hash_val, len(params))
+               add("GLES32")
          params.append(["GL_" + enum_name, param[1]])
 
+   stats = {}
+   for api in tables:
+      stats[api] = probe_stats(slots[api], keys[api])
+
+   extra = {"stats": stats}
+   if perfect:
+      extra["displacements"] = {}
+      for api in list(tables):
+         tables[api], extra["displacements"][api] = build_perfect_table(keys[api])
+         stats[api] = stats[api] + [("perfect", (1, 1, 1, 1))]
+
    sorted_tables={}
    for api, indices in tables.items():
       sorted_tables[api] = sorted(indices.items())
 
-   return params, merge_tables(sorted_tables)
+   return params, merge_tables(sorted_tables, extra)
 
 
 def show_usage():
    sys.stderr.write(
 """Usage: %s [OPTIONS]
   -f <file>          specify GL API XML file
+  -p                 generate perfect hash tables
 """ % (program))
    exit(1)
 
 if __name__ == '__main__':
    try:
-      (opts, args) = getopt.getopt(sys.argv[1:], "f:")
+      (opts, args) = getopt.getopt(sys.argv[1:], "f:p")
    except Exception:
       show_usage()
 
@@ -205,10 +340,13 @@ if __name__ == '__main__':
       show_usage()
 
    api_desc_file = ""
+   perfect = False
 
    for opt_name, opt_val in opts:
       if opt_name == "-f":
          api_desc_file = opt_val
+      if opt_name == "-p":
+         perfect = True
 
    if not api_desc_file:
       die("missing descriptor file (-f)\n")
@@ -223,8 +361,9 @@ if __name__ == '__main__':
       die("couldn't parse API specification file %s\n" % api_desc_file)
 
    (params, hash_tables) = generate_hash_tables(api_desc.enums_by_name,
-                              enabled_apis, get_hash_params.descriptor)
+                              enabled_apis, get_hash_params.descriptor,
+                              perfect)
 
-   print_header()
+   print_header(perfect)
    print_params(params)
    print_tables(hash_tables)
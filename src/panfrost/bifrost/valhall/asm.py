@@ -22,12 +22,54 @@
 # IN THE SOFTWARE.
 
 import argparse
+import array
 import sys
-import struct
-from valhall import instructions, enums, immediates, typesize
+from valhall import instructions, instruction_dict, enums, immediates, typesize
 
 LINE = ''
 
+# Index of each value of the enums, as looked up for the modifiers. Reserved
+# values appear several times, keep the first one like list.index() does.
+enum_indices = {}
+for name, enum in enums.items():
+    indices = {}
+    for i, value in enumerate(enum.bare_values):
+        indices.setdefault(value, i)
+    enum_indices[name] = indices
+
+# Properties of an instruction needed to assemble it, computed once rather
+# than for each line
+class InstructionInfo:
+    def __init__(self, ins):
+        modifier_names = set(x.name for x in ins.modifiers)
+        self.has_sr_write_count = "staging_register_write_count" in modifier_names
+        self.has_sr_count = "staging_register_count" in modifier_names
+        self.op_count = len(ins.srcs) + len(ins.dests) + len(ins.immediates) + len(ins.staging)
+
+        # Modifiers taking each value, with the index of the value
+        self.modifier_values = {}
+        for mod in ins.modifiers:
+            indices = {}
+            for i, value in enumerate(mod.bare_values):
+                indices.setdefault(value, i)
+            for value, i in indices.items():
+                self.modifier_values.setdefault(value, []).append((mod, i))
+
+instruction_info = { ins.name: InstructionInfo(ins) for ins in instructions }
+
+# Lengths of the instruction names, longest first, so the longest name
+# prefixing a mnemonic is found with a lookup per length
+mnemonic_lengths = sorted(set(len(ins.name) for ins in instructions), reverse=True)
+
+def find_instruction(head):
+    for length in mnemonic_lengths:
+        if length <= len(head):
+            ins = instruction_dict.get(head[:length])
+            if ins is not None:
+                return ins
+
+    return None
+
 class ParseError(Exception):
     def __init__(self, error):
         self.error = error
@@ -112,8 +154,8 @@ def encode_source(op, fau):
         return immediates.index(val) | 0xC0
     else:
         for i in [0, 1, 3]:
-            if op in enums[f'fau_special_page_{i}'].bare_values:
-                idx = 32 + (enums[f'fau_special_page_{i}'].bare_values.index(op) << 1)
+            if op in enum_indices[f'fau_special_page_{i}']:
+                idx = 32 + (enum_indices[f'fau_special_page_{i}'][op] << 1)
                 fau.set_page(i)
                 return idx | 0xC0
 
@@ -143,22 +185,15 @@ def parse_asm(line):
     LINE = line # For better errors
     encoded = 0
 
-    # Figure out mnemonic
+    # Figure out mnemonic. Instruction names are unique, so the longest one
+    # prefixing the mnemonic can't be ambiguous.
     head = line.split(" ")[0]
-    opts = [ins for ins in instructions if head.startswith(ins.name)]
-    opts = sorted(opts, key=lambda x: len(x.name), reverse=True)
+    ins = find_instruction(head)
 
-    if len(opts) == 0:
+    if ins is None:
         die(f"No known mnemonic for {head}")
 
-    if len(opts) > 1 and len(opts[0].name) == len(opts[1].name):
-        print(f"Ambiguous mnemonic for {head}")
-        print(f"Options:")
-        for ins in opts:
-            print(f"  {ins}")
-        sys.exit(1)
-
-    ins = opts[0]
+    info = instruction_info[ins.name]
 
     # Split off modifiers
     if len(head) > len(ins.name) and head[len(ins.name)] != '.':
@@ -169,7 +204,7 @@ def parse_asm(line):
 
     tail = line[(len(head) + 1):]
     operands = [x.strip() for x in tail.split(",") if len(x.strip()) > 0]
-    expected_op_count = len(ins.srcs) + len(ins.dests) + len(ins.immediates) + len(ins.staging)
+    expected_op_count = info.op_count
     if len(operands) != expected_op_count:
         die(f"Wrong number of operands in {line}, expected {expected_op_count}, got {len(operands)} {operands}")
 
@@ -184,7 +219,7 @@ def parse_asm(line):
         die_if(any([x[0] != 'r' for x in parts]), f'Expected registers, got {op}')
         regs = [parse_int(x[1:], 0, 63) for x in parts]
 
-        extended_write = "staging_register_write_count" in [x.name for x in ins.modifiers] and sr.write
+        extended_write = info.has_sr_write_count and sr.write
         max_sr_count = 8 if extended_write else 7
 
         sr_count = len(regs)
@@ -197,10 +232,10 @@ def parse_asm(line):
                 'Consecutive staging registers must be aligned to a register pair')
 
         if sr.count == 0:
-            if "staging_register_write_count" in [x.name for x in ins.modifiers] and sr.write:
+            if info.has_sr_write_count and sr.write:
                 modifier_map["staging_register_write_count"] = sr_count - 1
             else:
-                assert "staging_register_count" in [x.name for x in ins.modifiers]
+                assert info.has_sr_count
                 modifier_map["staging_register_count"] = sr_count
         else:
             die_if(sr_count != sr.count, f"Expected {sr.count} staging registers, got {sr_count}")
@@ -232,49 +267,49 @@ def parse_asm(line):
             # Encode the modifier
             if mod in src.offset and src.bits[mod] == 1:
                 encoded |= (1 << src.offset[mod])
-            elif src.halfswizzle and mod in enums[f'half_swizzles_{src.size}_bit'].bare_values:
+            elif src.halfswizzle and mod in enum_indices[f'half_swizzles_{src.size}_bit']:
                 die_if(swizzled, "Multiple swizzles specified")
                 swizzled = True
-                val = enums[f'half_swizzles_{src.size}_bit'].bare_values.index(mod)
+                val = enum_indices[f'half_swizzles_{src.size}_bit'][mod]
                 encoded |= (val << src.offset['widen'])
-            elif mod in enums[f'swizzles_{src.size}_bit'].bare_values and (src.widen or src.lanes):
+            elif mod in enum_indices[f'swizzles_{src.size}_bit'] and (src.widen or src.lanes):
                 die_if(swizzled, "Multiple swizzles specified")
                 swizzled = True
-                val = enums[f'swizzles_{src.size}_bit'].bare_values.index(mod)
+                val = enum_indices[f'swizzles_{src.size}_bit'][mod]
                 encoded |= (val << src.offset['widen'])
-            elif src.lane and mod in enums[f'lane_{src.size}_bit'].bare_values:
+            elif src.lane and mod in enum_indices[f'lane_{src.size}_bit']:
                 die_if(swizzled, "Multiple swizzles specified")
                 swizzled = True
-                val = enums[f'lane_{src.size}_bit'].bare_values.index(mod)
+                val = enum_indices[f'lane_{src.size}_bit'][mod]
                 encoded |= (val << src.offset['lane'])
-            elif src.combine and mod in enums['combine'].bare_values:
+            elif src.combine and mod in enum_indices['combine']:
                 die_if(swizzled, "Multiple swizzles specified")
                 swizzled = True
-                val = enums['combine'].bare_values.index(mod)
+                val = enum_indices['combine'][mod]
                 encoded |= (val << src.offset['combine'])
-            elif src.size == 32 and mod in enums['widen'].bare_values:
+            elif src.size == 32 and mod in enum_indices['widen']:
                 die_if(not src.swizzle, "Instruction doesn't take widens")
                 die_if(swizzled, "Multiple swizzles specified")
                 swizzled = True
-                val = enums['widen'].bare_values.index(mod)
+                val = enum_indices['widen'][mod]
                 encoded |= (val << src.offset['swizzle'])
-            elif src.size == 16 and mod in enums['swizzles_16_bit'].bare_values:
+            elif src.size == 16 and mod in enum_indices['swizzles_16_bit']:
                 die_if(not src.swizzle, "Instruction doesn't take swizzles")
                 die_if(swizzled, "Multiple swizzles specified")
                 swizzled = True
-                val = enums['swizzles_16_bit'].bare_values.index(mod)
+                val = enum_indices['swizzles_16_bit'][mod]
                 encoded |= (val << src.offset['swizzle'])
-            elif mod in enums['lane_8_bit'].bare_values:
+            elif mod in enum_indices['lane_8_bit']:
                 die_if(not src.lane, "Instruction doesn't take a lane")
                 die_if(swizzled, "Multiple swizzles specified")
                 swizzled = True
-                val = enums['lane_8_bit'].bare_values.index(mod)
+                val = enum_indices['lane_8_bit'][mod]
                 encoded |= (val << src.lane)
-            elif mod in enums['lanes_8_bit'].bare_values:
+            elif mod in enum_indices['lanes_8_bit']:
                 die_if(not src.lanes, "Instruction doesn't take a lane")
                 die_if(swizzled, "Multiple swizzles specified")
                 swizzled = True
-                val = enums['lanes_8_bit'].bare_values.index(mod)
+                val = enum_indices['lanes_8_bit'][mod]
                 encoded |= (val << src.offset['widen'])
             elif mod in ['w0', 'w1']:
                 # Chck for special
@@ -290,12 +325,12 @@ def parse_asm(line):
         # Encode the identity if a swizzle is required but not specified
         if src.swizzle and not swizzled and src.size == 16:
             mod = enums['swizzles_16_bit'].default
-            val = enums['swizzles_16_bit'].bare_values.index(mod)
+            val = enum_indices['swizzles_16_bit'][mod]
             encoded |= (val << src.offset['swizzle'])
         elif src.widen and not swizzled and src.size == 16:
             die_if(swizzled, "Multiple swizzles specified")
             mod = enums['swizzles_16_bit'].default
-            val = enums['swizzles_16_bit'].bare_values.index(mod)
+            val = enum_indices['swizzles_16_bit'][mod]
             encoded |= (val << src.offset['widen'])
 
         encoded |= encoded_src << src.start
@@ -343,19 +378,16 @@ def parse_asm(line):
         if len(mod) == 0:
             continue
 
-        if mod in enums['flow'].bare_values:
+        if mod in enum_indices['flow']:
             die_if(has_flow, "Multiple flow control modifiers specified")
             has_flow = True
-            encoded |= (enums['flow'].bare_values.index(mod) << 59)
+            encoded |= (enum_indices['flow'][mod] << 59)
         else:
-            candidates = [c for c in ins.modifiers if mod in c.bare_values]
+            candidates = info.modifier_values.get(mod, [])
 
             die_if(len(candidates) == 0, f"Invalid modifier {mod} used")
             assert(len(candidates) == 1) # No ambiguous modifiers
-            opts = candidates[0]
-
-            value = opts.bare_values.index(mod)
-            assert(value is not None)
+            opts, value = candidates[0]
 
             die_if(opts.name in modifier_map, f"{opts.name} specified twice")
             modifier_map[opts.name] = value
@@ -369,6 +401,17 @@ def parse_asm(line):
 
     return encoded
 
+def assemble_many(lines):
+    """Assemble the lines of a shader, skipping empty lines and comments, and
+    return the instructions as an array of 64-bit words."""
+    words = array.array('Q')
+    for line in lines:
+        line = line.rstrip('\n')
+        if len(line) > 0 and line[0] != '#':
+            words.append(parse_asm(line))
+
+    return words
+
 if __name__ == "__main__":
     # Provide commandline interface
     parser = argparse.ArgumentParser(description='Assemble Valhall shaders')
@@ -377,8 +420,10 @@ if __name__ == "__main__":
     parser.add_argument('outfile', type=argparse.FileType('wb'))
     args = parser.parse_args()
 
-    lines = args.infile.read().strip().split('\n')
-    lines = [l for l in lines if len(l) > 0 and l[0] != '#']
+    words = assemble_many(args.infile.read().strip().split('\n'))
+
+    # The binary is little-endian
+    if sys.byteorder == 'big':
+        words.byteswap()
 
-    packed = b''.join([struct.pack('<Q', parse_asm(ln)) for ln in lines])
-    args.outfile.write(packed)
+    args.outfile.write(words.tobytes())
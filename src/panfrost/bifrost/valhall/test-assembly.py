@@ -21,7 +21,7 @@
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
 
-from asm import parse_asm, ParseError
+from asm import parse_asm, assemble_many, ParseError
 import sys
 import struct
 
@@ -69,10 +69,16 @@ with open(sys.argv[1], "r") as f:
     cases = f.read().split('\n')
     cases = [x for x in cases if len(x) > 0 and x[0] != '#']
 
-    for case in cases:
-        (machine, assembly) = case.split('    ')
+    positive = [case.split('    ') for case in cases]
+    for case, (machine, assembly) in zip(cases, positive):
         record_case(case, positive_test(machine, assembly))
 
+# Assembling in bulk must match line by line
+if len(FAIL) == 0:
+    words = assemble_many([assembly for (machine, assembly) in positive])
+    expected = [parse_hex_8(machine) for (machine, assembly) in positive]
+    record_case("assemble_many", None if list(words) == expected else "Incorrect bulk assembly")
+
 with open(sys.argv[2], "r") as f:
     cases = f.read().split('\n')
     cases = [x for x in cases if len(x) > 0]
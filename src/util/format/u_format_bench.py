@@ -0,0 +1,350 @@
+CopyRight = '''
+/*
+ * Copyright © 2026 Mesa contributors
+ * SPDX-License-Identifier: MIT
+ */
+'''
+
+# Generates a benchmark of the pack and unpack functions of every format
+# which has them, through the same util_format_*_description entry points as
+# the rest of Mesa. The benchmark prints one CSV line per format and
+# function; u_format_bench_compare.py compares the results of two builds.
+
+
+import sys
+
+from u_format_parse import *
+from u_format_table import has_access
+
+
+# Hand written functions which are only stubs, asserting or doing nothing
+unimplemented_ops = {
+    'etc1_rgb8': ['PACK_RGBA_8UNORM', 'PACK_RGBA_FLOAT'],
+    'latc1_snorm': ['UNPACK_RGBA_8UNORM', 'PACK_RGBA_8UNORM'],
+    'latc2_snorm': ['UNPACK_RGBA_8UNORM', 'PACK_RGBA_8UNORM'],
+    'rgtc1_snorm': ['UNPACK_RGBA_8UNORM', 'PACK_RGBA_8UNORM'],
+    'rgtc2_snorm': ['UNPACK_RGBA_8UNORM', 'PACK_RGBA_8UNORM'],
+}
+
+
+def format_ops(format):
+    '''The pack/unpack functions of the format, as set up by
+    write_format_table().'''
+    if format.name == 'PIPE_FORMAT_NONE' or format.colorspace == ZS:
+        return []
+    if format.is_pure_unsigned():
+        ops = ['UNPACK_RGBA_UINT', 'PACK_RGBA_UINT']
+    elif format.is_pure_signed():
+        ops = ['UNPACK_RGBA_SINT', 'PACK_RGBA_SINT']
+    else:
+        ops = ['UNPACK_RGBA_8UNORM', 'UNPACK_RGBA_FLOAT',
+               'PACK_RGBA_8UNORM', 'PACK_RGBA_FLOAT']
+    unimplemented = unimplemented_ops.get(format.short_name(), [])
+    return [op for op in ops if op not in unimplemented]
+
+
+def write_bench(formats):
+    print('/* This file is autogenerated by u_format_bench.py from u_format.csv. Do not edit directly. */')
+    print()
+    # This will print the copyright message on the top of this file
+    print(CopyRight.strip())
+    print()
+    print('''\
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+#include "util/format/u_format.h"
+#include "util/os_time.h"
+#include "util/macros.h"
+#include "util/u_math.h"
+
+enum bench_op {
+   UNPACK_RGBA_8UNORM,
+   UNPACK_RGBA_FLOAT,
+   UNPACK_RGBA_UINT,
+   UNPACK_RGBA_SINT,
+   PACK_RGBA_8UNORM,
+   PACK_RGBA_FLOAT,
+   PACK_RGBA_UINT,
+   PACK_RGBA_SINT,
+};
+
+static const char *const bench_op_names[] = {
+   [UNPACK_RGBA_8UNORM] = "unpack_rgba_8unorm",
+   [UNPACK_RGBA_FLOAT] = "unpack_rgba_float",
+   [UNPACK_RGBA_UINT] = "unpack_rgba_uint",
+   [UNPACK_RGBA_SINT] = "unpack_rgba_sint",
+   [PACK_RGBA_8UNORM] = "pack_rgba_8unorm",
+   [PACK_RGBA_FLOAT] = "pack_rgba_float",
+   [PACK_RGBA_UINT] = "pack_rgba_uint",
+   [PACK_RGBA_SINT] = "pack_rgba_sint",
+};
+
+struct bench_case {
+   enum pipe_format format;
+   const char *name;
+   enum bench_op op;
+   unsigned block_width;
+   unsigned block_height;
+   unsigned block_bytes;
+   /* Pack function used to fill the packed pixels, if any */
+   enum bench_op fill_op;
+   bool fill_random;
+};
+''')
+
+    print('static const struct bench_case bench_cases[] = {')
+    for format in formats:
+        if not has_access(format):
+            continue
+        ops = format_ops(format)
+        fill_ops = [op for op in ops if op in ('PACK_RGBA_FLOAT', 'PACK_RGBA_UINT', 'PACK_RGBA_SINT')]
+        for op in ops:
+            print('   { %s, "%s", %s, %u, %u, %u, %s, %s },' % (
+                format.name, format.short_name(), op,
+                format.block_width, format.block_height,
+                format.block_size() // 8,
+                fill_ops[0] if fill_ops else op,
+                'false' if fill_ops else 'true'))
+    print('};')
+    print()
+
+    print('''\
+static uint32_t
+bench_random(uint32_t *state)
+{
+   /* xorshift32 */
+   uint32_t x = *state;
+   x ^= x << 13;
+   x ^= x >> 17;
+   x ^= x << 5;
+   return *state = x;
+}
+
+struct bench_buffers {
+   /* RGBA pixels, the unpacked buffer has 16 bytes per pixel so that it can
+    * hold any of the unpacked types.
+    */
+   float *rgba_float;
+   uint8_t *rgba_8unorm;
+   uint32_t *rgba_uint;
+   int32_t *rgba_sint;
+   void *unpacked;
+   uint8_t *packed;
+};
+
+static void
+bench_run(const struct bench_case *c, struct bench_buffers *b,
+          unsigned w, unsigned h, unsigned packed_stride)
+{
+   const struct util_format_pack_description *pack =
+      util_format_pack_description(c->format);
+
+   switch (c->op) {
+   case UNPACK_RGBA_8UNORM:
+      util_format_unpack_rgba_8unorm_rect(c->format, b->unpacked, w * 4,
+                                          b->packed, packed_stride, w, h);
+      break;
+   case UNPACK_RGBA_FLOAT:
+   case UNPACK_RGBA_UINT:
+   case UNPACK_RGBA_SINT:
+      util_format_unpack_rgba_rect(c->format, b->unpacked, w * 16,
+                                   b->packed, packed_stride, w, h);
+      break;
+   case PACK_RGBA_8UNORM:
+      pack->pack_rgba_8unorm(b->packed, packed_stride,
+                             b->rgba_8unorm, w * 4, w, h);
+      break;
+   case PACK_RGBA_FLOAT:
+      pack->pack_rgba_float(b->packed, packed_stride,
+                            b->rgba_float, w * 16, w, h);
+      break;
+   case PACK_RGBA_UINT:
+      pack->pack_rgba_uint(b->packed, packed_stride,
+                           b->rgba_uint, w * 16, w, h);
+      break;
+   case PACK_RGBA_SINT:
+      pack->pack_rgba_sint(b->packed, packed_stride,
+                           b->rgba_sint, w * 16, w, h);
+      break;
+   }
+}
+
+static bool
+bench_supported(const struct bench_case *c)
+{
+   const struct util_format_pack_description *pack =
+      util_format_pack_description(c->format);
+   const struct util_format_unpack_description *unpack =
+      util_format_unpack_description(c->format);
+
+   switch (c->op) {
+   case UNPACK_RGBA_8UNORM:
+      return unpack->unpack_rgba_8unorm || unpack->unpack_rgba_8unorm_rect;
+   case UNPACK_RGBA_FLOAT:
+   case UNPACK_RGBA_UINT:
+   case UNPACK_RGBA_SINT:
+      return unpack->unpack_rgba || unpack->unpack_rgba_rect;
+   case PACK_RGBA_8UNORM:
+      return pack->pack_rgba_8unorm != NULL;
+   case PACK_RGBA_FLOAT:
+      return pack->pack_rgba_float != NULL;
+   case PACK_RGBA_UINT:
+      return pack->pack_rgba_uint != NULL;
+   case PACK_RGBA_SINT:
+      return pack->pack_rgba_sint != NULL;
+   }
+   return false;
+}
+
+/* Fill the packed buffer with valid pixels, so that the unpack functions
+ * don't just see NaNs or denormals.
+ */
+static void
+bench_fill_packed(const struct bench_case *c, struct bench_buffers *b,
+                  unsigned w, unsigned h,
+                  unsigned packed_stride, size_t packed_size)
+{
+   if (c->fill_random) {
+      uint32_t state = 0x12345678;
+      for (size_t i = 0; i < packed_size; i++)
+         b->packed[i] = bench_random(&state);
+   } else {
+      struct bench_case fill = *c;
+      fill.op = c->fill_op;
+      bench_run(&fill, b, w, h, packed_stride);
+   }
+}
+
+static bool
+bench_match(const char *name, int argc, char **argv, int first)
+{
+   if (first >= argc)
+      return true;
+   for (int i = first; i < argc; i++) {
+      if (strstr(name, argv[i]))
+         return true;
+   }
+   return false;
+}
+
+static void
+usage(const char *prog)
+{
+   fprintf(stderr, "usage: %s [-t SECONDS] [-s WIDTHxHEIGHT] [FORMAT...]\\n"
+                   "\\n"
+                   "Measures the throughput of the pack/unpack functions of the formats\\n"
+                   "whose short name contains one of the FORMAT arguments, or of all of\\n"
+                   "them, and prints the results as CSV.\\n", prog);
+   exit(1);
+}
+
+int
+main(int argc, char **argv)
+{
+   double min_time = 0.1;
+   unsigned width = 1024, height = 1024;
+   struct bench_buffers b;
+   int first = 1;
+
+   while (first < argc && argv[first][0] == '-') {
+      if (!strcmp(argv[first], "-t") && first + 1 < argc) {
+         min_time = atof(argv[first + 1]);
+         first += 2;
+      } else if (!strcmp(argv[first], "-s") && first + 1 < argc) {
+         if (sscanf(argv[first + 1], "%ux%u", &width, &height) != 2 ||
+             !width || !height)
+            usage(argv[0]);
+         first += 2;
+      } else {
+         usage(argv[0]);
+      }
+   }
+
+   /* Leave room to round the image up to whole blocks */
+   size_t max_pixels = (size_t)(width + 15) * (height + 15);
+   uint32_t state = 0xdeadbeef;
+   b.rgba_float = malloc(max_pixels * 16);
+   b.rgba_8unorm = malloc(max_pixels * 4);
+   b.rgba_uint = malloc(max_pixels * 16);
+   b.rgba_sint = malloc(max_pixels * 16);
+   b.unpacked = malloc(max_pixels * 16);
+   /* Worst case of 32 bytes per pixel, for R64G64B64A64_FLOAT */
+   b.packed = malloc(max_pixels * 32);
+   if (!b.rgba_float || !b.rgba_8unorm || !b.rgba_uint || !b.rgba_sint ||
+       !b.unpacked || !b.packed) {
+      fprintf(stderr, "out of memory\\n");
+      return 1;
+   }
+
+   for (size_t i = 0; i < max_pixels * 4; i++) {
+      uint32_t r = bench_random(&state);
+      b.rgba_float[i] = (r >> 8) * (1.0f / 16777215.0f);
+      b.rgba_8unorm[i] = r;
+      b.rgba_uint[i] = r & 0xff;
+      b.rgba_sint[i] = (int8_t)r;
+   }
+
+   printf("format,operation,width,height,iterations,best_seconds,mpixels_per_s,mbytes_per_s\\n");
+
+   for (unsigned i = 0; i < ARRAY_SIZE(bench_cases); i++) {
+      const struct bench_case *c = &bench_cases[i];
+
+      if (!bench_match(c->name, argc, argv, first) || !bench_supported(c))
+         continue;
+
+      unsigned w = DIV_ROUND_UP(width, c->block_width) * c->block_width;
+      unsigned h = DIV_ROUND_UP(height, c->block_height) * c->block_height;
+      unsigned packed_stride = w / c->block_width * c->block_bytes;
+      size_t packed_size = (size_t)packed_stride * (h / c->block_height);
+
+      bench_fill_packed(c, &b, w, h, packed_stride, packed_size);
+
+      /* Warm up the caches and the branch predictors */
+      bench_run(c, &b, w, h, packed_stride);
+
+      /* Report the fastest iteration, the others are slowed down by
+       * whatever else runs on the machine.
+       */
+      unsigned iterations = 0;
+      int64_t start = os_time_get_nano();
+      int64_t best = INT64_MAX;
+      int64_t now = start;
+      do {
+         int64_t iteration_start = now;
+         bench_run(c, &b, w, h, packed_stride);
+         iterations++;
+         now = os_time_get_nano();
+         best = MIN2(best, now - iteration_start);
+      } while (now - start < min_time * 1e9);
+
+      double seconds = MAX2(best, 1) * 1e-9;
+      printf("%s,%s,%u,%u,%u,%.9f,%.2f,%.2f\\n",
+             c->name, bench_op_names[c->op], w, h, iterations, seconds,
+             (double)w * h / seconds * 1e-6,
+             (double)packed_size / seconds * 1e-6);
+      fflush(stdout);
+   }
+
+   free(b.rgba_float);
+   free(b.rgba_8unorm);
+   free(b.rgba_uint);
+   free(b.rgba_sint);
+   free(b.unpacked);
+   free(b.packed);
+
+   return 0;
+}''')
+
+
+def main():
+    formats = []
+    for arg in sys.argv[1:]:
+        formats.extend(parse(arg))
+
+    write_bench(formats)
+
+
+if __name__ == '__main__':
+    main()
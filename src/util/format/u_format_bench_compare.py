@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# Copyright © 2026 Mesa contributors
+# SPDX-License-Identifier: MIT
+
+# Compares the CSV output of u_format_bench from two builds, e.g.:
+#
+#   ./u_format_bench > before.csv
+#   ... rebuild ...
+#   ./u_format_bench > after.csv
+#   u_format_bench_compare.py -b before.csv -c after.csv
+#
+# Each side may be given several runs, in which case the best throughput of
+# each function is kept, which filters out most of the noise. The exit
+# status is 1 if any function got slower than the threshold.
+#
+# With --normalize the changes are taken relative to the overall one, so that
+# a machine that happens to run faster or slower overall (frequency scaling,
+# other load) only shows the functions which changed compared to the rest.
+
+
+import argparse
+import csv
+import math
+import sys
+
+
+def read_results(filenames):
+    '''Return the best throughput of each (format, operation) over the
+    runs.'''
+    results = {}
+    for filename in filenames:
+        with open(filename, newline='') as f:
+            for row in csv.DictReader(f):
+                key = (row['format'], row['operation'])
+                value = float(row['mpixels_per_s'])
+                results[key] = max(results.get(key, 0.0), value)
+    return results
+
+
+def geometric_mean(values):
+    if not values:
+        return 1.0
+    return math.exp(sum(math.log(v) for v in values) / len(values))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-b', '--baseline', action='append', required=True,
+                        help='CSV output of the baseline build, may be repeated')
+    parser.add_argument('-c', '--current', action='append', required=True,
+                        help='CSV output of the build to check, may be repeated')
+    parser.add_argument('-t', '--threshold', type=float, default=0.10,
+                        help='relative slow down flagged as a regression (default 0.10)')
+    parser.add_argument('-n', '--normalize', action='store_true',
+                        help='compare each function relative to the overall change, '
+                             'to discount machines running at different speeds')
+    parser.add_argument('-a', '--all', action='store_true',
+                        help='list the improvements and unchanged functions too')
+    args = parser.parse_args()
+
+    baseline = read_results(args.baseline)
+    current = read_results(args.current)
+
+    ratios = {}
+    for key in baseline.keys() & current.keys():
+        if baseline[key] > 0.0 and current[key] > 0.0:
+            ratios[key] = current[key] / baseline[key]
+
+    overall = geometric_mean(list(ratios.values()))
+    if args.normalize:
+        for key in ratios:
+            ratios[key] /= overall
+
+    regressions = [key for key, ratio in ratios.items()
+                   if ratio < 1.0 - args.threshold]
+    improvements = [key for key, ratio in ratios.items()
+                    if ratio > 1.0 + args.threshold]
+
+    def print_rows(title, keys):
+        if not keys:
+            return
+        print(title)
+        print('   %-32s %-20s %12s %12s %8s' % ('format', 'operation', 'baseline', 'current', 'change'))
+        for key in sorted(keys, key=lambda key: ratios[key]):
+            print('   %-32s %-20s %12.2f %12.2f %+7.1f%%' % (
+                key[0], key[1], baseline[key], current[key],
+                (ratios[key] - 1.0) * 100.0))
+        print()
+
+    print_rows('Regressions (Mpixels/s):', regressions)
+    if args.all:
+        print_rows('Improvements (Mpixels/s):', improvements)
+        print_rows('Unchanged (Mpixels/s):',
+                   [key for key in ratios if key not in regressions and key not in improvements])
+
+    missing = sorted(baseline.keys() - current.keys())
+    if missing:
+        print('Missing from the current results:')
+        for format, operation in missing:
+            print('   %s %s' % (format, operation))
+        print()
+
+    operations = sorted(set(operation for format, operation in ratios))
+    if args.normalize:
+        print('Geometric mean of the changes, relative to the overall one:')
+    else:
+        print('Geometric mean of the changes:')
+    for operation in operations:
+        values = [ratio for key, ratio in ratios.items() if key[1] == operation]
+        print('   %-20s %+7.1f%%  (%u formats)' % (operation, (geometric_mean(values) - 1.0) * 100.0, len(values)))
+    print('   %-20s %+7.1f%%  (%u functions)' % ('all', (overall - 1.0) * 100.0, len(ratios)))
+    print()
+    print('%u regressions, %u improvements beyond %.0f%%' % (
+        len(regressions), len(improvements), args.threshold * 100.0))
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1003 @@
+#!/usr/bin/env python3
+# Copyright © 2026 Mesa contributors
+# SPDX-License-Identifier: MIT
+
+'''
+Reference implementation of the pack/unpack functions generated by
+u_format_pack.py, on whole arrays of pixels with NumPy.
+
+The formats are described by the same u_format.csv table, and every
+conversion follows the C expression emitted by conversion_expr() for the
+same source and destination channels, including its rounding and clamping,
+so the results match the generated code bit for bit. This makes it handy to
+produce or check reference data for large images, e.g.:
+
+   python3 u_format_numpy.py verify
+   python3 u_format_numpy.py compare --kernels build/src/util/tests/format/u_format_kernels
+   python3 u_format_numpy.py translate R8G8B8A8_SRGB R16G16B16A16_FLOAT in.raw out.raw
+   python3 u_format_numpy.py bench --pixels 4194304 R8G8B8A8_UNORM B5G6R5_UNORM
+
+Only plain formats with 1x1 blocks are handled; the hand written ZS and
+compressed formats are not.
+'''
+
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from u_format_parse import *
+from u_format_pack import get_one, inv_swizzles, is_format_supported, \
+                          value_to_native
+from u_format_table import has_access
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from format_srgb import linear_to_srgb, srgb_to_linear
+
+
+FLOAT_CHANNEL = Channel(FLOAT, False, False, 32)
+UNORM8_CHANNEL = Channel(UNSIGNED, True, False, 8)
+UNSIGNED_CHANNEL = Channel(UNSIGNED, False, True, 32)
+SIGNED_CHANNEL = Channel(SIGNED, False, True, 32)
+
+
+def native_dtype(channel):
+    '''NumPy type of the C variable holding a channel (see
+    generate_format_type()); halfs are kept as their uint16 bits.'''
+    if channel.type == FLOAT:
+        return {16: np.uint16, 32: np.float32, 64: np.float64}[channel.size]
+    bits = 8
+    while bits < channel.size:
+        bits *= 2
+    if channel.type in (SIGNED, FIXED):
+        return np.dtype('int%u' % bits).type
+    return np.dtype('uint%u' % bits).type
+
+
+def is_format_handled(format):
+    return is_format_supported(format) and \
+           format.colorspace != ZS and \
+           format.block_width == 1 and format.block_height == 1 and \
+           format.block_depth == 1
+
+
+#
+# sRGB tables, computed as in format_srgb.py
+#
+
+def _srgb_tables():
+    srgb_to_linear_float = np.array(
+        [float('%.7e' % srgb_to_linear(i / 255.0)) for i in range(256)],
+        dtype=np.float32)
+    srgb_to_linear_8unorm = np.array(
+        [int(srgb_to_linear(i / 255.0) * 255.0 + 0.5) for i in range(256)],
+        dtype=np.uint8)
+    linear_to_srgb_8unorm = np.array(
+        [int(linear_to_srgb(i / 255.0) * 255.0 + 0.5) for i in range(256)],
+        dtype=np.uint8)
+
+    # Table for util_format_linear_float_to_srgb_8unorm(), the same least
+    # squares fit as generate_srgb_tables(), on all buckets at once.
+    numexp = 13
+    mantissa_msb = 3
+    stepshift = 5
+    nbuckets = numexp << mantissa_msb
+    bucketsize = (1 << (23 - mantissa_msb)) >> stepshift
+    mantshift = 12
+
+    i = np.arange(bucketsize, dtype=np.int64)
+    j = ((i << stepshift) >> mantshift).astype(np.float64)
+    sum_aa = float(bucketsize)
+    sum_ab = float(np.add.accumulate(j)[-1])
+    sum_bb = float(np.add.accumulate(j * j)[-1])
+    inv_det = 1.0 / (sum_aa * sum_bb - sum_ab * sum_ab)
+
+    start = ((127 - numexp) << 23) + \
+            np.arange(nbuckets, dtype=np.int64) * (bucketsize << stepshift)
+    fint = (start[:, np.newaxis] + (i << stepshift)).astype(np.uint32)
+    x = fint.view(np.float32).astype(np.float64)
+    with np.errstate(invalid='ignore'):
+        srgb = np.where(x >= 0.0031308,
+                        1.055 * np.power(x, 0.41666666) - 0.055,
+                        12.92 * x)
+    val = srgb * 255.0 + 0.5
+    sum_a = np.add.accumulate(val, axis=1)[:, -1]
+    sum_b = np.add.accumulate(j * val, axis=1)[:, -1]
+
+    solved_a = inv_det * (sum_bb*sum_a - sum_ab*sum_b)
+    solved_b = inv_det * (sum_aa*sum_b - sum_ab*sum_a)
+    int_a = (solved_a * 65536.0 / 512.0 + 0.5).astype(np.int64)
+    int_b = (solved_b * 65536.0 + 0.5).astype(np.int64)
+    helper = ((int_a << 16) + int_b).astype(np.uint32)
+
+    return srgb_to_linear_float, srgb_to_linear_8unorm, \
+           linear_to_srgb_8unorm, helper
+
+
+_srgb_to_linear_float, _srgb_to_linear_8unorm, \
+_linear_to_srgb_8unorm, _linear_to_srgb_helper = _srgb_tables()
+
+
+def linear_float_to_srgb_8unorm(x):
+    '''util_format_linear_float_to_srgb_8unorm()'''
+    almostone = np.uint32(0x3f7fffff).view(np.float32)
+    minval_ui = np.uint32((127 - 13) << 23)
+    minval = minval_ui.view(np.float32)
+
+    x = np.asarray(x, dtype=np.float32)
+    # NaNs map to minval too
+    x = np.where(x > minval, x, minval)
+    x = np.where(x > almostone, almostone, x)
+
+    ui = x.view(np.uint32)
+    tab = _linear_to_srgb_helper[(ui - minval_ui) >> 20]
+    bias = (tab >> 16) << 9
+    scale = tab & 0xffff
+    t = (ui >> 12) & 0xff
+    return ((bias + scale*t) >> 16).astype(np.uint8)
+
+
+#
+# Helpers mirroring util/u_math.h, util/half_float.h and format_utils.h
+#
+
+def float_to_ubyte(f):
+    f = np.asarray(f, dtype=np.float32)
+    with np.errstate(invalid='ignore'):
+        tmp = f * np.float32(255.0/256.0) + np.float32(32768.0)
+    value = (tmp.view(np.uint32) & 0xff).astype(np.uint8)
+    value = np.where(f >= np.float32(1.0), np.uint8(255), value)
+    return np.where(f > np.float32(0.0), value, np.uint8(0))
+
+
+def iround(f):
+    f = np.asarray(f, dtype=np.float32)
+    return ftoi(np.where(f >= np.float32(0.0),
+                         f + np.float32(0.5), f - np.float32(0.5)))
+
+
+def ftoi(f):
+    '''C conversion of floating point to integer, truncating towards zero.
+
+    Conversions of NaNs and of values out of range of the C type are
+    undefined, e.g. negative floats packed into SSCALED bitmasks through a
+    uint32_t, and what the compiled code gives depends on how the compiler
+    vectorized it. Here the truncated value is wrapped around instead.'''
+    with np.errstate(invalid='ignore', over='ignore'):
+        return np.trunc(f).astype(np.int64)
+
+
+def cdiv(a, b):
+    '''C integer division, truncating towards zero.'''
+    q = np.abs(a) // b
+    return np.where(a < 0, -q, q)
+
+
+def float_to_float16_rtz(f):
+    f = np.asarray(f, dtype=np.float32)
+    with np.errstate(over='ignore'):
+        h = f.astype(np.float16)
+    bits = h.view(np.uint16)
+    # Round to nearest even went away from zero, step back towards it.
+    # This also takes overflows to the largest finite half.
+    with np.errstate(invalid='ignore'):
+        away = np.abs(h.astype(np.float32)) > np.abs(f)
+    return np.where(away & np.isfinite(f), bits - np.uint16(1), bits)
+
+
+def _uint_max(bits):
+    return (1 << bits) - 1
+
+
+def _int_max(bits):
+    return (1 << (bits - 1)) - 1
+
+
+def _extend_normalized_int(x, src_bits, dst_bits):
+    value = x * (_uint_max(dst_bits) // _uint_max(src_bits))
+    if dst_bits % src_bits:
+        value = value + (x >> (src_bits - dst_bits % src_bits))
+    return value
+
+
+def _unorm_to_unorm(x, src_bits, dst_bits):
+    if src_bits < dst_bits:
+        return _extend_normalized_int(x, src_bits, dst_bits)
+    elif src_bits > dst_bits:
+        src_half = (1 << (src_bits - 1)) - 1
+        return (x * _uint_max(dst_bits) + src_half) // _uint_max(src_bits)
+    else:
+        return x
+
+
+def norm_to_norm(x, src_channel, dst_channel):
+    '''_mesa_{u,s}norm_to_{u,s}norm()'''
+    src_bits = src_channel.size
+    dst_bits = dst_channel.size
+    x = x.astype(np.int64)
+    if src_channel.type == UNSIGNED:
+        if dst_channel.type == UNSIGNED:
+            return _unorm_to_unorm(x, src_bits, dst_bits)
+        return _unorm_to_unorm(x, src_bits, dst_bits - 1)
+    if dst_channel.type == UNSIGNED:
+        return np.where(x < 0, 0,
+                        _unorm_to_unorm(np.maximum(x, 0), src_bits - 1,
+                                        dst_bits))
+    if src_bits < dst_bits:
+        value = _extend_normalized_int(x, src_bits - 1, dst_bits - 1)
+    else:
+        value = x >> (src_bits - dst_bits)
+    return np.where(x < -_int_max(src_bits), -_int_max(dst_bits), value)
+
+
+def _native_constant(channel, value):
+    '''The constant printed by native_to_constant(), as a NumPy scalar.'''
+    if channel.type == FLOAT:
+        if channel.size <= 32:
+            return np.float32(float(value))
+        return np.float64(float(value))
+    return int(value)
+
+
+def clamp(value, src_channel, dst_channel):
+    '''Evaluate clamp_expr(), with the MIN2/MAX2/CLAMP macro semantics for
+    NaNs.'''
+
+    if src_channel == dst_channel:
+        return value
+
+    src_min = src_channel.min()
+    src_max = src_channel.max()
+    dst_min = dst_channel.min()
+    dst_max = dst_channel.max()
+
+    dst_min_native = _native_constant(src_channel, value_to_native(src_channel, dst_min))
+    dst_max_native = _native_constant(src_channel, value_to_native(src_channel, dst_max))
+
+    if src_min < dst_min and src_max > dst_max:
+        return np.where(value < dst_min_native, dst_min_native,
+                        np.where(value > dst_max_native, dst_max_native, value)).astype(value.dtype)
+
+    if src_max > dst_max:
+        return np.where(value < dst_max_native, value, dst_max_native).astype(value.dtype)
+
+    if src_min < dst_min:
+        return np.where(value > dst_min_native, value, dst_min_native).astype(value.dtype)
+
+    return value
+
+
+def convert(value,
+            src_channel,
+            dst_channel,
+            src_colorspace = RGB,
+            dst_colorspace = RGB):
+    '''Convert an array of values between two types, as the expression
+    generated by conversion_expr() does.
+
+    value holds the source channel in its native type. The result is not
+    yet cast to the destination type, see store().'''
+
+    if src_colorspace != dst_colorspace:
+        if src_colorspace == SRGB:
+            assert src_channel.type == UNSIGNED
+            assert src_channel.norm
+            assert src_channel.size <= 8
+            assert src_channel.size >= 4
+            assert dst_colorspace == RGB
+            value = value.astype(np.int64)
+            if src_channel.size < 8:
+                value = value << (8 - src_channel.size) | value >> (2 * src_channel.size - 8)
+            if dst_channel.type == FLOAT:
+                return _srgb_to_linear_float[value]
+            else:
+                assert dst_channel.type == UNSIGNED
+                assert dst_channel.norm
+                assert dst_channel.size == 8
+                return _srgb_to_linear_8unorm[value]
+        elif dst_colorspace == SRGB:
+            assert dst_channel.type == UNSIGNED
+            assert dst_channel.norm
+            assert dst_channel.size <= 8
+            assert src_colorspace == RGB
+            if src_channel.type == FLOAT:
+                value = linear_float_to_srgb_8unorm(value)
+            else:
+                assert src_channel.type == UNSIGNED
+                assert src_channel.norm
+                assert src_channel.size == 8
+                value = _linear_to_srgb_8unorm[value]
+            if dst_channel.size < 8:
+                return value >> (8 - dst_channel.size)
+            else:
+                return value
+        elif src_colorspace == ZS:
+            pass
+        elif dst_colorspace == ZS:
+            pass
+        else:
+            assert 0
+
+    if src_channel == dst_channel:
+        return value
+
+    src_type = src_channel.type
+    src_size = src_channel.size
+    src_norm = src_channel.norm
+
+    if src_type != FLOAT and value.dtype != np.uint64:
+        value = value.astype(np.int64)
+
+    # Promote half to float
+    if src_type == FLOAT and src_size == 16:
+        value = value.view(np.float16).astype(np.float32)
+        src_size = 32
+
+    # Special case for float <-> ubytes for more accurate results
+    if src_type == UNSIGNED and src_norm and src_size == 8 and dst_channel.type == FLOAT and dst_channel.size == 32:
+        return value.astype(np.float32) * (np.float32(1.0) / np.float32(255.0))
+    if src_type == FLOAT and src_size == 32 and dst_channel.type == UNSIGNED and dst_channel.norm and dst_channel.size == 8:
+        return float_to_ubyte(value)
+
+    if dst_channel.type != FLOAT or src_type != FLOAT:
+        value = clamp(value, src_channel, dst_channel)
+
+    if src_type in (SIGNED, UNSIGNED) and dst_channel.type in (SIGNED, UNSIGNED):
+        if not src_norm and not dst_channel.norm:
+            # neither is normalized -- just cast
+            return value
+
+        if src_norm and dst_channel.norm:
+            return norm_to_norm(value, src_channel, dst_channel)
+
+        # The clamp above keeps the product well within 64 bits
+        src_one = get_one(src_channel)
+        dst_one = get_one(dst_channel)
+        return cdiv(value.astype(np.int64) * dst_one, src_one)
+
+    # Promote to either float or double
+    if src_type != FLOAT:
+        if src_norm or src_type == FIXED:
+            one = get_one(src_channel)
+            if src_size <= 23:
+                value = value.astype(np.float32) * (np.float32(1.0) / np.float32(one))
+                src_size = 32
+            else:
+                # bigger than single precision mantissa, use double
+                value = value.astype(np.float64) * (1.0 / one)
+                src_size = 64
+        else:
+            if src_size <= 23 or dst_channel.size <= 32:
+                with np.errstate(over='ignore', invalid='ignore'):
+                    value = value.astype(np.float32)
+                src_size = 32
+            else:
+                # bigger than single precision mantissa, use double
+                value = value.astype(np.float64)
+                src_size = 64
+        src_type = FLOAT
+
+    # Convert double or float to non-float
+    if dst_channel.type != FLOAT:
+        if dst_channel.norm or dst_channel.type == FIXED:
+            dst_one = get_one(dst_channel)
+            if dst_channel.size <= 23:
+                # util_iround() takes a float
+                with np.errstate(invalid='ignore'):
+                    return iround(value * value.dtype.type(dst_one))
+            else:
+                # bigger than single precision mantissa, use double
+                value = value.astype(np.float64) * float(dst_one)
+        return ftoi(value)
+    else:
+        # Cast double to float when converting to either half or float
+        if dst_channel.size <= 32 and src_size > 32:
+            with np.errstate(over='ignore', invalid='ignore'):
+                value = value.astype(np.float32)
+            src_size = 32
+
+        if dst_channel.size == 16:
+            value = float_to_float16_rtz(value)
+        elif dst_channel.size == 64 and src_size < 64:
+            value = value.astype(np.float64)
+
+    return value
+
+
+def store(value, channel):
+    '''Cast a converted value to the native type of the channel, wrapping
+    integers around as C does.'''
+    dtype = native_dtype(channel)
+    if value.dtype == dtype:
+        return value
+    if channel.type != FLOAT and value.dtype.kind == 'f':
+        value = ftoi(value)
+    return value.astype(dtype)
+
+
+#
+# Access to the channels of packed pixels
+#
+
+def _is_full_field(channel):
+    return channel.size % 8 == 0 and is_pot(channel.size) and \
+           channel.shift % 8 == 0
+
+
+def _blocks(format, data):
+    bytes_per_block = format.block_size() // 8
+    data = np.frombuffer(data, dtype=np.uint8)
+    count = len(data) // bytes_per_block
+    return data[:count * bytes_per_block].reshape(count, bytes_per_block)
+
+
+def _word_dtype(format):
+    depth = format.block_size()
+    if depth not in (8, 16, 32, 64):
+        raise ValueError('%s: unsupported bitfield layout' % format.name)
+    return np.dtype('<u%u' % (depth // 8)).type
+
+
+def read_channels(format, data):
+    '''Return the raw value of every channel of the pixels in data, in
+    their native types, or None for padding.'''
+
+    blocks = _blocks(format, data)
+    word = None
+    values = []
+    for channel in format.le_channels[:format.nr_channels()]:
+        if channel.type == VOID or channel.size == 0:
+            values.append(None)
+            continue
+
+        if _is_full_field(channel):
+            offset = channel.shift // 8
+            field = np.ascontiguousarray(blocks[:, offset:offset + channel.size // 8])
+            values.append(field.view(native_dtype(channel)).reshape(len(blocks)))
+            continue
+
+        if word is None:
+            word = np.ascontiguousarray(blocks).view(_word_dtype(format)).reshape(len(blocks))
+        depth = format.block_size()
+        shift = channel.shift
+        if channel.type == UNSIGNED:
+            value = (word >> shift) & ((1 << channel.size) - 1)
+        elif channel.type in (SIGNED, FIXED):
+            # Align the sign bit, then shift back arithmetically
+            value = (word << (depth - (shift + channel.size))).view('<i%u' % (depth // 8))
+            value = value >> (depth - channel.size)
+        else:
+            raise ValueError('%s: unsupported bitfield type' % format.name)
+        values.append(value.astype(native_dtype(channel)))
+
+    return values
+
+
+def write_channels(format, values, count):
+    '''Pack the channel values, already in their native types, into an
+    array of bytes. Missing channels are left zeroed.'''
+
+    bytes_per_block = format.block_size() // 8
+    blocks = np.zeros((count, bytes_per_block), dtype=np.uint8)
+    word = None
+    for channel, value in zip(format.le_channels, values):
+        if value is None:
+            continue
+
+        if _is_full_field(channel):
+            offset = channel.shift // 8
+            value = np.ascontiguousarray(value, dtype=native_dtype(channel))
+            blocks[:, offset:offset + channel.size // 8] = \
+                value.view(np.uint8).reshape(count, channel.size // 8)
+            continue
+
+        word_dtype = _word_dtype(format)
+        if word is None:
+            word = np.zeros(count, dtype=word_dtype)
+        mask = (1 << channel.size) - 1
+        value = value.astype(np.uint64) & np.uint64(mask)
+        word |= (value << np.uint64(channel.shift)).astype(word_dtype)
+
+    if word is not None:
+        blocks |= word.view(np.uint8).reshape(count, bytes_per_block)
+
+    return blocks.reshape(-1)
+
+
+#
+# Public entry points, matching util_format_unpack/pack_description
+#
+
+def unpack(format, data, dst_channel):
+    '''Unpack the pixels of data into an (n, 4) array of dst_channel
+    values, like util_format_*_unpack_*().'''
+
+    if not is_format_handled(format):
+        raise ValueError('%s: unsupported format' % format.name)
+
+    channels = format.le_channels
+    swizzles = format.le_swizzles
+    raw = read_channels(format, data)
+
+    dst = np.zeros((len(raw[0]) if raw and raw[0] is not None
+                    else len(_blocks(format, data)), 4),
+                   dtype=native_dtype(dst_channel))
+    for i in range(4):
+        swizzle = swizzles[i]
+        if swizzle < 4:
+            src_colorspace = format.colorspace
+            if src_colorspace == SRGB and i == 3:
+                # Alpha channel is linear
+                src_colorspace = RGB
+            value = convert(raw[swizzle], channels[swizzle], dst_channel,
+                            src_colorspace = src_colorspace)
+            dst[:, i] = store(value, dst_channel)
+        elif swizzle == SWIZZLE_1:
+            dst[:, i] = get_one(dst_channel)
+
+    return dst
+
+
+def pack(format, src, src_channel):
+    '''Pack an (n, 4) array of src_channel values into the bytes of format,
+    like util_format_*_pack_*().'''
+
+    if not is_format_handled(format):
+        raise ValueError('%s: unsupported format' % format.name)
+
+    src = np.asarray(src, dtype=native_dtype(src_channel)).reshape(-1, 4)
+    inv_swizzle = inv_swizzles(format.le_swizzles)
+
+    values = []
+    for i in range(format.nr_channels()):
+        dst_channel = format.le_channels[i]
+        if inv_swizzle[i] is None or dst_channel.type == VOID:
+            values.append(None)
+            continue
+        dst_colorspace = format.colorspace
+        if dst_colorspace == SRGB and inv_swizzle[i] == 3:
+            # Alpha channel is linear
+            dst_colorspace = RGB
+        value = convert(src[:, inv_swizzle[i]], src_channel, dst_channel,
+                        dst_colorspace = dst_colorspace)
+        values.append(store(value, dst_channel))
+
+    return write_channels(format, values, len(src))
+
+
+def unpack_rgba_float(format, data):
+    return unpack(format, data, FLOAT_CHANNEL)
+
+
+def unpack_rgba_8unorm(format, data):
+    return unpack(format, data, UNORM8_CHANNEL)
+
+
+def unpack_unsigned(format, data):
+    return unpack(format, data, UNSIGNED_CHANNEL)
+
+
+def unpack_signed(format, data):
+    return unpack(format, data, SIGNED_CHANNEL)
+
+
+def pack_rgba_float(format, src):
+    return pack(format, src, FLOAT_CHANNEL)
+
+
+def pack_rgba_8unorm(format, src):
+    return pack(format, src, UNORM8_CHANNEL)
+
+
+def pack_unsigned(format, src):
+    return pack(format, src, UNSIGNED_CHANNEL)
+
+
+def pack_signed(format, src):
+    return pack(format, src, SIGNED_CHANNEL)
+
+
+def fits_8unorm(format):
+    '''util_format_fits_8unorm() for plain formats.'''
+    if format.colorspace == SRGB:
+        return False
+    for channel in format.le_channels:
+        if channel.type == VOID:
+            continue
+        if channel.type != UNSIGNED or not channel.norm or channel.size > 8:
+            return False
+    return True
+
+
+def is_compatible(src_format, dst_format):
+    '''util_is_format_compatible() for plain formats.'''
+    if src_format.name == dst_format.name:
+        return True
+    if src_format.block_size() != dst_format.block_size() or \
+       src_format.nr_channels() != dst_format.nr_channels() or \
+       src_format.colorspace != dst_format.colorspace:
+        return False
+    for chan in range(4):
+        if src_format.le_channels[chan].size != dst_format.le_channels[chan].size:
+            return False
+    for chan in range(4):
+        swizzle = dst_format.le_swizzles[chan]
+        if swizzle < 4:
+            if src_format.le_swizzles[chan] != swizzle:
+                return False
+            src_channel = src_format.le_channels[swizzle]
+            dst_channel = dst_format.le_channels[swizzle]
+            if src_channel.type != dst_channel.type or \
+               src_channel.norm != dst_channel.norm:
+                return False
+    return True
+
+
+def translate(src_format, dst_format, data):
+    '''Convert pixels between formats, picking the intermediate
+    representation as util_format_translate() does.'''
+
+    if is_compatible(src_format, dst_format):
+        return np.frombuffer(data, dtype=np.uint8).copy()
+
+    if fits_8unorm(src_format) or fits_8unorm(dst_format):
+        return pack_rgba_8unorm(dst_format, unpack_rgba_8unorm(src_format, data))
+
+    if src_format.is_pure_signed() or dst_format.is_pure_signed():
+        if src_format.is_pure_signed() != dst_format.is_pure_signed():
+            raise ValueError('cannot translate %s to %s' % (src_format.name, dst_format.name))
+        return pack_signed(dst_format, unpack_signed(src_format, data))
+
+    if src_format.is_pure_unsigned() or dst_format.is_pure_unsigned():
+        if src_format.is_pure_signed():
+            rgba = unpack_signed(src_format, data).view(np.uint32)
+        else:
+            rgba = unpack_unsigned(src_format, data)
+        return pack_unsigned(dst_format, rgba)
+
+    return pack_rgba_float(dst_format, unpack_rgba_float(src_format, data))
+
+
+#
+# Command line
+#
+
+def load_formats(filename=None):
+    if filename is None:
+        filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'u_format.csv')
+    return dict((format.name, format) for format in parse(filename))
+
+
+def lookup_format(formats, name):
+    name = name.upper()
+    if not name.startswith('PIPE_FORMAT_'):
+        name = 'PIPE_FORMAT_' + name
+    try:
+        return formats[name]
+    except KeyError:
+        raise SystemExit('unknown format %s' % name)
+
+
+TEST_DUMPER = '''
+#include <stdio.h>
+#include "util/format/u_format_tests.h"
+
+int
+main(void)
+{
+   for (unsigned i = 0; i < util_format_nr_test_cases; ++i) {
+      const struct util_format_test_case *test = &util_format_test_cases[i];
+      printf("%u", (unsigned)test->format);
+      for (unsigned j = 0; j < UTIL_FORMAT_MAX_PACKED_BYTES; ++j)
+         printf(" %u", test->mask[j]);
+      for (unsigned j = 0; j < UTIL_FORMAT_MAX_PACKED_BYTES; ++j)
+         printf(" %u", test->packed[j]);
+      for (unsigned j = 0; j < 4; ++j)
+         printf(" %.17g", test->unpacked[0][0][j]);
+      printf("\\n");
+   }
+   return 0;
+}
+'''
+
+
+def read_format_enum(top):
+    '''Return the names of enum pipe_format, in order.'''
+    with open(os.path.join(top, 'src', 'gallium', 'include', 'pipe', 'p_format.h')) as f:
+        source = f.read()
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    body = re.search(r'enum pipe_format\s*{(.*?)}', source, re.S).group(1)
+    names = []
+    for name, value in re.findall(r'(PIPE_FORMAT_\w+)\s*(=\s*[^,]+)?,', body):
+        assert not value
+        names.append(name)
+    return names
+
+
+def read_test_cases(top, cc):
+    '''Build and run a program printing util_format_test_cases.'''
+    with tempfile.TemporaryDirectory() as tmpdir:
+        c_file = os.path.join(tmpdir, 'u_format_tests_dump.c')
+        exe = os.path.join(tmpdir, 'u_format_tests_dump')
+        with open(c_file, 'w') as f:
+            f.write(TEST_DUMPER)
+        subprocess.check_call([cc, '-std=gnu99', '-DHAVE_ENDIAN_H',
+                               '-I' + os.path.join(top, 'include'),
+                               '-I' + os.path.join(top, 'src'),
+                               '-I' + os.path.join(top, 'src', 'gallium', 'include'),
+                               '-o', exe, c_file,
+                               os.path.join(top, 'src', 'util', 'format', 'u_format_tests.c')])
+        output = subprocess.check_output([exe], universal_newlines=True)
+
+    names = read_format_enum(top)
+    tests = []
+    for line in output.splitlines():
+        words = line.split()
+        n = 32
+        tests.append((names[int(words[0])],
+                      bytes(int(w) for w in words[1:1 + n]),
+                      bytes(int(w) for w in words[1 + n:1 + 2*n]),
+                      [float(w) for w in words[1 + 2*n:]]))
+    return tests
+
+
+def _masked(data, mask, size):
+    return bytes(d & m for d, m in zip(data[:size], mask[:size]))
+
+
+def verify(formats, tests):
+    '''Check the engine against util_format_test_cases, with the same
+    rules as u_format_test.c.'''
+
+    failures = 0
+    checked = 0
+    skipped = set()
+    for name, mask, packed, unpacked in tests:
+        format = formats[name]
+        if not is_format_handled(format):
+            skipped.add(name)
+            continue
+
+        size = format.block_size() // 8
+        expected = _masked(packed, mask, size)
+        errors = []
+        is_nan = unpacked[0] != unpacked[0]
+
+        if format.is_pure_unsigned() or format.is_pure_signed():
+            if format.is_pure_unsigned():
+                rgba = unpack_unsigned(format, packed[:size])
+                obtained = pack_unsigned(format, np.array([unpacked], dtype=np.float64).astype(np.uint32))
+            else:
+                rgba = unpack_signed(format, packed[:size])
+                obtained = pack_signed(format, np.array([unpacked], dtype=np.float64).astype(np.int32))
+            if list(rgba[0]) != [int(x) for x in unpacked]:
+                errors.append('unpack %s' % rgba[0].tolist())
+            if _masked(obtained.tobytes(), mask, size) != expected:
+                errors.append('pack %s' % obtained.tobytes().hex())
+        else:
+            rgba = unpack_rgba_float(format, packed[:size])
+            with np.errstate(invalid='ignore'):
+                error = np.abs(rgba[0] - np.array(unpacked, dtype=np.float32))
+            # NaN errors pass, as in compare_float()
+            if (error > np.finfo(np.float32).eps).any():
+                errors.append('unpack_rgba_float %s' % rgba[0].tolist())
+
+            obtained = pack_rgba_float(format, np.array([unpacked], dtype=np.float32))
+            if _masked(obtained.tobytes(), mask, size) != expected and not is_nan:
+                errors.append('pack_rgba_float %s' % obtained.tobytes().hex())
+
+            representable = all(0.0 <= x <= 1.0 for x in unpacked)
+            expected_8unorm = [0 if x < 0.0 else 255 if x > 1.0 else int(x * 255.0)
+                               if x == x else 0 for x in unpacked]
+            rgba = unpack_rgba_8unorm(format, packed[:size])
+            if list(rgba[0]) != expected_8unorm and not is_nan:
+                errors.append('unpack_rgba_8unorm %s' % rgba[0].tolist())
+
+            if representable and unpacked[0] * 255.0 == int(unpacked[0] * 255.0):
+                obtained = pack_rgba_8unorm(format, np.array([expected_8unorm], dtype=np.uint8))
+                if _masked(obtained.tobytes(), mask, size) != expected:
+                    errors.append('pack_rgba_8unorm %s' % obtained.tobytes().hex())
+
+        checked += 1
+        if errors:
+            failures += 1
+            print('FAILED: %s %s %s' % (name, packed[:size].hex(), unpacked))
+            for error in errors:
+                print('        %s' % error)
+
+    print('%u test cases checked, %u failed, %u formats skipped' %
+          (checked, failures, len(skipped)))
+    return failures == 0
+
+
+def _kernel_functions(format):
+    '''The functions of the generated C code, with the engine's counterpart
+    and the NumPy type of their RGBA side.'''
+    if format.is_pure_unsigned():
+        return [('unpack_rgba', unpack_unsigned, np.uint32),
+                ('pack_rgba_uint', pack_unsigned, np.uint32)]
+    if format.is_pure_signed():
+        return [('unpack_rgba', unpack_signed, np.int32),
+                ('pack_rgba_sint', pack_signed, np.int32)]
+    return [('unpack_rgba_8unorm', unpack_rgba_8unorm, np.uint8),
+            ('unpack_rgba', unpack_rgba_float, np.float32),
+            ('pack_rgba_8unorm', pack_rgba_8unorm, np.uint8),
+            ('pack_rgba_float', pack_rgba_float, np.float32)]
+
+
+def _random_rgba(rng, format, dtype, pixels):
+    '''RGBA pixels to pack, covering the range of the format's channels and
+    beyond.  Floats stay in the range where the conversions to integers are
+    defined in C.'''
+    if dtype == np.uint8:
+        return rng.integers(0, 256, (pixels, 4), dtype=np.uint8)
+    if dtype in (np.uint32, np.int32):
+        info = np.iinfo(dtype)
+        values = rng.integers(info.min, info.max, (pixels, 4), dtype=dtype, endpoint=True)
+        return values >> rng.integers(0, 32, (pixels, 4)).astype(dtype)
+    size = format.block_size() // 8
+    data = rng.integers(0, 256, pixels * size, dtype=np.uint8).tobytes()
+    half = pixels // 2
+    values = unpack_rgba_float(format, data).astype(np.float32)
+    values[half:] = rng.uniform(-2.0, 2.0, (pixels - half, 4))
+
+    # Quiet the NaNs: F16C quiets them when converting to half, while the
+    # C fallback keeps them signaling.
+    bits = values.view(np.uint32)
+    bits[np.isnan(values)] |= 0x400000
+
+    # Scaled signed channels which aren't 8, 16 or 32 bits are packed by
+    # casting the float to uint32, which is undefined for negative values.
+    for i, channel in zip(inv_swizzles(format.le_swizzles), format.le_channels):
+        if channel.type == SIGNED and not channel.norm and not channel.pure and \
+           channel.size not in (8, 16, 32, 64) and i is not None:
+            values[:, i] = np.abs(values[:, i])
+    return values
+
+
+def _same_pixels(engine, kernel):
+    '''Per pixel comparison of the bits of the channels, where any NaN
+    matches any NaN.'''
+    same = engine.view(np.dtype('u%u' % engine.itemsize)) == \
+           kernel.view(np.dtype('u%u' % kernel.itemsize))
+    if engine.dtype == np.float32:
+        same |= np.isnan(engine) & np.isnan(kernel)
+    return same.all(axis=1)
+
+
+def compare(formats, kernels, names, pixels):
+    '''Check the engine against the generated C pack/unpack functions, run
+    by the u_format_kernels program over random buffers.'''
+
+    rng = np.random.default_rng(0)
+    if names:
+        selected = [lookup_format(formats, name) for name in names]
+    else:
+        selected = [format for format in formats.values()
+                    if is_format_handled(format) and has_access(format) and
+                    format.name != 'PIPE_FORMAT_NONE']
+
+    proc = subprocess.Popen([kernels], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    compared = 0
+    failures = 0
+    for format in selected:
+        size = format.block_size() // 8
+        for function, engine_function, dtype in _kernel_functions(format):
+            if function.startswith('unpack'):
+                data = rng.integers(0, 256, pixels * size, dtype=np.uint8)
+                arg = data.tobytes()
+            else:
+                data = _random_rgba(rng, format, dtype, pixels)
+                arg = data
+            proc.stdin.write(b'%s %s %u\n' % (format.name.encode(), function.encode(), pixels))
+            proc.stdin.write(data.tobytes())
+            proc.stdin.flush()
+            out_size = int(proc.stdout.readline())
+            if out_size < 0:
+                continue
+            kernel = np.frombuffer(proc.stdout.read(out_size), dtype=np.uint8)
+
+            if function.startswith('unpack'):
+                kernel = kernel.view(dtype).reshape(pixels, 4)
+            else:
+                kernel = kernel.reshape(pixels, size)
+            engine = np.asarray(engine_function(format, arg))
+            if function.startswith('unpack'):
+                engine = engine.astype(dtype).reshape(pixels, 4)
+            else:
+                engine = engine.view(np.uint8).reshape(pixels, size)
+            same = _same_pixels(engine, kernel)
+
+            compared += 1
+            if not same.all():
+                failures += 1
+                i = np.flatnonzero(~same)[0]
+                print('FAILED: %s %s, %u of %u pixels differ' %
+                      (format.short_name(), function, np.count_nonzero(~same), pixels))
+                print('        first at %u: input %s, engine %s, C %s' %
+                      (i, data.reshape(pixels, -1)[i].tolist(), engine[i].tolist(), kernel[i].tolist()))
+    proc.stdin.close()
+    proc.wait()
+
+    print('%u functions compared over %u pixels, %u differ' % (compared, pixels, failures))
+    return failures == 0
+
+
+def bench(formats, names, pixels):
+    rng = np.random.default_rng(0)
+    print('%-32s %-18s %10s' % ('format', 'function', 'MB/s'))
+    for name in names:
+        format = lookup_format(formats, name)
+        size = format.block_size() // 8
+        data = rng.integers(0, 256, pixels * size, dtype=np.uint8).tobytes()
+        if format.is_pure_signed():
+            funcs = [('unpack_signed', unpack_signed, data),
+                     ('pack_signed', pack_signed, unpack_signed(format, data))]
+        elif format.is_pure_unsigned():
+            funcs = [('unpack_unsigned', unpack_unsigned, data),
+                     ('pack_unsigned', pack_unsigned, unpack_unsigned(format, data))]
+        else:
+            funcs = [('unpack_rgba_float', unpack_rgba_float, data),
+                     ('pack_rgba_float', pack_rgba_float, unpack_rgba_float(format, data)),
+                     ('unpack_rgba_8unorm', unpack_rgba_8unorm, data),
+                     ('pack_rgba_8unorm', pack_rgba_8unorm, unpack_rgba_8unorm(format, data))]
+        for func_name, func, arg in funcs:
+            start = time.perf_counter()
+            func(format, arg)
+            elapsed = time.perf_counter() - start
+            print('%-32s %-18s %10.1f' % (format.short_name(), func_name,
+                                          pixels * size / elapsed / 1e6))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', help='format table, defaults to u_format.csv')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    parser_verify = subparsers.add_parser('verify', help='check against the test cases of u_format_tests.c')
+    parser_verify.add_argument('--top', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'),
+                               help='top of the source tree')
+    parser_verify.add_argument('--cc', default=os.environ.get('CC', 'cc'))
+
+    parser_compare = subparsers.add_parser('compare', help='check against the generated C code on random pixels')
+    parser_compare.add_argument('--kernels', required=True,
+                                help='u_format_kernels program, built with "ninja u_format_kernels"')
+    parser_compare.add_argument('--pixels', type=int, default=1 << 16)
+    parser_compare.add_argument('formats', nargs='*', help='formats to check, defaults to all the handled ones')
+
+    parser_translate = subparsers.add_parser('translate', help='convert a raw image between formats')
+    parser_translate.add_argument('src_format')
+    parser_translate.add_argument('dst_format')
+    parser_translate.add_argument('input', type=argparse.FileType('rb'))
+    parser_translate.add_argument('output', type=argparse.FileType('wb'))
+
+    parser_bench = subparsers.add_parser('bench', help='measure the throughput of the engine')
+    parser_bench.add_argument('--pixels', type=int, default=1 << 20)
+    parser_bench.add_argument('formats', nargs='+')
+
+    args = parser.parse_args()
+    formats = load_formats(args.csv)
+
+    if args.command == 'verify':
+        if not verify(formats, read_test_cases(args.top, args.cc)):
+            sys.exit(1)
+    elif args.command == 'compare':
+        if not compare(formats, args.kernels, args.formats, args.pixels):
+            sys.exit(1)
+    elif args.command == 'translate':
+        src_format = lookup_format(formats, args.src_format)
+        dst_format = lookup_format(formats, args.dst_format)
+        args.output.write(translate(src_format, dst_format, args.input.read()).tobytes())
+    elif args.command == 'bench':
+        bench(formats, args.formats, args.pixels)
+
+
+if __name__ == '__main__':
+    main()
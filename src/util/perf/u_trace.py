@@ -25,6 +25,7 @@ from mako.template import Template
 from collections import namedtuple
 from enum import IntEnum
 import os
+import re
 
 TRACEPOINTS = {}
 TRACEPOINTS_TOGGLES = {}
@@ -551,3 +552,166 @@ def utrace_generate_perfetto_utils(hpath):
             f.write(Template(perfetto_utils_hdr_template, output_encoding='utf-8').render(
                 hdrname=hdr.rstrip('.h').upper(),
                 TRACEPOINTS=TRACEPOINTS))
+
+
+# NumPy types of the integer fields, from their C type:
+PY_INT_TYPES = {
+    'bool': '?',
+    'uint8_t': 'u1',
+    'uint16_t': 'u2',
+    'uint32_t': 'u4',
+    'uint64_t': 'u8',
+    'int8_t': 'i1',
+    'int16_t': 'i2',
+    'int32_t': 'i4',
+    'int64_t': 'i8',
+    'unsigned': 'u4',
+    'int': 'i4',
+}
+
+PRINTF_CONVERSION = re.compile(r'%([-+ #0]*)(\d*)(?:\.\d+)?(?:hh|h|ll|l|j|z|t|L)?([diuxXpscfeEgG%])')
+
+def _py_field(trace, conversion, expr, names):
+    """Returns the (name, kind, dtype) of the field printed by a conversion
+    of a tp_print format from the expression, and the regex matching it."""
+    flag = re.fullmatch(r'.*\?\s*"([^"]*)"\s*:\s*""\s*', expr)
+    if conversion in 'sc' and flag:
+        name = re.sub(r'\W', '', flag.group(1))
+    else:
+        entries = set(re.findall(r'__entry->(\w+)', expr))
+        name = entries.pop() if len(entries) == 1 else ''
+    if not name or name in names:
+        name = '{0}{1}'.format(name or 'arg', len(names))
+    names.add(name)
+
+    ctype = None
+    for arg in trace.tp_struct:
+        if arg.name == name:
+            ctype = arg.type
+
+    if conversion in 'sc':
+        if flag:
+            return (name, 'flag', '?'), '((?:{0})?)'.format(re.escape(flag.group(1)))
+        return (name, 'str', 'U'), '(.*?)'
+    if conversion in 'feEgG':
+        return (name, 'float', 'f8'), r'([-+0-9.a-zA-Z]+)'
+    if conversion == 'p':
+        return (name, 'ptr', 'u8'), r'(0x[0-9a-fA-F]+|\(nil\))'
+    if conversion in 'xX':
+        return (name, 'hex', PY_INT_TYPES.get(ctype, 'u8')), r'([0-9a-fA-F]+)'
+    if conversion in 'di':
+        return (name, 'int', PY_INT_TYPES.get(ctype, 'i8')), r'(-?\d+)'
+    return (name, 'int', PY_INT_TYPES.get(ctype, 'u8')), r'(\d+)'
+
+def _py_tracepoint(trace):
+    """Returns the fields of the payload printed by a tracepoint and the
+    regex matching it, see TracepointDesc in u_trace_analysis.py."""
+    if not trace.can_generate_print():
+        return [], None
+
+    if trace.tp_print is not None:
+        fmt = trace.tp_print[0]
+        exprs = trace.tp_print[1:]
+    else:
+        fmt = ''.join('{0}={1}, '.format(arg.name, arg.c_format) for arg in trace.tp_struct)
+        exprs = ['__entry->' + arg.name for arg in trace.tp_struct]
+
+    fields = []
+    names = set()
+    regex = ''
+    pos = 0
+    for m in PRINTF_CONVERSION.finditer(fmt):
+        regex += re.escape(fmt[pos:m.start()])
+        pos = m.end()
+        flags, width, conversion = m.groups()
+        if conversion == '%':
+            regex += '%'
+            continue
+        field, field_regex = _py_field(trace, conversion, exprs[len(fields)], names)
+        if width and '-' not in flags:
+            field_regex = ' *' + field_regex
+        fields.append(field)
+        regex += field_regex
+    # Trailing whitespace, like the ", " after the last field of the default
+    # format, is easily lost.
+    regex += re.escape(fmt[pos:].rstrip()) + '[ \\t]*'
+
+    return fields, regex
+
+def _py_stages():
+    """Pairs the start and end tracepoints of the stages by their names."""
+    stages = {}
+    for name in TRACEPOINTS:
+        for start, end in [('start_', 'end_'), ('begin_', 'end_'), ('intel_begin_', 'intel_end_')]:
+            if name.startswith(start) and end + name[len(start):] in TRACEPOINTS:
+                stages[name[len(start):]] = (name, end + name[len(start):])
+    return stages
+
+
+py_template = """\
+# This file was generated by utrace_generate_py() in u_trace.py, from the
+# runtime in u_trace_analysis.py and the tracepoints of ${script}.
+# Do not edit.
+
+${runtime}
+
+#
+# Tracepoint definitions:
+#
+
+TRACEPOINTS = {
+% for trace_name, (trace, fields, regex) in tracepoints.items():
+    '${trace_name}': TracepointDesc(
+        '${trace_name}', ${trace.end_of_pipe},
+        [
+%    for field in fields:
+            Field${repr(field)},
+%    endfor
+        ],
+        ${repr(regex)},
+        ${trace.tp_print is not None}),
+% endfor
+}
+
+STAGES = {
+% for stage_name, (start_name, end_name) in stages.items():
+    '${stage_name}': ('${start_name}', '${end_name}'),
+% endfor
+}
+
+
+def load(path):
+    return parse(path, TRACEPOINTS, STAGES)
+
+
+if __name__ == '__main__':
+    main(TRACEPOINTS, STAGES)
+"""
+
+def utrace_generate_py(pypath, script=None):
+    """Parameters:
+
+    - pypath: python module to generate, for the offline analysis of the
+      traces of the tracepoints with NumPy (see u_trace_analysis.py).
+    - script: (optional) name of the tracepoint definitions script, for the
+      header of the module.
+    """
+    if pypath is None:
+        return
+
+    runtime_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'u_trace_analysis.py')
+    with open(runtime_path, encoding='utf-8') as f:
+        runtime = f.read().rstrip()
+
+    tracepoints = {}
+    for trace_name, trace in TRACEPOINTS.items():
+        fields, regex = _py_tracepoint(trace)
+        tracepoints[trace_name] = (trace, fields, regex)
+
+    with open(pypath, 'w', encoding='utf-8') as f:
+        f.write(Template(py_template).render(
+            script=script or 'the driver',
+            runtime=runtime,
+            tracepoints=tracepoints,
+            stages=_py_stages()))
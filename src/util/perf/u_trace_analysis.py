@@ -0,0 +1,436 @@
+# Copyright © 2026 Mesa contributors
+# SPDX-License-Identifier: MIT
+
+"""Offline analysis of the traces written by u_trace (GPU_TRACEFILE).
+
+This is the runtime part of the modules generated by utrace_generate_py()
+in u_trace.py, which appends to it the TRACEPOINTS and STAGES tables
+describing the tracepoints of a driver.  It isn't meant to be used on its
+own.
+
+The txt and json formats (GPU_TRACE_FORMAT) are parsed into one NumPy record
+array per tracepoint, with the frame_nr, batch_nr, seq (order of the event in
+the trace) and ts_ns columns followed by the payload fields.  The start and
+end tracepoints of each stage are paired into the durations of the stage,
+which are summarized or binned into histograms.  The module is written by
+the -P/--utrace-py option of the tracepoints script of the driver, e.g.:
+
+   python3 freedreno_tracepoints.py -p src/util/perf -P fd_analysis.py
+   python3 fd_analysis.py trace.txt
+   python3 fd_analysis.py trace.json --histogram render_pass
+   python3 fd_analysis.py trace.txt --save trace.npz
+
+The parsed arrays can be saved to a .npz file, which loads much faster than
+the trace for further analysis.
+"""
+
+import argparse
+import json
+import re
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+# Description of a payload field, generated from the printf format of the
+# tracepoint:
+#
+# - kind: how the value is printed, 'int' for decimal integers, 'hex', 'ptr'
+#   for %p, 'float', 'str', or 'flag' for a string which is either a literal
+#   or empty (e.g. "cond ? "+flush" : """).
+# - dtype: the NumPy type of the field.
+Field = namedtuple('Field', ['name', 'kind', 'dtype'])
+
+# - regex: matches the printed payload, with one group per field, or None if
+#   the tracepoint doesn't print one.
+# - unstructured: whether the payload is printed with a custom tp_print, in
+#   which case it is in the "unstructured" parameter of the json events.
+TracepointDesc = namedtuple('TracepointDesc',
+                            ['name', 'end_of_pipe', 'fields', 'regex', 'unstructured'])
+
+EVENT_COLUMNS = [('frame_nr', 'u4'), ('batch_nr', 'u4'), ('seq', 'u8'), ('ts_ns', 'u8')]
+
+TEXT_LINE_REGEX = re.compile(r'^(?:(\d+) +[-+]\d+: (\w+)(?:: (.*))?'
+                             r'|(\+)----- NS .*'
+                             r'|ELAPSED: (\d+) ns'
+                             r'|END OF FRAME (\d+))$', re.MULTILINE)
+
+
+def convert_column(values, field):
+    if field.kind == 'int':
+        signed = np.dtype(field.dtype).kind == 'i'
+        return np.array(values, dtype=str).astype(np.int64 if signed else np.uint64).astype(field.dtype)
+    if field.kind in ('hex', 'ptr'):
+        return np.fromiter((0 if v == '(nil)' else int(v, 16) for v in values),
+                           dtype=field.dtype, count=len(values))
+    if field.kind == 'float':
+        return np.array(values, dtype=str).astype(field.dtype)
+    if field.kind == 'flag':
+        return np.array(values, dtype=str) != ''
+    return np.array(values, dtype=str)
+
+
+def default_value(field):
+    if field.kind in ('str', 'flag'):
+        return ''
+    return '0'
+
+
+class Trace(object):
+    """The events of a trace, as a record array per tracepoint."""
+
+    def __init__(self, tracepoints, stages, events, batches, unknown=None, unparsed=None):
+        self.tracepoints = tracepoints
+        self.stages = stages
+        self.events = events
+        # frame_nr, batch_nr and elapsed_ns of each batch:
+        self.batches = batches
+        # Number of events of tracepoints missing from the table, and of the
+        # events whose payload didn't match the format of their tracepoint:
+        self.unknown = unknown or {}
+        self.unparsed = unparsed or {}
+
+    def __getitem__(self, name):
+        return self.events[name]
+
+    def __contains__(self, name):
+        return name in self.events
+
+    def pair(self, start_name, end_name):
+        return pair_events(self.events.get(start_name), self.events.get(end_name))
+
+    def stage(self, name):
+        """The occurrences of a stage, see pair_events()."""
+        start_name, end_name = self.stages[name]
+        return self.pair(start_name, end_name)
+
+    def stage_durations(self):
+        """The paired occurrences of each stage which appears in the trace."""
+        result = {}
+        for name, (start_name, end_name) in self.stages.items():
+            if start_name in self.events or end_name in self.events:
+                result[name] = self.pair(start_name, end_name)
+        return result
+
+    def save(self, path):
+        arrays = {'tp.' + name: np.asarray(events) for name, events in self.events.items()}
+        arrays['batches'] = np.asarray(self.batches)
+        np.savez_compressed(path, **arrays)
+
+
+def make_events(tracepoint, columns):
+    """Builds the record array of a tracepoint from the raw columns."""
+    frame_nr, batch_nr, seq, ts_ns, payloads = columns
+    arrays = [np.array(frame_nr, dtype='u4'),
+              np.array(batch_nr, dtype='u4'),
+              np.array(seq, dtype='u8'),
+              np.array(ts_ns, dtype=str).astype(np.uint64) if ts_ns else np.zeros(0, 'u8')]
+    names = [name for name, dtype in EVENT_COLUMNS]
+    unparsed = 0
+
+    if tracepoint.fields:
+        # Matching all the payloads at once is much faster than going
+        # through them one by one, which is only needed if one of them
+        # doesn't match.
+        regex = re.compile('^' + tracepoint.regex + '$', re.MULTILINE)
+        values = regex.findall('\n'.join(payloads))
+        if len(tracepoint.fields) == 1:
+            values = [(v,) for v in values]
+        if len(values) != len(payloads):
+            values = []
+            defaults = tuple(default_value(field) for field in tracepoint.fields)
+            for payload in payloads:
+                match = regex.match(payload)
+                if match:
+                    values.append(match.groups())
+                else:
+                    values.append(defaults)
+                    unparsed += 1
+        fields = list(zip(*values)) or [[] for field in tracepoint.fields]
+        for field, column in zip(tracepoint.fields, fields):
+            arrays.append(convert_column(list(column), field))
+            names.append(field.name)
+
+    return np.rec.fromarrays(arrays, names=names), unparsed
+
+
+def make_trace(tracepoints, stages, columns, batches, unknown):
+    events = {}
+    unparsed = {}
+    for name, tp_columns in columns.items():
+        events[name], count = make_events(tracepoints[name], tp_columns)
+        if count:
+            unparsed[name] = count
+    batches = np.rec.fromarrays([np.array(c, dtype=t) for c, t in
+                                 zip(batches, ['u4', 'u4', 'u8'])],
+                                names=['frame_nr', 'batch_nr', 'elapsed_ns'])
+    return Trace(tracepoints, stages, events, batches, unknown, unparsed)
+
+
+def parse_text(text, tracepoints, stages):
+    rows = TEXT_LINE_REGEX.findall(text)
+    if not rows:
+        return make_trace(tracepoints, stages, {}, ([], [], []), {})
+
+    ts, names, payloads, headers, elapsed, eofs = (np.array(c) for c in zip(*rows))
+
+    # The batches are numbered from 0 in each frame, like in u_trace.
+    is_eof = eofs != ''
+    frame_nr = np.cumsum(is_eof) - is_eof
+    batch_count = np.cumsum(headers != '')
+    frame_first_batch = np.maximum.accumulate(np.where(is_eof, batch_count, 0))
+    frame_first_batch = np.concatenate(([0], frame_first_batch[:-1]))
+    batch_nr = np.maximum(batch_count - frame_first_batch - 1, 0)
+
+    is_elapsed = elapsed != ''
+    batches = (frame_nr[is_elapsed], batch_nr[is_elapsed], elapsed[is_elapsed].astype(np.uint64))
+
+    event_rows = np.flatnonzero(ts != '')
+    names = names[event_rows]
+    unique_names, inverse = np.unique(names, return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.searchsorted(inverse[order], np.arange(len(unique_names) + 1))
+
+    columns = {}
+    unknown = {}
+    for i, name in enumerate(unique_names.tolist()):
+        tp_rows = event_rows[order[bounds[i]:bounds[i + 1]]]
+        if name not in tracepoints:
+            unknown[name] = len(tp_rows)
+            continue
+        columns[name] = (frame_nr[tp_rows], batch_nr[tp_rows],
+                         np.searchsorted(event_rows, tp_rows),
+                         ts[tp_rows].tolist(), payloads[tp_rows].tolist())
+
+    return make_trace(tracepoints, stages, columns, batches, unknown)
+
+
+def parse_json(text, tracepoints, stages):
+    try:
+        frames = json.loads(text)
+    except ValueError:
+        # The closing bracket is only printed when the context is destroyed,
+        # which an application doesn't always do.
+        frames = json.loads(text + ']')
+
+    raw = {}
+    batches = ([], [], [])
+    unknown = {}
+    seq = 0
+    for frame in frames:
+        frame_nr = frame['frame']
+        for batch_nr, batch in enumerate(frame['batches']):
+            batches[0].append(frame_nr)
+            batches[1].append(batch_nr)
+            batches[2].append(batch['duration_ns'])
+            for event in batch['events']:
+                name = event['event']
+                tracepoint = tracepoints.get(name)
+                if tracepoint is None:
+                    unknown[name] = unknown.get(name, 0) + 1
+                    seq += 1
+                    continue
+
+                params = event['params']
+                if tracepoint.unstructured:
+                    payload = params.get('unstructured', '')
+                else:
+                    # Same as the txt format.
+                    payload = ''.join('{}={}, '.format(field.name, params.get(field.name, ''))
+                                      for field in tracepoint.fields)
+
+                columns = raw.get(name)
+                if columns is None:
+                    columns = raw[name] = ([], [], [], [], [])
+                columns[0].append(frame_nr)
+                columns[1].append(batch_nr)
+                columns[2].append(seq)
+                columns[3].append(event['time_ns'])
+                columns[4].append(payload)
+                seq += 1
+
+    return make_trace(tracepoints, stages, raw, batches, unknown)
+
+
+def load_npz(path, tracepoints, stages):
+    with np.load(path, allow_pickle=False) as data:
+        events = {key[3:]: data[key].view(np.recarray)
+                  for key in data.files if key.startswith('tp.')}
+        batches = data['batches'].view(np.recarray)
+    return Trace(tracepoints, stages, events, batches)
+
+
+def parse(path, tracepoints, stages):
+    """Parses a trace in the txt or json format, or saved by Trace.save()."""
+    if str(path).endswith('.npz'):
+        return load_npz(path, tracepoints, stages)
+
+    with open(path, encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        return parse_json(text, tracepoints, stages)
+    return parse_text(text, tracepoints, stages)
+
+
+def pair_events(starts, ends):
+    """Pairs the start and end events of a stage, into a record array with
+    the frame_nr, batch_nr, start_ns, end_ns and duration_ns of each
+    occurrence of the stage, followed by the payload fields of both events.
+
+    The events are paired in each batch by their order, so that nested
+    occurrences of a stage are paired like parentheses.  Events left without
+    a match are dropped."""
+    fields = []
+    for events in (starts, ends):
+        if events is not None:
+            fields += [name for name in events.dtype.names[len(EVENT_COLUMNS):]
+                       if name not in fields]
+
+    def empty(events):
+        dtype = [(name, 'u4' if name.endswith('_nr') else 'u8')
+                 for name in ['frame_nr', 'batch_nr', 'start_ns', 'end_ns', 'duration_ns']]
+        for name in fields:
+            for e in (starts, ends):
+                if e is not None and name in e.dtype.names:
+                    dtype.append((name, e.dtype[name]))
+                    break
+        return np.zeros(0, dtype=dtype).view(np.recarray)
+
+    if starts is None or ends is None or len(starts) == 0 or len(ends) == 0:
+        return empty(None)
+
+    # Sort all the events by batch and order, and find their nesting level
+    # in their batch.
+    is_start = np.concatenate((np.ones(len(starts), bool), np.zeros(len(ends), bool)))
+    index = np.concatenate((np.arange(len(starts)), np.arange(len(ends))))
+    frame_nr = np.concatenate((starts.frame_nr, ends.frame_nr)).astype(np.int64)
+    batch_nr = np.concatenate((starts.batch_nr, ends.batch_nr)).astype(np.int64)
+    seq = np.concatenate((starts.seq, ends.seq))
+    order = np.lexsort((seq, batch_nr, frame_nr))
+    is_start, index = is_start[order], index[order]
+    frame_nr, batch_nr = frame_nr[order], batch_nr[order]
+
+    steps = np.where(is_start, 1, -1)
+    level = np.cumsum(steps)
+    first = np.ones(len(order), bool)
+    first[1:] = (frame_nr[1:] != frame_nr[:-1]) | (batch_nr[1:] != batch_nr[:-1])
+    batch_start = np.maximum.accumulate(np.where(first, np.arange(len(order)), 0))
+    level -= (level - steps)[batch_start]
+    # An end is at the level of the start it closes.
+    level[~is_start] += 1
+
+    # In each batch and level, a start is closed by the next event if it is
+    # an end.
+    order = np.lexsort((np.arange(len(order)), level, batch_nr, frame_nr))
+    is_start, index, level = is_start[order], index[order], level[order]
+    frame_nr, batch_nr = frame_nr[order], batch_nr[order]
+    paired = (is_start[:-1] & ~is_start[1:] &
+              (frame_nr[:-1] == frame_nr[1:]) & (batch_nr[:-1] == batch_nr[1:]) &
+              (level[:-1] == level[1:]))
+    start_index = index[:-1][paired]
+    end_index = index[1:][paired]
+
+    # Back in the order of the trace.
+    by_seq = np.argsort(starts.seq[start_index], kind='stable')
+    start_index, end_index = start_index[by_seq], end_index[by_seq]
+
+    result = np.zeros(len(start_index), dtype=empty(None).dtype).view(np.recarray)
+    result.frame_nr = starts.frame_nr[start_index]
+    result.batch_nr = starts.batch_nr[start_index]
+    result.start_ns = starts.ts_ns[start_index]
+    result.end_ns = ends.ts_ns[end_index]
+    # The end timestamp isn't always later, e.g. when it wasn't recorded.
+    result.duration_ns = np.where(result.end_ns > result.start_ns,
+                                  result.end_ns - result.start_ns, 0)
+    for name in fields:
+        if name in starts.dtype.names:
+            result[name] = starts[name][start_index]
+        else:
+            result[name] = ends[name][end_index]
+    return result
+
+
+def histogram(durations, bins=20, log=True):
+    """Bins the durations, on a logarithmic scale by default as they tend to
+    span several orders of magnitude.  Returns the counts and bin edges."""
+    durations = np.asarray(durations, dtype=np.float64)
+    if len(durations) == 0:
+        return np.zeros(0, np.int64), np.zeros(0)
+    low, high = max(durations.min(), 1.0), max(durations.max(), 1.0)
+    if log and high > low:
+        edges = np.geomspace(low, high, bins + 1)
+        return np.histogram(np.maximum(durations, 1.0), bins=edges)
+    return np.histogram(durations, bins=bins)
+
+
+def summarize(trace, percentiles=(50, 90, 99)):
+    """Returns rows of (stage, count, total_ns, mean_ns, percentiles, max_ns)
+    for the stages of the trace, the longest in total first."""
+    rows = []
+    for name, pairs in trace.stage_durations().items():
+        if len(pairs) == 0:
+            continue
+        durations = pairs.duration_ns.astype(np.float64)
+        rows.append((name, len(pairs), durations.sum(), durations.mean(),
+                     np.percentile(durations, percentiles), durations.max()))
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return rows
+
+
+def print_summary(trace, file=sys.stdout, percentiles=(50, 90, 99)):
+    frames = len(np.unique(trace.batches.frame_nr))
+    gpu_ns = float(trace.batches.elapsed_ns.sum())
+    print('{} frames, {} batches, {:.3f} ms elapsed'.format(
+          frames, len(trace.batches), gpu_ns / 1e6), file=file)
+
+    columns = ['count', 'total ms', '%', 'mean us'] + ['p{} us'.format(p) for p in percentiles] + ['max us']
+    print('{:<28}'.format('stage') + ''.join('{:>12}'.format(c) for c in columns), file=file)
+    for name, count, total, mean, pcts, longest in summarize(trace, percentiles):
+        values = ['{}'.format(count),
+                  '{:.3f}'.format(total / 1e6),
+                  '{:.1f}'.format(total * 100.0 / gpu_ns) if gpu_ns else '-',
+                  '{:.2f}'.format(mean / 1e3)]
+        values += ['{:.2f}'.format(p / 1e3) for p in pcts]
+        values.append('{:.2f}'.format(longest / 1e3))
+        print('{:<28}'.format(name) + ''.join('{:>12}'.format(v) for v in values), file=file)
+
+    for name, count in sorted(trace.unknown.items()):
+        print('warning: {} events of unknown tracepoint {}'.format(count, name), file=sys.stderr)
+    for name, count in sorted(trace.unparsed.items()):
+        print('warning: {} events of {} with an unexpected payload'.format(count, name), file=sys.stderr)
+
+
+def print_histogram(trace, name, bins, log, file=sys.stdout):
+    durations = trace.stage(name).duration_ns
+    counts, edges = histogram(durations, bins, log)
+    print('{}: {} occurrences'.format(name, len(durations)), file=file)
+    width = 50
+    peak = counts.max() if len(counts) else 0
+    for count, low, high in zip(counts, edges[:-1], edges[1:]):
+        bar = '#' * int(round(count * width / peak)) if peak else ''
+        print('{:>12.2f} - {:>12.2f} us {:>8} {}'.format(low / 1e3, high / 1e3, count, bar), file=file)
+
+
+def main(tracepoints, stages):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('trace',
+                        help='trace written by u_trace in the txt or json format, or a .npz saved with --save')
+    parser.add_argument('--histogram', metavar='STAGE', action='append', default=[],
+                        choices=sorted(stages),
+                        help='print a histogram of the durations of the stage, may be repeated')
+    parser.add_argument('--bins', type=int, default=20,
+                        help='number of bins of the histograms')
+    parser.add_argument('--linear', action='store_true',
+                        help='use linear bins instead of logarithmic ones')
+    parser.add_argument('--save', metavar='NPZ',
+                        help='save the parsed events to a .npz file')
+    args = parser.parse_args()
+
+    trace = parse(args.trace, tracepoints, stages)
+    if args.save:
+        trace.save(args.save)
+
+    print_summary(trace)
+    for name in args.histogram:
+        print()
+        print_histogram(trace, name, args.bins, not args.linear)
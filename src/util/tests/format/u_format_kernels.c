@@ -0,0 +1,130 @@
+/*
+ * Copyright © 2026 Mesa contributors
+ * SPDX-License-Identifier: MIT
+ */
+
+/*
+ * Runs the pack/unpack functions of the formats over pixels read from
+ * stdin, for "u_format_numpy.py compare" to check its engine against them.
+ *
+ * Each request is a line "<format> <function> <pixels>\n", with the format
+ * name as in u_format.csv (e.g. PIPE_FORMAT_R8G8B8A8_UNORM) and the function
+ * one of unpack_rgba_8unorm, unpack_rgba (float, uint or sint as per the
+ * format), pack_rgba_8unorm, pack_rgba_float, pack_rgba_uint and
+ * pack_rgba_sint, followed by the input pixels.  The answer is a line with
+ * the size of the output, followed by the output pixels, or a line with -1
+ * if the format doesn't have the function.
+ *
+ * Only formats with 1x1 blocks are supported.
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+#include "util/format/u_format.h"
+
+static enum pipe_format
+lookup_format(const char *name)
+{
+   for (unsigned i = 0; i < PIPE_FORMAT_COUNT; i++) {
+      const struct util_format_description *desc = util_format_description(i);
+      if (desc && !strcmp(desc->name, name))
+         return i;
+   }
+   return PIPE_FORMAT_NONE;
+}
+
+static bool
+read_all(void *buf, size_t size)
+{
+   return fread(buf, 1, size, stdin) == size;
+}
+
+int
+main(void)
+{
+   char line[256], format_name[128], function[64];
+   unsigned pixels;
+
+   while (fgets(line, sizeof(line), stdin)) {
+      if (sscanf(line, "%127s %63s %u", format_name, function, &pixels) != 3) {
+         fprintf(stderr, "bad request: %s", line);
+         return 1;
+      }
+
+      enum pipe_format format = lookup_format(format_name);
+      const struct util_format_description *desc = util_format_description(format);
+      const struct util_format_pack_description *pack =
+         util_format_pack_description(format);
+      const struct util_format_unpack_description *unpack =
+         util_format_unpack_description(format);
+      if (format == PIPE_FORMAT_NONE || desc->block.width != 1 ||
+          desc->block.height != 1) {
+         fprintf(stderr, "unsupported format: %s\n", format_name);
+         return 1;
+      }
+
+      unsigned packed_size = pixels * desc->block.bits / 8;
+      bool is_unpack = !strncmp(function, "unpack_", 7);
+      bool is_8unorm = strstr(function, "_8unorm") != NULL;
+      unsigned rgba_size = pixels * (is_8unorm ? 4 : 16);
+      size_t in_size = is_unpack ? packed_size : rgba_size;
+      size_t out_size = is_unpack ? rgba_size : packed_size;
+      uint8_t *in = malloc(in_size + 1);
+      uint8_t *out = calloc(out_size + 1, 1);
+
+      if (!in || !out || !read_all(in, in_size)) {
+         fprintf(stderr, "short request: %s", line);
+         return 1;
+      }
+
+      bool supported = true;
+      if (!strcmp(function, "unpack_rgba_8unorm")) {
+         supported = unpack->unpack_rgba_8unorm || unpack->unpack_rgba_8unorm_rect;
+         if (supported)
+            util_format_unpack_rgba_8unorm_rect(format, out, rgba_size,
+                                                in, packed_size, pixels, 1);
+      } else if (!strcmp(function, "unpack_rgba")) {
+         supported = unpack->unpack_rgba || unpack->unpack_rgba_rect;
+         if (supported)
+            util_format_unpack_rgba_rect(format, out, rgba_size,
+                                         in, packed_size, pixels, 1);
+      } else if (!strcmp(function, "pack_rgba_8unorm")) {
+         supported = pack->pack_rgba_8unorm != NULL;
+         if (supported)
+            pack->pack_rgba_8unorm(out, packed_size, in, rgba_size, pixels, 1);
+      } else if (!strcmp(function, "pack_rgba_float")) {
+         supported = pack->pack_rgba_float != NULL;
+         if (supported)
+            pack->pack_rgba_float(out, packed_size, (const float *)in,
+                                  rgba_size, pixels, 1);
+      } else if (!strcmp(function, "pack_rgba_uint")) {
+         supported = pack->pack_rgba_uint != NULL;
+         if (supported)
+            pack->pack_rgba_uint(out, packed_size, (const uint32_t *)in,
+                                 rgba_size, pixels, 1);
+      } else if (!strcmp(function, "pack_rgba_sint")) {
+         supported = pack->pack_rgba_sint != NULL;
+         if (supported)
+            pack->pack_rgba_sint(out, packed_size, (const int32_t *)in,
+                                 rgba_size, pixels, 1);
+      } else {
+         fprintf(stderr, "unknown function: %s\n", function);
+         return 1;
+      }
+
+      if (supported) {
+         printf("%zu\n", out_size);
+         fwrite(out, 1, out_size, stdout);
+      } else {
+         printf("-1\n");
+      }
+      fflush(stdout);
+
+      free(in);
+      free(out);
+   }
+
+   return 0;
+}
@@ -38,6 +38,12 @@ from vk_entrypoints import get_entrypoints_from_xml
 # (vkGetProcAddress). We use a linear congruential generator for our hash
 # function and a power-of-two size table. The prime numbers are determined
 # experimentally.
+#
+# Alternatively, with --perfect-hash, the table is a minimal perfect hash
+# built with the hash and displace (CHD) scheme: the LCG hash picks a bucket,
+# and the bucket's displacement is mixed with the hash to pick one of exactly
+# as many slots as there are strings, so a lookup is always a single probe
+# and a single string compare.
 
 TEMPLATE_H = Template(COPYRIGHT + """\
 /* This file generated from ${filename}, don't edit directly. */
@@ -294,12 +300,54 @@ static const struct string_map_entry ${prefix}_string_map_entries[] = {
 
 /* Hash table stats:
  * size ${len(strmap.sorted_strings)} entries
+% if strmap.perfect:
+ * minimal perfect hash, ${strmap.num_buckets} buckets
+ * max displacement ${strmap.max_displacement}, ${strmap.displacement_tries} displacements tried
+% else:
  * collisions entries:
 % for i in range(10):
  *     ${i}${'+' if i == 9 else ' '}     ${strmap.collisions[i]}
 % endfor
+% endif
+ * probes per lookup: ${'{:.2f}'.format(strmap.hit_probes)} hit, ${'{:.2f}'.format(strmap.miss_probes)} miss
  */
 
+% if strmap.perfect:
+static const uint16_t ${prefix}_string_map_displacements[${strmap.num_buckets}] = {
+% for d in strmap.displacements:
+    ${'{:0=#6x}'.format(d)},
+% endfor
+};
+
+static const uint16_t ${prefix}_string_map[${strmap.hash_size}] = {
+% for e in strmap.mapping:
+    ${'{:0=#6x}'.format(e)},
+% endfor
+};
+
+static int
+${prefix}_string_map_lookup(const char *str)
+{
+    static const uint32_t prime_factor = ${strmap.prime_factor};
+    const struct string_map_entry *e;
+    uint32_t hash, h;
+    const char *p;
+
+    hash = 0;
+    for (p = str; *p; p++)
+        hash = hash * prime_factor + *p;
+
+    h = (hash * ${strmap.mix_factor}u) >> ${32 - strmap.bucket_bits};
+    h = (hash ^ ${prefix}_string_map_displacements[h]) * ${strmap.mix_factor}u;
+    h ^= h >> 16;
+
+    e = &${prefix}_string_map_entries[${prefix}_string_map[((uint64_t)h * ${strmap.hash_size}) >> 32]];
+    if (e->hash == hash && strcmp(str, ${prefix}_strings + e->name) == 0)
+        return e->num;
+
+    return -1;
+}
+% else:
 #define none 0xffff
 static const uint16_t ${prefix}_string_map[${strmap.hash_size}] = {
 % for e in strmap.mapping:
@@ -334,6 +382,7 @@ ${prefix}_string_map_lookup(const char *str)
 
     return -1;
 }
+% endif
 </%def>
 
 ${strmap(instance_strmap, 'instance')}
@@ -594,6 +643,11 @@ U32_MASK = 2**32 - 1
 PRIME_FACTOR = 5024183
 PRIME_STEP = 19
 
+# Multiplier of the mixing function of the perfect hash, and the average
+# number of strings per displacement bucket.
+MIX_FACTOR = 0x9e3779b1
+PERFECT_HASH_BUCKET_SIZE = 4
+
 class StringIntMapEntry:
     def __init__(self, string, num):
         self.string = string
@@ -621,7 +675,7 @@ class StringIntMap:
         assert 0 <= num < 2**31
         self.strings[string] = StringIntMapEntry(string, num)
 
-    def bake(self):
+    def bake(self, perfect=False):
         self.sorted_strings = \
             sorted(self.strings.values(), key=lambda x: x.string)
         offset = 0
@@ -635,6 +689,10 @@ class StringIntMap:
         self.prime_factor = PRIME_FACTOR
         self.prime_step = PRIME_STEP
 
+        self.perfect = perfect and self._bake_perfect()
+        if self.perfect:
+            return
+
         self.mapping = [-1] * self.hash_size
         self.collisions = [0] * 10
         for idx, s in enumerate(self.sorted_strings):
@@ -646,6 +704,76 @@ class StringIntMap:
             self.collisions[min(level, 9)] += 1
             self.mapping[h & self.hash_mask] = idx
 
+        # A hit reads one slot per collision level, a miss reads slots up to
+        # the first empty one.
+        self.hit_probes = sum((i + 1) * n for i, n in enumerate(self.collisions)) / \
+                          max(len(self.sorted_strings), 1)
+        miss_probes = 0
+        for start in range(self.hash_size):
+            h = start
+            miss_probes += 1
+            while self.mapping[h & self.hash_mask] >= 0:
+                h = h + PRIME_STEP
+                miss_probes += 1
+        self.miss_probes = miss_probes / self.hash_size
+
+    @staticmethod
+    def _perfect_slot(h, displacement, hash_size):
+        # Must match the perfect hash lookup in the template.
+        h = ((h ^ displacement) * MIX_FACTOR) & U32_MASK
+        return ((h ^ (h >> 16)) * hash_size) >> 32
+
+    def _bake_perfect(self):
+        """Build a minimal perfect hash of the strings, returns False if the
+        strings can't be perfectly hashed.  The map is left untouched in that
+        case, for the linear probing fallback."""
+        hashes = [s.hash for s in self.sorted_strings]
+        if not hashes or len(set(hashes)) != len(hashes):
+            return False
+
+        hash_size = len(hashes)
+        num_buckets = round_to_pow2(max(len(hashes) / PERFECT_HASH_BUCKET_SIZE, 2))
+        bucket_bits = num_buckets.bit_length() - 1
+
+        buckets = [[] for i in range(num_buckets)]
+        for idx, h in enumerate(hashes):
+            bucket = ((h * MIX_FACTOR) & U32_MASK) >> (32 - bucket_bits)
+            buckets[bucket].append(idx)
+
+        # Place the biggest buckets first, while there's the most room.
+        displacements = [0] * num_buckets
+        displacement_tries = 0
+        mapping = [-1] * hash_size
+        order = sorted(range(num_buckets), key=lambda b: -len(buckets[b]))
+        for bucket in order:
+            if not buckets[bucket]:
+                break
+            for displacement in range(2**16):
+                displacement_tries += 1
+                slots = set(self._perfect_slot(hashes[idx], displacement, hash_size)
+                            for idx in buckets[bucket])
+                if len(slots) == len(buckets[bucket]) and \
+                   all(mapping[slot] < 0 for slot in slots):
+                    break
+            else:
+                return False
+
+            displacements[bucket] = displacement
+            for idx in buckets[bucket]:
+                mapping[self._perfect_slot(hashes[idx], displacement, hash_size)] = idx
+
+        self.hash_size = hash_size
+        self.num_buckets = num_buckets
+        self.bucket_bits = bucket_bits
+        self.mix_factor = MIX_FACTOR
+        self.displacements = displacements
+        self.displacement_tries = displacement_tries
+        self.mapping = mapping
+        self.max_displacement = max(displacements)
+        self.hit_probes = 1
+        self.miss_probes = 1
+        return True
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--out-c', help='Output C file.')
@@ -655,6 +783,9 @@ def main():
                         required=True,
                         action='append',
                         dest='xml_files')
+    parser.add_argument('--perfect-hash', action='store_true',
+                        help='Use minimal perfect hashes for the entrypoint '
+                             'string maps.')
     args = parser.parse_args()
 
     entrypoints = get_entrypoints_from_xml(args.xml_files)
@@ -677,7 +808,7 @@ def main():
     for i, e in enumerate(device_entrypoints):
         e.entry_table_index = i
         device_strmap.add_string("vk" + e.name, e.entry_table_index)
-    device_strmap.bake()
+    device_strmap.bake(args.perfect_hash)
 
     for i, e in enumerate(e for e in physical_device_entrypoints if not e.alias):
         e.disp_table_index = i
@@ -686,7 +817,7 @@ def main():
     for i, e in enumerate(physical_device_entrypoints):
         e.entry_table_index = i
         physical_device_strmap.add_string("vk" + e.name, e.entry_table_index)
-    physical_device_strmap.bake()
+    physical_device_strmap.bake(args.perfect_hash)
 
     for i, e in enumerate(e for e in instance_entrypoints if not e.alias):
         e.disp_table_index = i
@@ -695,7 +826,7 @@ def main():
     for i, e in enumerate(instance_entrypoints):
         e.entry_table_index = i
         instance_strmap.add_string("vk" + e.name, e.entry_table_index)
-    instance_strmap.bake()
+    instance_strmap.bake(args.perfect_hash)
 
     # For outputting entrypoints.h we generate a anv_EntryPoint() prototype
     # per entry point.
@@ -0,0 +1,191 @@
+# Copyright © 2026 Mesa contributors
+# SPDX-License-Identifier: MIT
+
+COPYRIGHT = """\
+/*
+ * Copyright © 2026 Mesa contributors
+ * SPDX-License-Identifier: MIT
+ */
+"""
+
+# Host side benchmark of the entrypoint string maps generated by
+# vk_dispatch_table_gen.py.
+#
+# The string maps are generated with linear probing and with a minimal
+# perfect hash, then compiled into a small C program which checks that both
+# give the expected result for every entrypoint name and for a set of
+# misses, and times the lookups, e.g.:
+#
+#   python3 vk_string_map_bench.py --xml ../registry/vk.xml
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from mako.template import Template
+
+from vk_dispatch_table_gen import StringIntMap, TEMPLATE_C
+from vk_entrypoints import get_entrypoints_from_xml
+
+TEMPLATE_BENCH = Template(COPYRIGHT + """\
+/* This file generated from ${filename}, don't edit directly. */
+
+#include <stdint.h>
+#include <stdio.h>
+#include <string.h>
+#include <time.h>
+
+struct string_map_entry {
+   uint32_t name;
+   uint32_t hash;
+   uint32_t num;
+};
+
+% for name, strmap in strmaps:
+${strmap_def.render(strmap=strmap, prefix=name)}
+% endfor
+
+struct query {
+   const char *name;
+   int expected;
+};
+
+% for type, queries in type_queries:
+static const struct query ${type}_queries[] = {
+% for name, expected in queries:
+   { "${name}", ${expected} },
+% endfor
+};
+
+% endfor
+static double
+now(void)
+{
+   struct timespec ts;
+   clock_gettime(CLOCK_MONOTONIC, &ts);
+   return ts.tv_sec + ts.tv_nsec * 1e-9;
+}
+
+static volatile int sink;
+
+static int
+bench(const char *map, int (*lookup)(const char *),
+      const struct query *queries, unsigned num_queries, int hits)
+{
+   unsigned count = 0;
+   for (unsigned i = 0; i < num_queries; i++) {
+      if ((queries[i].expected >= 0) != hits)
+         continue;
+      if (lookup(queries[i].name) != queries[i].expected) {
+         fprintf(stderr, "%s: wrong lookup of %s\\n", map, queries[i].name);
+         return 1;
+      }
+      count++;
+   }
+
+   double start = now();
+   for (unsigned n = 0; n < ${iterations}; n++) {
+      for (unsigned i = 0; i < num_queries; i++) {
+         if ((queries[i].expected >= 0) == hits)
+            sink = lookup(queries[i].name);
+      }
+   }
+   double elapsed = now() - start;
+
+   printf("%-24s %-6s %8u %10.1f\\n", map, hits ? "hit" : "miss", count,
+          elapsed * 1e9 / ((double)count * ${iterations}));
+   return 0;
+}
+
+int
+main(void)
+{
+   int ret = 0;
+
+   printf("%-24s %-6s %8s %10s\\n", "string map", "lookup", "names", "ns/lookup");
+% for type, queries in type_queries:
+% for mode in modes:
+   for (int hits = 1; hits >= 0; hits--) {
+      ret |= bench("${mode}_${type}", ${mode}_${type}_string_map_lookup,
+                   ${type}_queries, ${len(queries)}, hits);
+   }
+% endfor
+% endfor
+
+   return ret;
+}
+""")
+
+MODES = ['probing', 'perfect']
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--xml',
+                        help='Vulkan API XML file.',
+                        required=True,
+                        action='append',
+                        dest='xml_files')
+    parser.add_argument('--iterations', type=int, default=10000,
+                        help='Number of times each name is looked up.')
+    parser.add_argument('--cc', default=os.environ.get('CC', 'cc'),
+                        help='C compiler to build the benchmark with.')
+    parser.add_argument('--out-c', help='Keep the benchmark C file.')
+    args = parser.parse_args()
+
+    entrypoints = get_entrypoints_from_xml(args.xml_files)
+
+    type_names = {
+        'instance': [],
+        'physical_device': [],
+        'device': [],
+    }
+    for e in entrypoints:
+        if e.is_device_entrypoint():
+            type_names['device'].append("vk" + e.name)
+        elif e.is_physical_device_entrypoint():
+            type_names['physical_device'].append("vk" + e.name)
+        else:
+            type_names['instance'].append("vk" + e.name)
+
+    strmaps = []
+    type_queries = []
+    for type, names in type_names.items():
+        for mode in MODES:
+            strmap = StringIntMap()
+            for i, name in enumerate(names):
+                strmap.add_string(name, i)
+            strmap.bake(perfect=(mode == 'perfect'))
+            strmaps.append(('{}_{}'.format(mode, type), strmap))
+
+        # Misses are the names of the other types of entrypoints, which are
+        # commonly queried through the wrong GetProcAddr, and names of
+        # entrypoints from unsupported extensions.
+        queries = [(name, i) for i, name in enumerate(names)]
+        for other, other_names in type_names.items():
+            if other != type:
+                queries += [(name, -1) for name in other_names]
+        queries += [(name + 'EXT', -1) for name in names
+                    if name + 'EXT' not in names]
+        type_queries.append((type, queries))
+
+    source = TEMPLATE_BENCH.render(strmaps=strmaps,
+                                   strmap_def=TEMPLATE_C.get_def('strmap'),
+                                   type_queries=type_queries,
+                                   modes=MODES,
+                                   iterations=args.iterations,
+                                   filename=os.path.basename(__file__))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        c_file = args.out_c or os.path.join(tmpdir, 'vk_string_map_bench.c')
+        exe = os.path.join(tmpdir, 'vk_string_map_bench')
+        with open(c_file, 'w') as f:
+            f.write(source)
+        subprocess.check_call([args.cc, '-O2', '-std=gnu99', '-o', exe, c_file])
+        sys.exit(subprocess.call([exe]))
+
+
+if __name__ == '__main__':
+    main()